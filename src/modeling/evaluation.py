@@ -0,0 +1,182 @@
+"""
+Created on 18 october 2026
+
+Package to hold the evaluation of price predictions: all prediction columns of a results dataset (y_true, y_<model>,
+...) are scored at once on a (nb listings, nb models) matrix of errors instead of one model after the other
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils import constants as cst
+
+METRICS = ['rmse', 'mae', 'mape']
+
+
+def get_prediction_columns(results_df, y_true_col='y_true'):
+    """
+    :param results_df: (pandas DataFrame) results data
+    :param y_true_col: (string) not required, name of the ground truth column
+    :return: (list) prediction columns of the results data, such as 'y_xgboost' (derived columns are excluded)
+    """
+    return [col for col in results_df.columns
+            if col.startswith('y_') and col != y_true_col and not col.endswith(('_perc_diff', '_perc_diff_class'))]
+
+
+def compute_perc_diff(y_true, y_pred):
+    """
+    Absolute difference percentage between predictions and truth
+    :param y_true: (numpy array) true prices, shape (nb listings,)
+    :param y_pred: (numpy array) predicted prices, shape (nb listings,) or (nb listings, nb models)
+    :return: (numpy array) absolute difference percentage, same shape as y_pred
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    if np.ndim(y_pred) == 2:
+        y_true = y_true[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * np.abs(y_true - y_pred) / y_true
+
+
+def get_error_class_codes(perc_diff):
+    """
+    Classify difference percentages among the 6 classes of cst.PRICE_ERROR_CLASSES with a single binary search
+    :param perc_diff: (numpy array) absolute difference percentages, any shape
+    :return: (numpy array) position of the class in cst.PRICE_ERROR_CLASSES, same shape as perc_diff
+    """
+    perc_diff = np.asarray(perc_diff, dtype=np.float64)
+    codes = np.searchsorted(cst.PRICE_ERROR_BINS, perc_diff, side='left')
+    # Undefined percentages (missing value) fall in the first class, as with the former chained comparisons
+    codes[np.isnan(perc_diff)] = 0
+    return codes
+
+
+def _score(y_true, y_pred):
+    """
+    Inner method that computes all metrics for all models, along the first axis
+    :param y_true: (numpy array) true prices, shape (nb listings,) or (nb resamples, nb listings)
+    :param y_pred: (numpy array) predictions, shape (nb listings, nb models) or (nb resamples, nb listings, nb models)
+    :return: (dict) metric name as key and array of shape (nb models,) or (nb resamples, nb models) as value
+    """
+    errors = y_pred - y_true[..., np.newaxis]
+    abs_errors = np.abs(errors)
+    axis = errors.ndim - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'rmse': np.sqrt(np.mean(errors ** 2, axis=axis)),
+                'mae': np.mean(abs_errors, axis=axis),
+                'mape': 100 * np.mean(abs_errors / np.abs(y_true[..., np.newaxis]), axis=axis)}
+
+
+def evaluate_predictions(results_df, prediction_columns=None, y_true_col='y_true'):
+    """
+    Score all prediction columns: RMSE, MAE, MAPE and number of predictions in each class of error
+    :param results_df: (pandas DataFrame) results data with the ground truth and one column per model
+    :param prediction_columns: (list) not required, default is all 'y_<model>' columns
+    :param y_true_col: (string) not required, name of the ground truth column
+    :return: (pandas DataFrame) one row per model, metrics and one column per class of error
+    """
+    if prediction_columns is None:
+        prediction_columns = get_prediction_columns(results_df, y_true_col)
+    y_true = results_df[y_true_col].to_numpy(dtype=np.float64)
+    y_pred = results_df[prediction_columns].to_numpy(dtype=np.float64)
+
+    df_eval = pd.DataFrame(_score(y_true, y_pred), index=prediction_columns, columns=METRICS)
+    codes = get_error_class_codes(compute_perc_diff(y_true, y_pred))
+    nb_classes = len(cst.PRICE_ERROR_CLASSES)
+    # One bincount for all models: class codes of model j are shifted by j * nb_classes
+    counts = np.bincount((codes + nb_classes * np.arange(len(prediction_columns))).ravel(),
+                         minlength=nb_classes * len(prediction_columns))
+    df_counts = pd.DataFrame(counts.reshape(len(prediction_columns), nb_classes), index=prediction_columns,
+                             columns=cst.PRICE_ERROR_CLASSES)
+    return pd.concat([df_eval, df_counts], axis=1)
+
+
+def get_segments(X, prefix, unknown='unknown'):
+    """
+    Get back the original category of each listing from its one-hot encoded columns (such as the ones built by
+    cleaning.encode_categorical for 'neighbourhood_cleansed' or 'room_type')
+    :param X: (pandas DataFrame) encoded features, for instance the test split
+    :param prefix: (string) name of the original categorical feature
+    :param unknown: (string) not required, segment of listings without any dummy set
+    :return: (pandas Series) category of each listing, same index as X
+    """
+    dummy_cols = [col for col in X.columns if col.startswith(prefix + '_')]
+    assert len(dummy_cols) > 0, "No one-hot encoded column found for '{}'".format(prefix)
+    values = X[dummy_cols].to_numpy()
+    labels = np.array([col[len(prefix) + 1:] for col in dummy_cols] + [unknown], dtype=object)
+    positions = np.where(values.max(axis=1) > 0, values.argmax(axis=1), len(dummy_cols))
+    return pd.Series(labels[positions], index=X.index, name=prefix)
+
+
+def evaluate_segments(results_df, segments, prediction_columns=None, y_true_col='y_true'):
+    """
+    Score all prediction columns for each segment of listings (neighbourhood, room type...)
+    :param results_df: (pandas DataFrame) results data with the ground truth and one column per model
+    :param segments: (pandas Series or array) segment of each listing, aligned on the rows of results_df (see
+    get_segments)
+    :param prediction_columns: (list) not required, default is all 'y_<model>' columns
+    :param y_true_col: (string) not required, name of the ground truth column
+    :return: (pandas DataFrame) indexed by (segment, model) with the number of listings and the metrics
+    """
+    if prediction_columns is None:
+        prediction_columns = get_prediction_columns(results_df, y_true_col)
+    y_true = results_df[y_true_col].to_numpy(dtype=np.float64)
+    errors = results_df[prediction_columns].to_numpy(dtype=np.float64) - y_true[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        perc = 100 * np.abs(errors) / np.abs(y_true[:, np.newaxis])
+
+    # Sums per segment for all models in a single groupby, means are derived afterwards
+    parts = {'sq': errors ** 2, 'abs': np.abs(errors), 'perc': perc}
+    df_parts = pd.concat([pd.DataFrame(v, columns=prediction_columns) for v in parts.values()], axis=1,
+                         keys=list(parts))
+    gb = df_parts.groupby(np.asarray(segments), sort=True)
+    sums, nb = gb.sum(), gb.size()
+
+    df_seg = pd.DataFrame({'nb_listings': np.repeat(nb.to_numpy(), len(prediction_columns)),
+                           'rmse': np.sqrt(sums['sq'].to_numpy() / nb.to_numpy()[:, np.newaxis]).ravel(),
+                           'mae': (sums['abs'].to_numpy() / nb.to_numpy()[:, np.newaxis]).ravel(),
+                           'mape': (sums['perc'].to_numpy() / nb.to_numpy()[:, np.newaxis]).ravel()},
+                          index=pd.MultiIndex.from_product([nb.index, prediction_columns], names=['segment', 'model']))
+    return df_seg
+
+
+def bootstrap_intervals(results_df, prediction_columns=None, y_true_col='y_true',
+                        nb_resamples=cst.BOOTSTRAP_NB_RESAMPLES, confidence=0.95, seed=42,
+                        max_batch_bytes=cst.BOOTSTRAP_MAX_BATCH_BYTES):
+    """
+    Bootstrap confidence intervals of the metrics of all models. Resamples are drawn as arrays of indices, a whole batch
+    of resamples is scored at once (batch size is bounded by max_batch_bytes). All models are scored on the same
+    resamples so their intervals can be compared
+    :param results_df: (pandas DataFrame) results data with the ground truth and one column per model
+    :param prediction_columns: (list) not required, default is all 'y_<model>' columns
+    :param y_true_col: (string) not required, name of the ground truth column
+    :param nb_resamples: (int) not required, number of bootstrap resamples
+    :param confidence: (float) not required, default is 0.95 (2.5% and 97.5% percentiles)
+    :param seed: (int) not required, random seed
+    :param max_batch_bytes: (int) not required, maximum size of the resampled predictions scored at once
+    :return: (pandas DataFrame) one row per model with the metric on the whole data and its lower and upper bounds
+    ('rmse', 'rmse_low', 'rmse_high', 'mae', ...)
+    """
+    if prediction_columns is None:
+        prediction_columns = get_prediction_columns(results_df, y_true_col)
+    y_true = results_df[y_true_col].to_numpy(dtype=np.float64)
+    y_pred = results_df[prediction_columns].to_numpy(dtype=np.float64)
+    nb_listings = y_true.shape[0]
+
+    rng = np.random.RandomState(seed)
+    batch_size = max(1, int(max_batch_bytes // (8 * nb_listings * (len(prediction_columns) + 1))))
+    scores = {metric: [] for metric in METRICS}
+    for start in range(0, nb_resamples, batch_size):
+        indices = rng.randint(0, nb_listings, size=(min(batch_size, nb_resamples - start), nb_listings))
+        for metric, values in _score(y_true[indices], y_pred[indices]).items():
+            scores[metric].append(values)
+
+    alpha = 100 * (1 - confidence) / 2
+    full_scores = _score(y_true, y_pred)
+    df_ci = pd.DataFrame(index=prediction_columns)
+    for metric in METRICS:
+        resampled = np.concatenate(scores[metric])
+        df_ci[metric] = full_scores[metric]
+        df_ci['{}_low'.format(metric)] = np.percentile(resampled, alpha, axis=0)
+        df_ci['{}_high'.format(metric)] = np.percentile(resampled, 100 - alpha, axis=0)
+    return df_ci
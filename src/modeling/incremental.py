@@ -0,0 +1,231 @@
+"""
+Created on 18 october 2026
+
+Package to keep the price model up to date with new snapshots without a full retrain: boosting continues from the
+saved booster with a few rounds fitted on the listings added or changed since the previous snapshot only. A holdout
+guard falls back to a full retrain (with the parameters found by the last search) when the RMSE drifts too much
+
+@author: nidragedd
+"""
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import xgboost as xgb
+
+from src.modeling import modeling
+from src.utils import constants as cst
+from src.utils import instrumentation
+from src.utils import snapshots
+from src.utils.featurestore import FeatureStore
+
+
+def get_state_file():
+    """
+    :return: (string) path to the file of the incremental model state
+    """
+    return os.path.join(cst.MODELS_DIR_PATH, cst.INCREMENTAL_STATE_FILE)
+
+
+def save_state(state):
+    """
+    Save the incremental model state (written to a temporary file first, the previous state is replaced only once the
+    new one is complete)
+    :param state: (dict) the state, see full_train
+    """
+    os.makedirs(cst.MODELS_DIR_PATH, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=cst.MODELS_DIR_PATH, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, get_state_file())
+
+
+def load_state():
+    """
+    :return: (dict) the incremental model state, see full_train
+    """
+    with open(get_state_file(), 'rb') as f:
+        return pickle.load(f)
+
+
+def _to_train_params(params):
+    """
+    Inner method that converts parameters of the sklearn API (such as the best parameters of build_xgb_random_search)
+    into parameters of xgb.train
+    :param params: (dict) XGBRegressor parameters
+    :return: (tuple) xgb.train parameters, number of boosting rounds
+    """
+    train_params = {'objective': 'reg:squarederror', 'seed': 42}
+    train_params.update(params)
+    num_boost_round = train_params.pop('n_estimators', 100)
+    train_params.pop('eval_metric', None)
+    train_params.pop('verbose', None)
+    train_params['eval_metric'] = 'rmse'
+    return train_params, num_boost_round
+
+
+def _rmse(booster, dmatrix):
+    """
+    Inner method that computes the RMSE of a booster on a labelled DMatrix
+    """
+    return float(np.sqrt(np.mean((booster.predict(dmatrix) - dmatrix.get_label()) ** 2)))
+
+
+def _nb_trees(booster):
+    """
+    Inner method that gives the number of trees of a booster (one per boosting round for a regression)
+    """
+    return len(booster.get_dump())
+
+
+def split_by_id(df_clean):
+    """
+    Split cleaned listings indexed by id into train, validation (early stopping of warm starts) and holdout (drift
+    guard), validation and holdout listings being chosen from their id so that they are the same for all snapshots
+    :param df_clean: (pandas DataFrame) cleaned listings indexed by listing id, with the 'price' target
+    :return: (tuple) boolean masks of train rows, of validation rows and of holdout rows
+    """
+    remainder = np.asarray(df_clean.index) % cst.VALIDATION_ID_MODULO
+    has_price = df_clean['price'].notnull().to_numpy()
+    return has_price & (remainder > 1), has_price & (remainder == 0), has_price & (remainder == 1)
+
+
+@instrumentation.instrumented()
+def full_train(X_train, y_train, X_holdout, y_holdout, params=None, param_grid=None, num_iters=10, scrape_date=None):
+    """
+    Train the price model from scratch and save it as the incremental model state
+    :param X_train: (pandas DataFrame) cleaned training features
+    :param y_train: (pandas Series) training target
+    :param X_holdout: (pandas DataFrame) cleaned holdout features, the reference RMSE of the drift guard is measured on
+    them
+    :param y_holdout: (pandas Series) holdout target
+    :param params: (dict) not required, XGBRegressor parameters. Default is the parameters of the saved state
+    :param param_grid: (dict) not required, if given a randomized search (see modeling.build_xgb_random_search) is run
+    first and its best parameters are used
+    :param num_iters: (int) not required, number of candidates of the randomized search
+    :param scrape_date: (string) not required, scrape date of the snapshot used for training
+    :return: (dict) the state: 'booster', 'imputer' (fitted imputation ColumnTransformer), 'columns', 'params',
+    'reference_rmse' (holdout RMSE at the end of this training), 'scrape_date' and 'history' of updates
+    """
+    imputer = modeling.get_column_transformer().fit(X_train)
+    if param_grid is not None:
+        search = modeling.build_xgb_random_search(param_grid, num_iters)
+        search.fit(imputer.transform(X_train), y_train)
+        params = search.best_params_
+    elif params is None:
+        params = load_state()['params']
+
+    train_params, num_boost_round = _to_train_params(params)
+    dtrain = xgb.DMatrix(imputer.transform(X_train), label=np.asarray(y_train).ravel())
+    dholdout = xgb.DMatrix(imputer.transform(X_holdout[X_train.columns]), label=np.asarray(y_holdout).ravel())
+    booster = xgb.train(train_params, dtrain, num_boost_round=num_boost_round, verbose_eval=False)
+    holdout_rmse = _rmse(booster, dholdout)
+    state = {'booster': booster, 'imputer': imputer, 'columns': X_train.columns.tolist(), 'params': dict(params),
+             'reference_rmse': holdout_rmse, 'scrape_date': scrape_date,
+             'history': [{'scrape_date': scrape_date, 'mode': 'full', 'nb_rows': X_train.shape[0],
+                          'rounds': _nb_trees(booster), 'holdout_rmse': holdout_rmse}]}
+    save_state(state)
+    print("Full training on {} listings, holdout RMSE: {:.2f}".format(X_train.shape[0], holdout_rmse))
+    return state
+
+
+@instrumentation.instrumented()
+def update_model(X_new, y_new, X_val, y_val, X_holdout, y_holdout, X_full=None, y_full=None,
+                 nb_rounds=cst.WARM_START_ROUNDS, max_rmse_drift=cst.WARM_START_MAX_RMSE_DRIFT, scrape_date=None):
+    """
+    Continue boosting the saved model with a few rounds fitted on new or changed listings only, the number of rounds
+    being chosen on the validation set (early stopping). If the holdout RMSE of the updated model is worse than the
+    reference RMSE (the one of the last full training) by more than max_rmse_drift, the model is retrained from scratch
+    on the full training data instead. The holdout set is not used to choose the rounds so that the guard is not biased
+    :param X_new: (pandas DataFrame) cleaned features of the new or changed listings
+    :param y_new: (pandas Series) their target
+    :param X_val: (pandas DataFrame) cleaned validation features, used for early stopping
+    :param y_val: (pandas Series) validation target
+    :param X_holdout: (pandas DataFrame) cleaned holdout features, used for the drift guard
+    :param y_holdout: (pandas Series) holdout target
+    :param X_full: (pandas DataFrame) not required, full training features, needed for the fallback
+    :param y_full: (pandas Series) not required, full training target, needed for the fallback
+    :param nb_rounds: (int) not required, maximum number of boosting rounds added
+    :param max_rmse_drift: (float) not required, 0.05 means that a 5% worse RMSE triggers a full retrain
+    :param scrape_date: (string) not required, scrape date of the new snapshot
+    :return: (dict) the new state
+    """
+    state = load_state()
+    imputer = state['imputer']
+    train_params, _ = _to_train_params(state['params'])
+    dval = xgb.DMatrix(imputer.transform(X_val[state['columns']]), label=np.asarray(y_val).ravel())
+    dholdout = xgb.DMatrix(imputer.transform(X_holdout[state['columns']]), label=np.asarray(y_holdout).ravel())
+    rmse_before = _rmse(state['booster'], dholdout)
+
+    booster = state['booster']
+    if X_new.shape[0] > 0:
+        dnew = xgb.DMatrix(imputer.transform(X_new[state['columns']]), label=np.asarray(y_new).ravel())
+        evals_result = {}
+        booster = xgb.train(train_params, dnew, num_boost_round=nb_rounds, xgb_model=state['booster'],
+                            evals=[(dval, 'validation')], early_stopping_rounds=cst.WARM_START_EARLY_STOPPING_ROUNDS,
+                            evals_result=evals_result, verbose_eval=False)
+        # Trees added after the best round only made the validation RMSE worse. The meaning of best_iteration depends
+        # on XGBoost versions for a continued training, the best round is taken from the validation history instead
+        val_history = evals_result['validation']['rmse']
+        best_rounds = int(np.argmin(val_history)) + 1
+        if val_history[best_rounds - 1] >= _rmse(state['booster'], dval):
+            booster = state['booster']
+        elif best_rounds < len(val_history):
+            booster = xgb.train(train_params, dnew, num_boost_round=best_rounds, xgb_model=state['booster'],
+                                verbose_eval=False)
+    rmse_after = _rmse(booster, dholdout)
+    print("Warm start on {} new or changed listings: holdout RMSE {:.2f} -> {:.2f} (reference {:.2f})"
+          .format(X_new.shape[0], rmse_before, rmse_after, state['reference_rmse']))
+
+    if rmse_after > state['reference_rmse'] * (1 + max_rmse_drift):
+        assert X_full is not None and y_full is not None, "Full training data is needed to retrain the drifting model"
+        print("RMSE drifted by more than {:.0%}, full retrain".format(max_rmse_drift))
+        history = state['history']
+        state = full_train(X_full, y_full, X_holdout, y_holdout, params=state['params'], scrape_date=scrape_date)
+        state['history'] = history + state['history']
+        save_state(state)
+        return state
+
+    state['history'].append({'scrape_date': scrape_date, 'mode': 'warm start', 'nb_rows': X_new.shape[0],
+                             'rounds': _nb_trees(booster) - _nb_trees(state['booster']), 'holdout_rmse': rmse_after})
+    state['booster'] = booster
+    state['scrape_date'] = scrape_date
+    save_state(state)
+    return state
+
+
+def refresh_from_snapshot(scrape_date, previous_date=None, nb_rounds=cst.WARM_START_ROUNDS,
+                          max_rmse_drift=cst.WARM_START_MAX_RMSE_DRIFT, feature_store=None):
+    """
+    Ingest a new snapshot (see snapshots.ingest_snapshot) and update the price model with the listings added or changed
+    since the previous one. Training data is read from the feature store, where the ingestion saved the cleaned
+    features of the snapshot. Without any saved model, a full training is done (with the parameters of cst.
+    CITIES_XGB_PARAMS, run full_train with a param_grid to search them instead)
+    :param scrape_date: (string) scrape date of the new snapshot
+    :param previous_date: (string) not required, default is the most recent snapshot already ingested before this one
+    :param nb_rounds: (int) not required, maximum number of boosting rounds added
+    :param max_rmse_drift: (float) not required, relative RMSE drift that triggers a full retrain
+    :param feature_store: (FeatureStore) not required, default is the feature store of the data directory
+    :return: (dict) the new state
+    """
+    feature_store = FeatureStore() if feature_store is None else feature_store
+    snapshots.ingest_snapshot(scrape_date, previous_date, feature_store)
+    df_clean = feature_store.open(scrape_date).get_frame()
+    train_mask, val_mask, holdout_mask = split_by_id(df_clean)
+    X, y = df_clean.drop(columns=['price']), df_clean['price']
+    if not os.path.exists(get_state_file()):
+        return full_train(X[train_mask], y[train_mask], X[holdout_mask], y[holdout_mask],
+                          params=cst.CITIES_XGB_PARAMS, scrape_date=scrape_date)
+
+    state = load_state()
+    if state['scrape_date'] == scrape_date:
+        print("Model is already up to date with snapshot {}".format(scrape_date))
+        return state
+    previous_hashes = snapshots.load_snapshot_outputs(state['scrape_date'])[0]
+    new_hashes = snapshots.load_snapshot_outputs(scrape_date)[0]
+    delta = snapshots.compute_delta(previous_hashes, new_hashes)
+    is_new = df_clean.index.isin(delta['added'].append(delta['changed']))
+    return update_model(X[train_mask & is_new], y[train_mask & is_new], X[val_mask], y[val_mask], X[holdout_mask],
+                        y[holdout_mask], X_full=X[train_mask], y_full=y[train_mask], nb_rounds=nb_rounds,
+                        max_rmse_drift=max_rmse_drift, scrape_date=scrape_date)
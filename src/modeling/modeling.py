@@ -5,8 +5,18 @@ Package to hold functions needed in the modeling phase
 
 @author: nidragedd
 """
+import os
+import json
+import time
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
 
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
@@ -20,7 +30,37 @@ from xgboost import XGBRegressor
 from sklearn.model_selection import RandomizedSearchCV
 from sklearn.model_selection import KFold
 
+from src.modeling import evaluation
+from src.preprocessing.categorical import CategoricalEncoder
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import diskcache
+from src.utils import instrumentation
+
+
+def get_split_dmatrix(split_name, clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Get the XGBoost DMatrix of one split of the listings bundle (see datacollector.save_listing_splits_bundle). The
+    first call builds it from the memory-mapped arrays and saves it in XGBoost binary format next to the bundle, next
+    calls load this binary file directly
+    :param split_name: (string) 'train', 'val' or 'test'
+    :param clean_dir: (string) not required, default is the data clean folder
+    :return: (DMatrix) the split data with its label and feature names
+    """
+    dmatrix_file = os.path.join(datacollector.get_listing_splits_bundle_dir(clean_dir),
+                                cst.LST_SPLITS_DMATRIX_FILE.format(split_name))
+    if os.path.exists(dmatrix_file):
+        return xgb.DMatrix(dmatrix_file)
 
+    splits = datacollector.load_listing_splits_bundle(as_frame=False, clean_dir=clean_dir)
+    i = cst.LST_SPLITS_NAMES.index(split_name)
+    dmatrix = xgb.DMatrix(splits[2 * i], label=splits[2 * i + 1],
+                          feature_names=datacollector.get_listing_splits_columns(clean_dir))
+    dmatrix.save_binary(dmatrix_file)
+    return dmatrix
+
+
+@instrumentation.instrumented()
 def fit_and_run_pipeline(pipeline, model_name, X_train, y_train, X_test, y_test):
     """
     Fit using a pipeline/model on train dataset then predict on test dataset
@@ -32,10 +72,12 @@ def fit_and_run_pipeline(pipeline, model_name, X_train, y_train, X_test, y_test)
     :param y_test: (pandas DataFrame) the real target for test
     :return: predicted target
     """
-    pipeline.fit(X_train, y_train)
+    with instrumentation.stage('fit', model=model_name, rows_in=X_train.shape[0]):
+        pipeline.fit(X_train, y_train)
     # Make predictions using the train and test set
-    y_pred_train = pipeline.predict(X_train)
-    y_pred_test = pipeline.predict(X_test)
+    with instrumentation.stage('predict', model=model_name, rows_in=X_train.shape[0] + X_test.shape[0]):
+        y_pred_train = pipeline.predict(X_train)
+        y_pred_test = pipeline.predict(X_test)
     # Print RMSE values
     print("RMSE for {} model on train: {:.2f}".format(model_name, np.sqrt(mean_squared_error(y_train, y_pred_train))))
     print("RMSE for {} model on test: {:.2f}".format(model_name, np.sqrt(mean_squared_error(y_test, y_pred_test))))
@@ -48,10 +90,8 @@ def get_column_transformer():
     either the mode, either the mean. Other columns will remain without any change.
     :return: the built ColumnTransformer object
     """
-    mode_feat = ['host_is_superhost', 'host_identity_verified', 'bathrooms', 'bedrooms', 'beds', 'security_deposit',
-                 'review_scores_accuracy', 'review_scores_cleanliness', 'review_scores_checkin',
-                 'review_scores_communication', 'review_scores_location', 'review_scores_value', 'review_scores_rating']
-    mean_feat = ['cleaning_fee', 'reviews_per_month']
+    mode_feat = cst.IMPUTATION_MODE_FEATURES
+    mean_feat = cst.IMPUTATION_MEAN_FEATURES
 
     mean_imputation_transformer = Pipeline(steps=[('mean_imputer', SimpleImputer(strategy='mean'))])
     mode_imputation_transformer = Pipeline(steps=[('mode_imputer', SimpleImputer(strategy='most_frequent'))])
@@ -66,23 +106,268 @@ def get_column_transformer():
     return ct_imput
 
 
-def build_xgb_random_search(param_grid, num_iters):
+def build_pipeline(estimator, one_hot_cols=None, scaler=None):
     """
-    Build a sklearn RandomizedSearchCV object with XGBoost regressor
+    Build a sklearn Pipeline made of the imputation ColumnTransformer (see get_column_transformer) and the given model.
+    If categorical columns are given, a fitted one-hot encoder is added as first step so that raw categorical values
+    can be given to the pipeline and are always encoded with the categories seen during training
+    :param estimator: (object) sklearn model or search object (GridSearchCV, RandomizedSearchCV, ...)
+    :param one_hot_cols: (list) not required, categorical columns to one-hot encode
+    :param scaler: (object) not required, sklearn scaler to apply after imputation (such as StandardScaler)
+    :return: the built sklearn Pipeline object
+    """
+    steps = []
+    if one_hot_cols:
+        steps.append(('encoding', CategoricalEncoder(columns=one_hot_cols)))
+    steps.append(('imputation', get_column_transformer()))
+    if scaler is not None:
+        steps.append(('scaler', scaler))
+    steps.append(('estimator', estimator))
+    return Pipeline(steps=steps)
+
+
+class CachedXGBRegressor(XGBRegressor):
+    """
+    XGBRegressor whose fitted models are memoized on disk (see constants CV_CACHE_DIR_PATH): fitting again with the same
+    parameters on the same data (such as the same fold of a cross validation) loads the fitted model instead of training
+    """
+    def fit(self, X, y, **fit_params):
+        """
+        Same as XGBRegressor.fit, with a lookup in the disk cache first
+        :param X: (pandas DataFrame or numpy array) training data
+        :param y: (pandas Series or numpy array) training target
+        :return: self
+        """
+        cache = diskcache.ResultCache(cst.CV_CACHE_DIR_PATH, cst.CV_CACHE_MAX_BYTES)
+        key = diskcache.fingerprint('XGBRegressor.fit', xgb.__version__, self.get_params(), X, y, fit_params)
+        fitted = cache.get(key)
+        if fitted is not None:
+            self.__dict__.update(fitted.__dict__)
+            return self
+        super(CachedXGBRegressor, self).fit(X, y, **fit_params)
+        cache.set(key, self)
+        return self
+
+
+def build_xgb_random_search(param_grid, num_iters, use_cache=True, impute=False):
+    """
+    Build a randomized search with XGBoost regressor (sklearn RandomizedSearchCV, 5 folds). Training data is shared
+    with the workers through a memory-mapped file instead of being copied to each of them (see SharedDataRandomSearch)
     :param param_grid: (dict) the parameters to explore
     :param num_iters: (int) how many parameters will be taken among all possible combinations
-    :return: the built sklearn RandomizedSearchCV object
+    :param use_cache: (boolean) not required, default is True. If True, each (candidate, fold) model is memoized on disk
+    so that running the search again, or extending it, only trains the new candidates
+    :param impute: (boolean) not required, default is False (XGBoost handles missing values). If True, imputation of
+    get_column_transformer is fitted inside each fold, once for all candidates, and best_estimator_ is a Pipeline
+    :return: the built SharedDataRandomSearch object, used as a RandomizedSearchCV (fit, predict, best_estimator_,
+    best_params_, best_score_ and cv_results_)
+    """
+    return SharedDataRandomSearch(param_grid, num_iters, use_cache, impute)
+
+
+def _get_xgb_regressor(use_cache=True):
+    """
+    Inner method that gives the XGBoost regressor explored by the randomized search
+    :param use_cache: (boolean) not required, default is True. See build_xgb_random_search
+    :return: (XGBRegressor) the regressor, not fitted
     """
-    # K-fold cross validator
-    kf = KFold(n_splits=5, shuffle=True, random_state=42)
-    rs = RandomizedSearchCV(estimator=XGBRegressor(objective="reg:squarederror", seed=42, eval_metric='rmse',
-                                                   verbose=False),
-                            param_distributions=param_grid, n_iter=num_iters, iid=False, n_jobs=-1, cv=kf,
-                            scoring='neg_mean_squared_error', refit=True, verbose=1)
-    return rs
+    regressor = CachedXGBRegressor if use_cache else XGBRegressor
+    return regressor(objective="reg:squarederror", seed=42, eval_metric='rmse', verbose=False)
 
 
-def find_best_parameters(dtrain, params, gridsearch_params, param_names, early_stopping_rounds):
+def _save_atomic(path, save_func):
+    """
+    Inner method that writes a file through a temporary file so that concurrent readers never see a partial file
+    :param path: (string) path of the file
+    :param save_func: (function) called with an opened binary file
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        save_func(f)
+    os.replace(tmp_file, path)
+
+
+class FoldImputer(BaseEstimator, TransformerMixin):
+    """
+    Rows of the training data shared on disk (see SharedDataRandomSearch), given by their positions, optionally imputed
+    with get_column_transformer. Fitted imputers and imputed row matrices are saved next to the shared data, keyed by
+    the rows positions: each fold is imputed once, whatever the number of candidates and the worker that evaluates them.
+    Without imputation, rows are read directly from the memory-mapped training data, nothing is written
+    """
+    def __init__(self, data_dir=None, impute=True):
+        """
+        :param data_dir: (string) directory of the shared training data
+        :param impute: (boolean) not required, default is True. If False, rows are given as they are
+        """
+        self.data_dir = data_dir
+        self.impute = impute
+
+    def _get_frame(self, rows):
+        """
+        Inner method that reads some rows of the memory-mapped training data
+        :param rows: (numpy array) positions of the rows
+        :return: (pandas DataFrame) the rows, with the training columns
+        """
+        with open(os.path.join(self.data_dir, cst.SHARED_DATA_COLUMNS_FILE), 'r') as f:
+            columns = json.load(f)
+        x_all = np.load(os.path.join(self.data_dir, cst.SHARED_DATA_X_FILE), mmap_mode='r')
+        return pd.DataFrame(x_all[rows], columns=columns)
+
+    def fit(self, X, y=None):
+        """
+        Fit the imputation on the given rows, or load it if it has already been fitted on the very same rows
+        :param X: (numpy array) positions of the rows, of shape (nb_rows, 1)
+        :param y: not used, present for sklearn API consistency
+        :return: self
+        """
+        rows = np.asarray(X).ravel()
+        self.rows_key_ = diskcache.fingerprint(rows, self.impute)
+        self.imputer_ = None
+        if not self.impute:
+            return self
+        imputer_file = os.path.join(self.data_dir, cst.FOLD_IMPUTER_FILE.format(self.rows_key_))
+        if os.path.exists(imputer_file):
+            with open(imputer_file, 'rb') as f:
+                self.imputer_ = pickle.load(f)
+            return self
+        self.imputer_ = get_column_transformer().fit(self._get_frame(rows))
+        _save_atomic(imputer_file, lambda f: pickle.dump(self.imputer_, f, protocol=pickle.HIGHEST_PROTOCOL))
+        return self
+
+    def transform(self, X):
+        """
+        Give the (imputed) rows. Imputed matrices are saved and memory-mapped so that next candidates reuse them
+        :param X: (numpy array) positions of the rows, of shape (nb_rows, 1)
+        :return: (numpy array) rows
+        """
+        rows = np.asarray(X).ravel()
+        if self.imputer_ is None:
+            return np.load(os.path.join(self.data_dir, cst.SHARED_DATA_X_FILE), mmap_mode='r')[rows]
+        imputed_file = os.path.join(self.data_dir,
+                                    cst.FOLD_IMPUTED_FILE.format(diskcache.fingerprint(self.rows_key_, rows)))
+        if not os.path.exists(imputed_file):
+            imputed = self.imputer_.transform(self._get_frame(rows))
+            _save_atomic(imputed_file, lambda f: np.save(f, imputed))
+        return np.load(imputed_file, mmap_mode='r')
+
+
+class SharedDataRandomSearch(BaseEstimator):
+    """
+    Randomized search of XGBoost parameters (see build_xgb_random_search). The training data is saved once as a
+    memory-mapped array that all workers read: the search itself only sees rows positions, so workers receive these
+    positions instead of a pickled copy of the data. If imputation is required, it is fitted inside each fold, once for
+    all candidates (see FoldImputer). The best candidate is then refitted on the whole training data
+    """
+    def __init__(self, param_grid, num_iters, use_cache=True, impute=False):
+        """
+        :param param_grid: (dict) the XGBoost parameters to explore
+        :param num_iters: (int) how many parameters will be taken among all possible combinations
+        :param use_cache: (boolean) not required, default is True. See build_xgb_random_search
+        :param impute: (boolean) not required, default is False. See build_xgb_random_search
+        """
+        self.param_grid = param_grid
+        self.num_iters = num_iters
+        self.use_cache = use_cache
+        self.impute = impute
+
+    def fit(self, X, y):
+        """
+        Run the search then refit the best candidate on the whole training data
+        :param X: (pandas DataFrame or numpy array) training data
+        :param y: (pandas DataFrame, Series or numpy array) training target
+        :return: self
+        """
+        df_X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(np.asarray(X))
+        data_dir = tempfile.mkdtemp(dir=cst.CACHE_DIR_PATH if os.path.isdir(cst.CACHE_DIR_PATH) else None)
+        try:
+            np.save(os.path.join(data_dir, cst.SHARED_DATA_X_FILE), df_X.to_numpy(dtype=np.float64))
+            with open(os.path.join(data_dir, cst.SHARED_DATA_COLUMNS_FILE), 'w') as f:
+                json.dump([str(col) for col in df_X.columns], f)
+            kf = KFold(n_splits=5, shuffle=True, random_state=42)
+            estimator = Pipeline(steps=[('data', FoldImputer(data_dir, self.impute)),
+                                        ('estimator', _get_xgb_regressor(self.use_cache))])
+            # The best candidate is refitted below, on the given data instead of rows positions
+            search = RandomizedSearchCV(estimator=estimator,
+                                        param_distributions={'estimator__' + k: v for k, v in self.param_grid.items()},
+                                        n_iter=self.num_iters, iid=False, n_jobs=-1, cv=kf,
+                                        scoring='neg_mean_squared_error', refit=False, verbose=1)
+            search.fit(np.arange(df_X.shape[0])[:, None], np.asarray(y).ravel())
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+        self.cv_results_ = search.cv_results_
+        best_index = int(np.argmin(self.cv_results_['rank_test_score']))
+        self.best_params_ = {k[len('estimator__'):]: v for k, v in self.cv_results_['params'][best_index].items()}
+        self.best_score_ = self.cv_results_['mean_test_score'][best_index]
+        regressor = _get_xgb_regressor(self.use_cache).set_params(**self.best_params_)
+        if self.impute:
+            self.best_estimator_ = Pipeline(steps=[('imputation', get_column_transformer()),
+                                                   ('estimator', regressor)]).fit(X, y)
+        else:
+            self.best_estimator_ = regressor.fit(X, y)
+        return self
+
+    def predict(self, X):
+        """
+        :param X: (pandas DataFrame or numpy array) data to predict
+        :return: (numpy array) predictions of the best candidate
+        """
+        return self.best_estimator_.predict(X)
+
+
+# Training data used by _cv_candidate, set once per process (see _init_cv_worker)
+_cv_dtrain = None
+
+
+def _init_cv_worker(dtrain_file):
+    """
+    Inner method called once when a worker process of find_best_parameters starts: load the read-only training data
+    :param dtrain_file: (string) path to the training data saved in XGBoost binary format
+    """
+    global _cv_dtrain
+    _cv_dtrain = xgb.DMatrix(dtrain_file)
+
+
+def _cv_candidate(position, params, num_boost_round, early_stopping_rounds):
+    """
+    Inner method that runs the XGBoost cross validation of one candidate (in the current or in a worker process)
+    :param position: (int) position of the candidate in the grid
+    :param params: (dict) the parameters to use for training
+    :param num_boost_round: (int) maximum number of boosting rounds
+    :param early_stopping_rounds: (int) stop after this number of iterations without significant improvement
+    :return: (dict) position, best RMSE and its round, CV curves and whether CV stopped before num_boost_round
+    """
+    cv_results = xgb.cv(params, _cv_dtrain, num_boost_round=num_boost_round, seed=42, nfold=5, metrics='rmse',
+                        early_stopping_rounds=early_stopping_rounds)
+    test_rmse = np.array(cv_results['test-rmse-mean'])
+    return {'position': position, 'rmse': float(test_rmse.min()), 'boost_rounds': int(np.argmin(test_rmse)),
+            'num_boost_round': num_boost_round, 'finished': len(test_rmse) < num_boost_round,
+            'test_rmse_mean': test_rmse.tolist(), 'train_rmse_mean': np.array(cv_results['train-rmse-mean']).tolist()}
+
+
+def _log_cv_results(log_file, run_id, param_names, candidates, results, pruned):
+    """
+    Inner method that appends the CV curves of a set of candidates to a JSON lines file
+    :param log_file: (string) path to the log file
+    :param run_id: (string) identifier of the find_best_parameters call
+    :param param_names: (list) the list of parameters that vary
+    :param candidates: (list) list of parameters values of each candidate
+    :param results: (list) results of _cv_candidate
+    :param pruned: (set) positions of the candidates eliminated after this round
+    """
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, 'a') as f:
+        for result in results:
+            record = dict(result, run_id=run_id, param_names=param_names,
+                          param_values=list(candidates[result['position']]),
+                          pruned=result['position'] in pruned)
+            f.write(json.dumps(record) + "\n")
+
+
+@instrumentation.instrumented()
+def find_best_parameters(dtrain, params, gridsearch_params, param_names, early_stopping_rounds, nb_workers=1,
+                         halving_min_rounds=None, halving_factor=3, halving_tolerance=0.05,
+                         log_file=None, use_cache=True):
     """
     When using XGBoost python API (so not through sklearn) and its internal cross validation function we need to keep
     track of the best parameters found. This is done here. Some given parameters vary and we keep the best combination
@@ -92,62 +377,143 @@ def find_best_parameters(dtrain, params, gridsearch_params, param_names, early_s
     :param gridsearch_params: (list) list of tuples corresponding to parameters values
     :param param_names: (list) the list of parameters that will vary
     :param early_stopping_rounds: (int) stop after this number of iterations without significant improvement
+    :param nb_workers: (int) not required, default is 1. Number of processes running candidates at the same time, the
+    training data is saved once to a temporary binary file that all workers load
+    :param halving_min_rounds: (int) not required, default is None (all candidates run up to 999 rounds). If given,
+    successive halving is used: all candidates first run this number of boosting rounds, only the best 1/halving_factor
+    run again with halving_factor times more rounds, and so on up to 999 rounds. This is much faster but a candidate
+    that learns slowly (small 'eta' for instance) may be eliminated too soon, a larger first budget limits this risk.
+    xgb.cv cannot continue from previous rounds so each budget runs the remaining candidates again from round 0, the
+    rounds of the smaller budgets come on top of them (a small share of the total as budgets grow geometrically)
+    :param halving_factor: (int) not required, default is 3. Elimination rate of successive halving
+    :param halving_tolerance: (float) not required, default is 0.05. With successive halving, a candidate is never
+    eliminated if its RMSE is within this relative margin of the best RMSE at the same number of rounds
+    :param log_file: (string) not required, default is None (no log). JSON lines file where CV curves of all candidates
+    are appended, such as cst.CV_LOG_FILE
+    :param use_cache: (boolean) not required, default is True. CV results are memoized on disk, keyed by a fingerprint
+    of the training data, the parameters of the candidate and the CV settings: known candidates are not run again
     """
+    global _cv_dtrain
+    candidates = [param_tuple if len(param_names) > 1 else (param_tuple,) for param_tuple in gridsearch_params]
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+
+    def _candidate_params(values):
+        candidate_params = dict(params)
+        candidate_params.update(zip(param_names, values))
+        return candidate_params
+
+    # Budgets of boosting rounds: a single one without successive halving. Each budget is a new CV from round 0
+    budgets = [999]
+    if halving_min_rounds is not None:
+        budgets = [halving_min_rounds]
+        while budgets[-1] * halving_factor < 999:
+            budgets.append(budgets[-1] * halving_factor)
+        budgets.append(999)
+
+    cache = diskcache.ResultCache(cst.CV_CACHE_DIR_PATH, cst.CV_CACHE_MAX_BYTES) if use_cache else None
+    data_fingerprint = diskcache.fingerprint_dmatrix(dtrain) if use_cache else None
+
+    def _cache_key(args):
+        _, candidate_params, num_boost_round, early_stopping = args
+        return diskcache.fingerprint('xgb.cv', xgb.__version__, data_fingerprint, candidate_params, num_boost_round,
+                                     early_stopping, {'seed': 42, 'nfold': 5, 'metrics': 'rmse'})
+
+    tmp_dir = None
+    executor = None
+    if nb_workers > 1:
+        tmp_dir = tempfile.mkdtemp()
+        dtrain_file = os.path.join(tmp_dir, 'dtrain.buffer')
+        dtrain.save_binary(dtrain_file)
+        executor = ProcessPoolExecutor(max_workers=nb_workers, initializer=_init_cv_worker, initargs=(dtrain_file,))
+    else:
+        _cv_dtrain = dtrain
+
+    final_results = {}
+    active = list(range(len(candidates)))
+    try:
+        for budget in budgets:
+            args = [(i, _candidate_params(candidates[i]), budget, early_stopping_rounds) for i in active]
+            results = []
+            if cache is not None:
+                cached = [(arg, cache.get(_cache_key(arg))) for arg in args]
+                results = [dict(result, position=arg[0]) for arg, result in cached if result is not None]
+                args = [arg for arg, result in cached if result is None]
+                if len(results) > 0:
+                    print("{} candidates found in cache for {} boosting rounds".format(len(results), budget))
+            if len(args) == 0:
+                new_results = []
+            elif executor is not None:
+                new_results = list(executor.map(_cv_candidate, *zip(*args)))
+            else:
+                new_results = [_cv_candidate(*arg) for arg in args]
+            if cache is not None:
+                for arg, result in zip(args, new_results):
+                    cache.set(_cache_key(arg), result)
+            results += new_results
+
+            # Candidates that stopped early already have their final result, others may go on with more rounds
+            ongoing = []
+            for result in results:
+                if result['finished'] or budget == budgets[-1]:
+                    final_results[result['position']] = result
+                else:
+                    ongoing.append(result)
+            ongoing.sort(key=lambda r: (r['rmse'], r['position']))
+            # Only the clearly losing ones are eliminated: out of the best 1/halving_factor and worse than the best RMSE
+            # at this budget by more than halving_tolerance
+            nb_kept = int(np.ceil(len(ongoing) / halving_factor))
+            best_rmse = min([r['rmse'] for r in results])
+            pruned = set(r['position'] for r in ongoing[nb_kept:] if r['rmse'] > best_rmse * (1 + halving_tolerance))
+            active = sorted(r['position'] for r in ongoing if r['position'] not in pruned)
+            if len(pruned) > 0:
+                print("{} candidates eliminated after {} boosting rounds".format(len(pruned), budget))
+            if log_file is not None:
+                _log_cv_results(log_file, run_id, param_names, candidates, results, pruned)
+            if len(active) == 0:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        _cv_dtrain = None
+
     # Define initial best params and RMSE
     min_rmse = float("Inf")
     best_params = None
-
-    for param_tuple in gridsearch_params:
+    for position in sorted(final_results):
+        result = final_results[position]
         print("CV run for parameters:")
-        if len(param_names) > 1:
-            for i in range(len(param_names)):
-                print("\t{}: {}".format(param_names[i], param_tuple[i]), end="")
-                # Update our parameters
-                params[param_names[i]] = param_tuple[i]
-        else:
-            print("\t{}: {}".format(param_names[0], param_tuple), end="")
-            # Update our parameters
-            params[param_names[0]] = param_tuple
-
-        # Run CV
-        cv_results = xgb.cv(params, dtrain, num_boost_round=999, seed=42, nfold=5, metrics='rmse',
-                            early_stopping_rounds=early_stopping_rounds)
+        for i in range(len(param_names)):
+            print("\t{}: {}".format(param_names[i], candidates[position][i]), end="")
+        print("\n\tRMSE value: {:.2f} for {} rounds".format(result['rmse'], result['boost_rounds']))
 
         # Check if best and update best RMSE score
-        min_mean_rmse = cv_results['test-rmse-mean'].min()
-        boost_rounds = np.argmin(np.array(cv_results['test-rmse-mean']))
-        print("\n\tRMSE value: {:.2f} for {} rounds".format(min_mean_rmse, boost_rounds))
-
-        if min_mean_rmse < min_rmse:
-            min_rmse = min_mean_rmse
-            best_params = []
-            if len(param_names) > 1:
-                for i in range(len(param_names)):
-                    best_params.append(param_tuple[i])
-            else:
-                best_params.append(param_tuple)
+        if result['rmse'] < min_rmse:
+            min_rmse = result['rmse']
+            best_params = list(candidates[position])
 
     print("Best params{}: {}, RMSE value: {:.2f}".format(param_names, best_params, min_rmse))
     for i in range(len(param_names)):
         params[param_names[i]] = best_params[i]
 
 
-def classify_results(results_df, column):
+def classify_results(results_df, column=None):
     """
     Given a DataFrame containing results and a column name, compute absolute difference between prediction and truth,
     its difference percentage and based on this value, classify it among 1 of the 6 classes
     :param results_df: (pandas DataFrame) results data
-    :param column: (string) the column name corresponding to one model predictions to evaluate
-    :return: the same DataFrame updated with 2 new columns (absolute difference percentage) + class
-    """
-    diff_col = '{}_perc_diff'.format(column)
-    diff_col_class = '{}_perc_diff_class'.format(column)
-    results_df[diff_col] = np.round(100 * (np.abs(results_df['y_true'] - results_df[column])) / results_df['y_true'], 2)
-    results_df[diff_col_class] = results_df[diff_col].apply(
-        lambda x: '6-awful (> 40%)' if x > 40
-        else '5-bad (20% < x < 40%)' if x > 20
-        else '4-acceptable (10% < x < 20%)' if x > 10
-        else '3-good (5% < x < 10%)' if x > 5
-        else '2-pretty good (2% < x < 5%)' if x > 2
-        else '1-very accurate (< 2%)')
+    :param column: (string or list) not required, the column name corresponding to one model predictions to evaluate or
+    a list of such columns. Default is all prediction columns, they are all classified at once
+    :return: the same DataFrame updated with 2 new columns (absolute difference percentage) + class per model
+    """
+    if column is None:
+        columns = evaluation.get_prediction_columns(results_df)
+    else:
+        columns = [column] if isinstance(column, str) else list(column)
+    perc_diff = np.round(evaluation.compute_perc_diff(results_df['y_true'].to_numpy(dtype=np.float64),
+                                                      results_df[columns].to_numpy(dtype=np.float64)), 2)
+    classes = np.array(cst.PRICE_ERROR_CLASSES, dtype=object)[evaluation.get_error_class_codes(perc_diff)]
+    for i, col in enumerate(columns):
+        results_df['{}_perc_diff'.format(col)] = perc_diff[:, i]
+        results_df['{}_perc_diff_class'.format(col)] = classes[:, i]
     return results_df
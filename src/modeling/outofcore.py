@@ -0,0 +1,279 @@
+"""
+Created on 18 october 2026
+
+Package to train XGBoost models on listings splits that do not fit in memory: splits are read from disk chunk by chunk,
+imputed with statistics learnt in a single pass (same strategies as modeling.get_column_transformer) and given to
+XGBoost external memory, so that peak memory is bounded by the chunk size and not by the dataset size
+
+@author: nidragedd
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import instrumentation
+
+_SPLIT_FILES = {'train': (cst.LST_X_TRAIN_FILE, cst.LST_Y_TRAIN_FILE), 'val': (cst.LST_X_VAL_FILE, cst.LST_Y_VAL_FILE),
+                'test': (cst.LST_X_TEST_FILE, cst.LST_Y_TEST_FILE)}
+
+
+def iter_split_chunks(split_name, chunk_size=cst.OOC_CHUNK_SIZE, source='bundle', clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Read one split of the listings dataset by chunks of bounded size
+    :param split_name: (string) 'train', 'val' or 'test'
+    :param chunk_size: (int) not required, number of rows read at once
+    :param source: (string) not required, default is 'bundle' (memory-mapped binary bundle, see
+    datacollector.save_listing_splits_bundle). Can be 'csv' to read the CSV split files
+    :param clean_dir: (string) not required, default is the data clean folder (such as the one of a city or a snapshot)
+    :return: (generator) tuples (pandas DataFrame of features, pandas Series of targets)
+    """
+    if source == 'bundle':
+        bundle_dir = datacollector.get_listing_splits_bundle_dir(clean_dir)
+        with open(os.path.join(bundle_dir, cst.LST_SPLITS_INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        x_all = np.load(os.path.join(bundle_dir, cst.LST_SPLITS_X_FILE), mmap_mode='r')
+        y_all = np.load(os.path.join(bundle_dir, cst.LST_SPLITS_Y_FILE), mmap_mode='r')
+        start, end = index['splits'][split_name]
+        for chunk_start in range(start, end, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, end)
+            # Copied so that only this chunk of the memory-mapped file is held in memory
+            yield (pd.DataFrame(np.array(x_all[chunk_start:chunk_end]), columns=index['columns']),
+                   pd.Series(np.array(y_all[chunk_start:chunk_end])))
+    elif source == 'csv':
+        x_file, y_file = _SPLIT_FILES[split_name]
+        x_reader = pd.read_csv(os.path.join(clean_dir, x_file), sep=',', header=0, chunksize=chunk_size)
+        y_reader = pd.read_csv(os.path.join(clean_dir, y_file), sep=',', header=None, chunksize=chunk_size)
+        for x_chunk, y_chunk in zip(x_reader, y_reader):
+            assert x_chunk.shape[0] == y_chunk.shape[0]
+            yield x_chunk.reset_index(drop=True), y_chunk.iloc[:, 0].reset_index(drop=True)
+    else:
+        raise ValueError("Unknown source '{}', should be 'bundle' or 'csv'".format(source))
+
+
+class ChunkedImputer(object):
+    """
+    Same imputation as modeling.get_column_transformer (mean for some features, most frequent value for others, other
+    columns passed through) but learnt chunk by chunk: sums, counts and values frequencies are accumulated, the dataset
+    is never held in memory. Output columns are in the same order as the ColumnTransformer ones
+    """
+    def __init__(self, mean_features=None, mode_features=None):
+        """
+        :param mean_features: (list) not required, default is cst.IMPUTATION_MEAN_FEATURES
+        :param mode_features: (list) not required, default is cst.IMPUTATION_MODE_FEATURES
+        """
+        self.mean_features = cst.IMPUTATION_MEAN_FEATURES if mean_features is None else mean_features
+        self.mode_features = cst.IMPUTATION_MODE_FEATURES if mode_features is None else mode_features
+        self._sums = {col: 0. for col in self.mean_features}
+        self._counts = {col: 0 for col in self.mean_features}
+        self._frequencies = {col: pd.Series(dtype=np.int64) for col in self.mode_features}
+        self.columns_ = None
+        self.statistics_ = None
+
+    def partial_fit(self, X):
+        """
+        Accumulate the statistics of one chunk
+        :param X: (pandas DataFrame) a chunk of features
+        :return: self
+        """
+        if self.columns_ is None:
+            self.columns_ = X.columns.tolist()
+        assert X.columns.tolist() == self.columns_, "All chunks must have the same columns"
+        for col in self.mean_features:
+            values = X[col].to_numpy(dtype=np.float64)
+            self._sums[col] += np.nansum(values)
+            self._counts[col] += int(np.count_nonzero(~np.isnan(values)))
+        for col in self.mode_features:
+            self._frequencies[col] = self._frequencies[col].add(X[col].value_counts(), fill_value=0)
+        self.statistics_ = None
+        return self
+
+    def fit(self, chunks):
+        """
+        Learn the statistics from all chunks, in a single pass
+        :param chunks: (iterable) chunks of features (pandas DataFrame), or tuples (features, targets) such as the
+        ones given by iter_split_chunks
+        :return: self
+        """
+        for chunk in chunks:
+            self.partial_fit(chunk[0] if isinstance(chunk, tuple) else chunk)
+        return self
+
+    def _get_statistics(self):
+        """
+        Inner method that gives the imputation value of each feature from the accumulated statistics
+        :return: (dict) feature name as key and imputation value as value
+        """
+        if self.statistics_ is None:
+            statistics = {col: self._sums[col] / self._counts[col] if self._counts[col] > 0 else np.nan
+                          for col in self.mean_features}
+            for col in self.mode_features:
+                frequencies = self._frequencies[col]
+                # As SimpleImputer does, ties are broken with the smallest value
+                statistics[col] = frequencies[frequencies == frequencies.max()].index.min() \
+                    if len(frequencies) > 0 else np.nan
+            self.statistics_ = statistics
+        return self.statistics_
+
+    def get_feature_names(self):
+        """
+        :return: (list) names of the output columns: mean imputed features, mode imputed features, then other columns
+        """
+        imputed = self.mean_features + self.mode_features
+        return imputed + [col for col in self.columns_ if col not in imputed]
+
+    def transform(self, X):
+        """
+        Impute one chunk of features
+        :param X: (pandas DataFrame) a chunk of features
+        :return: (numpy array) float32 imputed features, columns ordered as get_feature_names()
+        """
+        return X[self.get_feature_names()].fillna(self._get_statistics()).to_numpy(dtype=np.float32)
+
+
+if hasattr(xgb, 'DataIter'):
+    class _ChunkIterator(xgb.DataIter):
+        """
+        XGBoost data iterator over imputed chunks of a split, pages are cached on disk with the given prefix
+        """
+        def __init__(self, split_name, imputer, chunk_size, source, clean_dir, cache_prefix):
+            self.split_name = split_name
+            self.imputer = imputer
+            self.chunk_size = chunk_size
+            self.source = source
+            self.clean_dir = clean_dir
+            self._chunks = None
+            super(_ChunkIterator, self).__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data):
+            if self._chunks is None:
+                self._chunks = iter_split_chunks(self.split_name, self.chunk_size, self.source, self.clean_dir)
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            input_data(data=self.imputer.transform(chunk[0]), label=chunk[1].to_numpy(dtype=np.float32),
+                       feature_names=self.imputer.get_feature_names())
+            return 1
+
+        def reset(self):
+            self._chunks = None
+
+
+def _write_libsvm(split_name, imputer, chunk_size, source, clean_dir, libsvm_file):
+    """
+    Inner method used with XGBoost versions without data iterators: imputed chunks are appended to a text file in
+    LIBSVM format. Zeros are written explicitly (absent entries mean missing values for XGBoost), missing values are
+    not written
+    """
+    prefixes = ['{}:'.format(i) for i in range(len(imputer.get_feature_names()))]
+    with open(libsvm_file, 'w') as f:
+        for X, y in iter_split_chunks(split_name, chunk_size, source, clean_dir):
+            values = pd.DataFrame(imputer.transform(X))
+            cells = (prefixes + values.astype(str)).where(values.notnull(), '')
+            for label, row in zip(y.astype(str), cells.to_numpy(dtype=object)):
+                f.write(label + ' ' + ' '.join(cell for cell in row if cell) + '\n')
+
+
+def _predict(booster, dmatrix):
+    """
+    Inner method that predicts with the best iteration of the booster when it has been trained with early stopping
+    """
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is None:
+        return booster.predict(dmatrix)
+    if hasattr(xgb, 'DataIter'):
+        return booster.predict(dmatrix, iteration_range=(0, int(best_iteration) + 1))
+    return booster.predict(dmatrix, ntree_limit=booster.best_ntree_limit)
+
+
+def _parse_eval(eval_result):
+    """
+    Inner method that parses the result of Booster.eval, such as '[0]\tvalidation-rmse:61.05'
+    :param eval_result: (string) the evaluation result
+    :return: (dict) metric name (such as 'validation-rmse') as key and its value
+    """
+    metrics = [item.rsplit(':', 1) for item in eval_result.strip().split('\t')[1:]]
+    return {name: float(value) for name, value in metrics}
+
+
+@instrumentation.instrumented()
+def build_external_dmatrix(split_name, imputer, chunk_size=cst.OOC_CHUNK_SIZE, source='bundle',
+                           cache_dir=cst.OOC_CACHE_DIR_PATH, clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Build an external memory DMatrix for one split: chunks are read, imputed and paged to the cache directory by XGBoost
+    :param split_name: (string) 'train', 'val' or 'test'
+    :param imputer: (ChunkedImputer) fitted imputer
+    :param chunk_size: (int) not required, number of rows read at once
+    :param source: (string) not required, 'bundle' or 'csv' (see iter_split_chunks)
+    :param cache_dir: (string) not required, directory of the XGBoost cache pages
+    :param clean_dir: (string) not required, directory of the splits (see iter_split_chunks)
+    :return: (DMatrix) the split data
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_prefix = os.path.join(cache_dir, split_name)
+    if hasattr(xgb, 'DataIter'):
+        return xgb.DMatrix(_ChunkIterator(split_name, imputer, chunk_size, source, clean_dir, cache_prefix))
+
+    libsvm_file = cache_prefix + '.libsvm'
+    _write_libsvm(split_name, imputer, chunk_size, source, clean_dir, libsvm_file)
+    dmatrix = xgb.DMatrix('{}#{}.cache'.format(libsvm_file, cache_prefix))
+    dmatrix.feature_names = imputer.get_feature_names()
+    return dmatrix
+
+
+@instrumentation.instrumented()
+def train_out_of_core(params, num_boost_round, early_stopping_rounds=None, chunk_size=cst.OOC_CHUNK_SIZE,
+                      source='bundle', imputer=None, clean_dir=cst.CLEAN_DATA_DIR_PATH,
+                      cache_dir=cst.OOC_CACHE_DIR_PATH):
+    """
+    Train an XGBoost model on the train split with the validation split as evaluation set, both read by chunks
+    :param params: (dict) XGBoost parameters. Default tree method is 'hist' ('approx' for XGBoost versions without data
+    iterators) as the exact method does not support external memory
+    :param num_boost_round: (int) maximum number of boosting rounds
+    :param early_stopping_rounds: (int) not required, default is None (no early stopping)
+    :param chunk_size: (int) not required, number of rows read at once
+    :param source: (string) not required, 'bundle' or 'csv' (see iter_split_chunks)
+    :param imputer: (ChunkedImputer) not required, if not given it is fitted on the train split (one more pass)
+    :param clean_dir: (string) not required, directory of the splits (see iter_split_chunks)
+    :param cache_dir: (string) not required, directory of the XGBoost cache pages
+    :return: (tuple) trained Booster, fitted ChunkedImputer
+    """
+    if imputer is None:
+        imputer = ChunkedImputer().fit(iter_split_chunks('train', chunk_size, source, clean_dir))
+    params = dict(params)
+    params.setdefault('tree_method', 'hist' if hasattr(xgb, 'DataIter') else 'approx')
+
+    dtrain = build_external_dmatrix('train', imputer, chunk_size, source, cache_dir, clean_dir)
+    dval = build_external_dmatrix('val', imputer, chunk_size, source, cache_dir, clean_dir)
+    booster = xgb.train(params, dtrain, num_boost_round=num_boost_round,
+                        evals=[(dtrain, 'train'), (dval, 'validation')], early_stopping_rounds=early_stopping_rounds,
+                        verbose_eval=False)
+    best_score = booster.attr('best_score')
+    val_rmse = float(best_score) if best_score is not None \
+        else _parse_eval(booster.eval(dval, 'validation'))['validation-rmse']
+    print("Model trained out-of-core on {} rows, validation RMSE: {:.2f}".format(dtrain.num_row(), val_rmse))
+    return booster, imputer
+
+
+def predict_out_of_core(booster, imputer, split_name='test', chunk_size=cst.OOC_CHUNK_SIZE, source='bundle',
+                        clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Predict one split chunk by chunk
+    :param booster: (Booster) trained model (see train_out_of_core)
+    :param imputer: (ChunkedImputer) imputer fitted on the train split
+    :param split_name: (string) not required, default is 'test'
+    :param chunk_size: (int) not required, number of rows read at once
+    :param source: (string) not required, 'bundle' or 'csv' (see iter_split_chunks)
+    :param clean_dir: (string) not required, directory of the splits (see iter_split_chunks)
+    :return: (tuple) numpy arrays of predictions and of true values
+    """
+    predictions, truth = [], []
+    for X, y in iter_split_chunks(split_name, chunk_size, source, clean_dir):
+        dmatrix = xgb.DMatrix(imputer.transform(X), feature_names=imputer.get_feature_names())
+        predictions.append(_predict(booster, dmatrix))
+        truth.append(y.to_numpy())
+    return np.concatenate(predictions), np.concatenate(truth)
@@ -0,0 +1,142 @@
+"""
+Created on 18 october 2026
+
+Package to export a trained XGBoost price model (and the imputation values fitted by modeling.get_column_transformer)
+into plain NumPy arrays, so that it can be scored by serving.treemodel.TreeModel without xgboost nor sklearn
+
+@author: nidragedd
+"""
+import os
+import json
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+
+from src.utils import constants as cst
+
+
+def _get_base_score(booster, default=0.5):
+    """
+    Inner method that gives the global bias added to the sum of the trees
+    :param booster: (Booster) the trained booster
+    :param default: (float) not required, value used when the booster does not save its configuration (old versions)
+    :return: (float) the base score
+    """
+    if not hasattr(booster, 'save_config'):
+        return default
+    learner = json.loads(booster.save_config())['learner']
+    objective = learner['objective']['name']
+    assert objective in ('reg:squarederror', 'reg:linear'), "Objective {} is not supported".format(objective)
+    # Recent versions store it as a vector ('[1.2E2]'), one value per target
+    return float(learner['learner_model_param']['base_score'].strip('[]'))
+
+
+def _split_models(model, imputer):
+    """
+    Inner method that gives the booster and the imputation ColumnTransformer of a model
+    :param model: (object) fitted Pipeline (imputation + XGBRegressor), XGBRegressor or Booster
+    :param imputer: (ColumnTransformer) fitted imputer, required if the model is not a Pipeline
+    :return: (tuple) booster, imputer, default base score
+    """
+    if isinstance(model, Pipeline):
+        imputers = [step for _, step in model.steps[:-1] if isinstance(step, ColumnTransformer)]
+        assert len(imputers) <= 1, "Only one imputation step is supported"
+        imputer = imputers[0] if imputers else imputer
+        model = model.steps[-1][1]
+    if hasattr(model, 'get_booster'):
+        base_score = getattr(model, 'base_score', None)
+        return model.get_booster(), imputer, 0.5 if base_score is None else base_score
+    return model, imputer, 0.5
+
+
+def get_imputation_arrays(imputer, columns):
+    """
+    Flatten a fitted imputation ColumnTransformer (see modeling.get_column_transformer)
+    :param imputer: (ColumnTransformer) fitted imputer, None means no imputation
+    :param columns: (list) input features, in the order the imputer was fitted with
+    :return: (tuple) positions of the input features in the imputer output order (numpy array), and values used to
+    fill the missing values of each output feature (numpy array, NaN for features that are not imputed)
+    """
+    if imputer is None:
+        return np.arange(len(columns)), np.full(len(columns), np.nan)
+    positions, fill_values = [], []
+    for name, transformer, transformer_columns in imputer.transformers_:
+        if transformer == 'drop' or len(transformer_columns) == 0:
+            continue
+        transformer_columns = [columns[c] if isinstance(c, (int, np.integer)) else c for c in transformer_columns]
+        positions.extend(columns.index(c) for c in transformer_columns)
+        imputation = transformer.steps[-1][1] if isinstance(transformer, Pipeline) else transformer
+        # Recent sklearn versions replace 'passthrough' by an identity FunctionTransformer once fitted
+        if transformer == 'passthrough' or not hasattr(imputation, 'statistics_'):
+            fill_values.extend([np.nan] * len(transformer_columns))
+        else:
+            assert len(imputation.statistics_) == len(transformer_columns), "Step {} dropped features".format(name)
+            fill_values.extend(imputation.statistics_)
+    return np.asarray(positions, dtype=np.int64), np.asarray(fill_values, dtype=np.float64)
+
+
+def flatten_trees(booster):
+    """
+    Flatten all trees of a booster into arrays indexed by node, nodes of all trees being numbered one after another.
+    Leaves point to themselves so that a traversal can run for a fixed number of steps
+    :param booster: (Booster) the trained booster
+    :return: (tuple) roots (int32 array, one per tree), splits (int32 array of shape (nb_nodes, 4): feature, child if
+    value < threshold, child otherwise, child if value is missing), values (float32 array of shape (nb_nodes, 2):
+    threshold, leaf value) and maximum depth of the trees
+    """
+    names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(names)} if names is not None else {}
+    roots, splits, values = [], [], []
+    max_depth = 0
+    offset = 0
+    for dump in booster.get_dump(dump_format='json'):
+        stack = [(json.loads(dump), 0)]
+        nodes = {}
+        while stack:
+            node, depth = stack.pop()
+            nodes[node['nodeid']] = node
+            max_depth = max(max_depth, depth)
+            stack.extend((child, depth + 1) for child in node.get('children', []))
+        # Node ids of a tree are not always contiguous (pruned nodes), gaps become unreachable leaves
+        nb_nodes = max(nodes) + 1
+        tree_splits = np.repeat(np.arange(offset, offset + nb_nodes, dtype=np.int32)[:, None], 4, axis=1)
+        tree_splits[:, 0] = 0
+        tree_values = np.zeros((nb_nodes, 2), dtype=np.float32)
+        for node_id, node in nodes.items():
+            if 'leaf' in node:
+                tree_values[node_id, 1] = node['leaf']
+                continue
+            split = node['split']
+            tree_splits[node_id] = [feature_index[split] if split in feature_index else int(split[1:]),
+                                    offset + node['yes'], offset + node['no'], offset + node['missing']]
+            tree_values[node_id, 0] = node['split_condition']
+        roots.append(offset)
+        splits.append(tree_splits)
+        values.append(tree_values)
+        offset += nb_nodes
+    return np.asarray(roots, dtype=np.int32), np.concatenate(splits), np.concatenate(values), max_depth
+
+
+def export_tree_model(model, columns, imputer=None, model_dir=cst.TREE_MODEL_DIR_PATH):
+    """
+    Export a trained price model as NumPy arrays (loaded by serving.treemodel.TreeModel)
+    :param model: (object) fitted Pipeline (imputation + XGBRegressor), XGBRegressor or Booster
+    :param columns: (list) input features, in the order expected by the model
+    :param imputer: (ColumnTransformer) not required, fitted imputer if the model is not a Pipeline that contains it
+    :param model_dir: (string) not required, directory where the arrays are saved
+    """
+    booster, imputer, default_base_score = _split_models(model, imputer)
+    columns = list(columns)
+    positions, fill_values = get_imputation_arrays(imputer, columns)
+    roots, splits, values, max_depth = flatten_trees(booster)
+    assert splits[:, 0].max() < len(positions), "Model uses more features than given columns"
+
+    os.makedirs(model_dir, exist_ok=True)
+    np.save(os.path.join(model_dir, cst.TREE_MODEL_SPLITS_FILE), splits)
+    np.save(os.path.join(model_dir, cst.TREE_MODEL_VALUES_FILE), values)
+    np.save(os.path.join(model_dir, cst.TREE_MODEL_FILL_VALUES_FILE), fill_values)
+    with open(os.path.join(model_dir, cst.TREE_MODEL_INDEX_FILE), 'w') as f:
+        json.dump({'columns': columns, 'feature_positions': positions.tolist(), 'roots': roots.tolist(),
+                   'max_depth': max_depth, 'base_score': _get_base_score(booster, default_base_score)}, f)
+    print("{} trees ({} nodes) exported to {} folder".format(len(roots), len(splits), model_dir))
@@ -0,0 +1,195 @@
+"""
+Created on 18 october 2026
+
+Run the whole pipeline of this project (collect, clean, split, train, evaluate) for many cities at once, one city per
+worker process. Every city works in its own directory tree '<root>/<city>/<scrape date>/data', laid out as the data
+directory of the constants file (cache, clean data, results...): these directories are given explicitly to each step so
+that they are never shared between cities
+
+@author: nidragedd
+"""
+import os
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+from src.modeling import evaluation
+from src.modeling import modeling
+from src.preprocessing import cleaning
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import instrumentation
+from src.utils.featurestore import FeatureStore
+
+
+def get_city_dir(city, scrape_date, root_dir=cst.CITIES_DIR_PATH):
+    """
+    :param city: (string) name of the city, key of cst.CITIES
+    :param scrape_date: (string) scrape date of the snapshot, such as '2019-07-09'
+    :param root_dir: (string) not required, directory of all cities
+    :return: (string) absolute path to the directory of the given city and scrape date
+    """
+    return os.path.abspath(os.path.join(root_dir, city, scrape_date))
+
+
+def get_city_data_dirs(city, scrape_date, root_dir=cst.CITIES_DIR_PATH):
+    """
+    Get the data directories of a given city and scrape date, same layout as the data directory of the constants file
+    :param city: (string) name of the city, key of cst.CITIES
+    :param scrape_date: (string) scrape date of the snapshot, such as '2019-07-09'
+    :param root_dir: (string) not required, directory of all cities
+    :return: (dict) absolute paths, keys are 'data', 'cache', 'clean', 'results' and 'features'
+    """
+    data_dir = os.path.join(get_city_dir(city, scrape_date, root_dir), 'data')
+    return {'data': data_dir,
+            'cache': os.path.join(data_dir, os.path.relpath(cst.CACHE_DIR_PATH, cst.DATA_DIR_PATH)),
+            'clean': os.path.join(data_dir, os.path.relpath(cst.CLEAN_DATA_DIR_PATH, cst.DATA_DIR_PATH)),
+            'results': os.path.join(data_dir, os.path.relpath(cst.RESULTS_DIR_PATH, cst.DATA_DIR_PATH)),
+            'features': os.path.join(data_dir, os.path.relpath(cst.FEATURE_STORE_DIR_PATH, cst.DATA_DIR_PATH))}
+
+
+def split_listings(df_clean, test_size=0.1, val_size=0.1, random_state=42):
+    """
+    Split cleaned listings into train, validation and test datasets the same way the Data Preparation notebook does
+    :param df_clean: (pandas DataFrame) cleaned listings (see cleaning.clean_listings)
+    :param test_size: (float) not required, share of the listings kept for test
+    :param val_size: (float) not required, share of the remaining listings kept for validation
+    :param random_state: (int) not required, random seed
+    :return: (list) X_train, y_train, X_val, y_val, X_test, y_test
+    """
+    X = df_clean.drop(['price'], axis=1)
+    y = df_clean['price']
+    X_train_val, X_test, y_train_val, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state,
+                                                                shuffle=True)
+    X_train, X_val, y_train, y_val = train_test_split(X_train_val, y_train_val, test_size=val_size,
+                                                      random_state=random_state, shuffle=True)
+    return [X_train, y_train, X_val, y_val, X_test, y_test]
+
+
+def run_city_pipeline(city, scrape_date, root_dir=cst.CITIES_DIR_PATH, download=True, xgb_params=None):
+    """
+    Run the whole pipeline for one city, in the current process. Raw listings must already be in the data directory of
+    the city if download is False
+    :param city: (string) name of the city, key of cst.CITIES
+    :param scrape_date: (string) scrape date of the snapshot, such as '2019-07-09'
+    :param root_dir: (string) not required, directory of all cities
+    :param download: (boolean) not required, default is True. If False, the collect step is skipped
+    :param xgb_params: (dict) not required, parameters of the XGBoost model, default is cst.CITIES_XGB_PARAMS
+    :return: (dict) summary of the run: timings of each step (in seconds), sizes and metrics on the test split
+    """
+    summary = {'city': city, 'scrape_date': scrape_date, 'status': 'ok', 'error': None}
+    dirs = get_city_data_dirs(city, scrape_date, root_dir)
+    start = time.perf_counter()
+    step = None
+    try:
+        step = 'collect'
+        t0 = time.perf_counter()
+        with instrumentation.stage('city.collect', city=city):
+            if download:
+                data_base_url = cst.INSIDE_AIRBNB_URL + cst.CITIES[city] + "/" + scrape_date + "/"
+                datacollector.collect_data([url_file for url_file in datacollector.get_files_urls(data_base_url)
+                                            if url_file[1] == cst.LISTING_FULL_FILE], dirs['data'])
+        summary['collect_s'] = time.perf_counter() - t0
+
+        step = 'clean'
+        t0 = time.perf_counter()
+        with instrumentation.stage('city.clean', city=city):
+            df = datacollector.load_data_file(cst.LISTING_FULL_FILE, schema=cleaning.get_listings_input_schema(),
+                                              data_dir=dirs['data'], cache_dir=dirs['cache'])
+            summary['nb_listings'] = df.shape[0]
+            summary['amenities_threshold'] = cleaning.get_amenities_threshold(df.shape[0])
+            df_clean = cleaning.clean_listings(df.set_index(df['id'].to_numpy()), verbose=False)
+            # Listings without price cannot be used to train nor to evaluate
+            df_clean = df_clean[df_clean['price'].notnull()]
+            del df
+            feature_store = FeatureStore(dirs['features'])
+            feature_store.write_snapshot(scrape_date, df_clean)
+            del df_clean
+        summary['clean_s'] = time.perf_counter() - t0
+
+        step = 'split'
+        t0 = time.perf_counter()
+        with instrumentation.stage('city.split', city=city):
+            # Training and evaluation read the precomputed features of the feature store
+            splits = split_listings(feature_store.open(scrape_date).get_frame())
+            datacollector.save_listing_splits(splits, dirs['clean'])
+            X_train, y_train, X_val, y_val, X_test, y_test = splits
+        summary['nb_features'] = X_train.shape[1]
+        summary['split_s'] = time.perf_counter() - t0
+
+        step = 'train'
+        t0 = time.perf_counter()
+        params = dict(cst.CITIES_XGB_PARAMS if xgb_params is None else xgb_params)
+        pipeline = modeling.build_pipeline(XGBRegressor(**params))
+        y_pred_test = modeling.fit_and_run_pipeline(pipeline, "XGBoost ({})".format(city), X_train, y_train, X_test,
+                                                    y_test)
+        summary['train_s'] = time.perf_counter() - t0
+
+        step = 'evaluate'
+        t0 = time.perf_counter()
+        results_df = pd.DataFrame({'y_true': y_test.to_numpy(), 'y_xgboost': y_pred_test})
+        datacollector.save_price_predictions_results(results_df, dirs['results'])
+        df_eval = evaluation.evaluate_predictions(results_df)
+        for metric in evaluation.METRICS:
+            summary[metric] = df_eval.loc['y_xgboost', metric]
+        summary['share_within_10_perc'] = df_eval.loc['y_xgboost', cst.PRICE_ERROR_CLASSES[:3]].sum() / y_test.shape[0]
+        summary['evaluate_s'] = time.perf_counter() - t0
+    except Exception as e:
+        summary['status'] = 'failed at step {}'.format(step)
+        summary['error'] = '{}: {}'.format(type(e).__name__, e)
+        traceback.print_exc()
+    summary['total_s'] = time.perf_counter() - start
+    return summary
+
+
+def run_cities(cities, root_dir=cst.CITIES_DIR_PATH, nb_workers=None, download=True, xgb_params=None):
+    """
+    Run the whole pipeline for several cities concurrently, on a pool of processes. A failing city does not stop the
+    others, its error is reported in the summary
+    :param cities: (list) tuples (city, scrape date), such as [('paris', '2019-07-09'), ('lyon', '2019-07-12')]
+    :param root_dir: (string) not required, directory of all cities
+    :param nb_workers: (int) not required, number of cities processed at the same time. Default is one per CPU (at most
+    one per city)
+    :param download: (boolean) not required, default is True. If False, raw listings must already be there
+    :param xgb_params: (dict) not required, parameters of the XGBoost models, default is cst.CITIES_XGB_PARAMS
+    :return: (pandas DataFrame) summary with one row per city, also saved as CSV in the root directory
+    """
+    root_dir = os.path.abspath(root_dir)
+    nb_workers = min(len(cities), os.cpu_count() or 1) if nb_workers is None else nb_workers
+    params = dict(cst.CITIES_XGB_PARAMS if xgb_params is None else xgb_params)
+    # CPUs are shared between the cities running at the same time
+    params.setdefault('n_jobs', max(1, (os.cpu_count() or 1) // nb_workers))
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        futures = {executor.submit(run_city_pipeline, city, scrape_date, root_dir, download, params): city
+                   for city, scrape_date in cities}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            print("City {} done in {:.1f}s: {}{}".format(summary['city'], summary['total_s'], summary['status'],
+                                                        "" if summary['error'] is None
+                                                        else " ({})".format(summary['error'])))
+
+    df_summary = pd.DataFrame(summaries).sort_values(['city', 'scrape_date']).reset_index(drop=True)
+    os.makedirs(root_dir, exist_ok=True)
+    df_summary.to_csv(os.path.join(root_dir, cst.CITIES_SUMMARY_FILE), index=False)
+    nb_failed = int(np.sum(df_summary['status'] != 'ok'))
+    print("{} cities processed, {} failed. Summary saved to {}".format(len(cities), nb_failed, root_dir))
+    return df_summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the listings price pipeline for several cities")
+    parser.add_argument('cities', nargs='+', help="'city:scrape_date' pairs, such as paris:2019-07-09")
+    parser.add_argument('--root-dir', default=cst.CITIES_DIR_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-download', action='store_true')
+    args = parser.parse_args()
+    run_cities([tuple(c.split(':')) for c in args.cities], args.root_dir, args.workers, not args.no_download)
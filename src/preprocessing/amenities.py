@@ -0,0 +1,138 @@
+"""
+Created on 18 october 2026
+
+Package to hold the amenities encoder: the raw 'amenities' feature ('{TV,Wifi,"Air conditioning"}') is tokenized once
+and encoded as a sparse indicator matrix with one column per amenity
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+def tokenize_amenities(amenities):
+    """
+    Split the raw amenities strings into one row per (listing position, amenity) in a single vectorized pass
+    :param amenities: (pandas Series) raw amenities strings such as '{TV,Wifi,"Air conditioning"}'
+    :return: (tuple) array of listing positions, array of amenity names (same length)
+    """
+    tokens = amenities.reset_index(drop=True).str.strip('{}').str.replace('"', '').str.split(',').explode()
+    tokens = tokens[tokens.notnull() & (tokens != '')]
+    return tokens.index.to_numpy(), tokens.to_numpy(dtype=object)
+
+
+class AmenitiesEncoder(BaseEstimator, TransformerMixin):
+    """
+    Learn the amenities vocabulary and how many listings have each amenity, then encode any batch of listings as a
+    sparse 0/1 matrix restricted to amenities owned by at least min_count listings of the fitted data
+    """
+    def __init__(self, min_count=1):
+        """
+        :param min_count: (int) not required, default is 1. Amenities with less listings than this value are dropped
+        """
+        self.min_count = min_count
+
+    def fit(self, amenities, y=None):
+        """
+        Learn the vocabulary (sorted alphabetically, as pandas get_dummies does) and the frequency of each amenity
+        :param amenities: (pandas Series) raw amenities strings
+        :param y: not used, present for sklearn API consistency
+        :return: self
+        """
+        rows, tokens = tokenize_amenities(amenities)
+        # Hash-based factorization, only the (small) vocabulary is sorted
+        codes, uniques = pd.factorize(tokens)
+        order = np.argsort(uniques.astype(str))
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order))
+        indicators = sparse.csr_matrix((np.ones(len(codes), dtype=np.int32), (rows, ranks[codes])),
+                                       shape=(amenities.shape[0], len(uniques)))
+        # A listing can declare the same amenity twice, it must be counted once: duplicates are summed in a single
+        # cell of the sparse matrix, so counting non-zero cells per column counts listings
+        self.all_vocabulary_ = uniques.astype(str)[order]
+        self.all_counts_ = np.bincount(indicators.indices, minlength=len(uniques))
+        self.nb_listings_ = amenities.shape[0]
+        self._select(self.min_count)
+        return self
+
+    def fit_from_dummies(self, df_dummies):
+        """
+        Learn the vocabulary and frequencies from an already one-hot encoded amenities dataset (one vectorized column
+        sum)
+        :param df_dummies: (pandas DataFrame) 0/1 dataset with one column per amenity
+        :return: self
+        """
+        counts = df_dummies.sum(axis=0)
+        self.all_vocabulary_ = counts.index.to_numpy(dtype=object)
+        self.all_counts_ = counts.to_numpy()
+        self.nb_listings_ = df_dummies.shape[0]
+        self._select(self.min_count)
+        return self
+
+    def _select(self, min_count):
+        """
+        Inner method that restricts the encoded amenities to those owned by at least min_count listings
+        :param min_count: (int) minimum number of listings
+        """
+        kept = self.all_counts_ >= min_count
+        self.min_count = min_count
+        self.vocabulary_ = self.all_vocabulary_[kept]
+        self.counts_ = self.all_counts_[kept]
+
+    def set_min_count(self, min_count):
+        """
+        Change the threshold of a fitted encoder without tokenizing the training data again
+        :param min_count: (int) minimum number of listings
+        :return: self
+        """
+        self._select(min_count)
+        return self
+
+    def transform(self, amenities):
+        """
+        Encode raw amenities with the fitted vocabulary. Amenities unknown (or dropped) at fit time are ignored
+        :param amenities: (pandas Series) raw amenities strings
+        :return: (scipy sparse csr_matrix) uint8 matrix of shape (nb listings, nb amenities kept)
+        """
+        rows, tokens = tokenize_amenities(amenities)
+        cols = pd.Index(self.vocabulary_).get_indexer(tokens)
+        known = cols >= 0
+        matrix = sparse.csr_matrix((np.ones(known.sum(), dtype=np.uint8), (rows[known], cols[known])),
+                                   shape=(amenities.shape[0], len(self.vocabulary_)))
+        # Duplicates have been summed by the constructor, indicators must remain 0/1
+        matrix.data[:] = 1
+        return matrix
+
+    def get_feature_names(self):
+        """
+        :return: (list) names of the encoded amenities, in the same order as the columns of the transform output
+        """
+        return self.vocabulary_.tolist()
+
+    def get_frequencies(self):
+        """
+        :return: (pandas DataFrame) all amenities found at fit time as index and the number of listings as 'amen_sum'
+        """
+        return pd.DataFrame({'amen_sum': self.all_counts_}, index=self.all_vocabulary_)
+
+    def nb_features_above(self, thresholds):
+        """
+        Number of amenities that would be kept for each threshold (strictly more listings than the threshold), answered
+        from the sorted array of frequencies
+        :param thresholds: (list) threshold values
+        :return: (list) number of amenities kept per threshold
+        """
+        sorted_counts = np.sort(self.all_counts_)
+        return (len(sorted_counts) - np.searchsorted(sorted_counts, thresholds, side='right')).tolist()
+
+    def to_frame(self, amenities, index=None):
+        """
+        Encode raw amenities and return them as a dense pandas DataFrame with one column per kept amenity
+        :param amenities: (pandas Series) raw amenities strings
+        :param index: not required, index of the built DataFrame. Default is the index of the given Series
+        :return: (pandas DataFrame) uint8 0/1 dataset
+        """
+        return pd.DataFrame(self.transform(amenities).toarray(), columns=self.get_feature_names(),
+                            index=amenities.index if index is None else index)
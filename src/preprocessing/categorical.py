@@ -0,0 +1,86 @@
+"""
+Created on 18 october 2026
+
+Package to hold the one-hot encoder of categorical features: categories are learnt once on the training data so that
+train, validation, test or a single listing to price are always encoded with the very same columns
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class CategoricalEncoder(BaseEstimator, TransformerMixin):
+    """
+    One-hot encode some columns of a pandas DataFrame with categories learnt at fit time. Dummy columns are named and
+    ordered as pandas get_dummies does ('<column>_<category>'), other columns are kept and stay first
+    """
+    def __init__(self, columns=None, output='frame', handle_unknown='ignore'):
+        """
+        :param columns: (list) columns to one-hot encode
+        :param output: (string) not required, default is 'frame' (DataFrame with uint8 dummies). Can be 'sparse' to get
+        a scipy csr_matrix (other columns must then be numeric)
+        :param handle_unknown: (string) not required, default is 'ignore': a category unseen at fit time gives 0 for
+        all dummies of its column (same as a missing value). Can be 'error' to raise a ValueError instead
+        """
+        self.columns = columns
+        self.output = output
+        self.handle_unknown = handle_unknown
+
+    def fit(self, X, y=None):
+        """
+        Learn the sorted categories of each column to encode
+        :param X: (pandas DataFrame) data that contains the columns to encode
+        :param y: not used, present for sklearn API consistency
+        :return: self
+        """
+        self.categories_ = {col: np.sort(X[col].dropna().unique().astype(object)) for col in self.columns}
+        self.other_columns_ = [col for col in X.columns if col not in self.columns]
+        self.dummy_columns_ = ['{}_{}'.format(col, cat) for col in self.columns for cat in self.categories_[col]]
+        return self
+
+    def _codes(self, X):
+        """
+        Inner method that gives, for each row and each encoded column, the index of the dummy column to set to 1
+        :param X: (pandas DataFrame) data to encode
+        :return: (tuple) arrays of row positions and dummy column positions
+        """
+        rows, cols = [], []
+        offset = 0
+        for col in self.columns:
+            categories = self.categories_[col]
+            codes = pd.Index(categories).get_indexer(X[col].astype(object))
+            unknown = (codes < 0) & X[col].notnull().to_numpy()
+            if self.handle_unknown == 'error' and unknown.any():
+                raise ValueError("Unknown categories {} for column '{}'".format(X[col][unknown].unique().tolist(), col))
+            found = np.flatnonzero(codes >= 0)
+            rows.append(found)
+            cols.append(codes[found] + offset)
+            offset += len(categories)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def transform(self, X):
+        """
+        One-hot encode the given data with the categories learnt at fit time, dummies are built in a single allocation
+        :param X: (pandas DataFrame) data to encode
+        :return: (pandas DataFrame or scipy csr_matrix) encoded data, depending on the 'output' parameter
+        """
+        rows, cols = self._codes(X)
+        shape = (X.shape[0], len(self.dummy_columns_))
+        if self.output == 'sparse':
+            dummies = sparse.csr_matrix((np.ones(len(rows), dtype=np.uint8), (rows, cols)), shape=shape)
+            others = sparse.csr_matrix(X[self.other_columns_].to_numpy(dtype=np.float64))
+            return sparse.hstack([others, dummies], format='csr')
+
+        dummies = np.zeros(shape, dtype=np.uint8)
+        dummies[rows, cols] = 1
+        return pd.concat([X[self.other_columns_], pd.DataFrame(dummies, columns=self.dummy_columns_, index=X.index)],
+                         axis=1)
+
+    def get_feature_names(self):
+        """
+        :return: (list) names of the output columns, in the same order as the transform output
+        """
+        return self.other_columns_ + self.dummy_columns_
@@ -5,77 +5,193 @@ Utility package used by notebooks to clean data
 
 @author: nidragedd
 """
+import numpy as np
 import pandas as pd
 
+from src.preprocessing.amenities import AmenitiesEncoder
+from src.preprocessing.categorical import CategoricalEncoder
+from src.utils import constants as cst
+from src.utils import instrumentation
 
-def drop_cols(df, cols_to_drop):
+
+@instrumentation.instrumented()
+def drop_cols(df, cols_to_drop, verbose=True):
     """
     Drop given columns from given pandas DataFrame + coherence control for the operation
     :param df: (pandas DataFrame) the dataset to transform
     :param cols_to_drop: (list) columns that will be removed
+    :param verbose: (boolean) not required, default is True. If False, the new shape is not printed
     :return: a new dataset without the columns
     """
     df_lst_reduced = df.drop(cols_to_drop, axis=1)
     # Coherence control
     assert df_lst_reduced.shape[1] == df.shape[1] - len(cols_to_drop)
-    print("After column dropping, new shape is now {}".format(df_lst_reduced.shape))
+    if verbose:
+        print("After column dropping, new shape is now {}".format(df_lst_reduced.shape))
 
     return df_lst_reduced
 
 
-def clean_currency_columns(df, columns):
+@instrumentation.instrumented()
+def clean_currency_columns(df, columns, dtype="float64", inplace=True):
     """
-    Clean 2 columns related to price in the calendar dataset
+    Clean columns related to price (such as the 2 ones in the calendar dataset). The currency symbol and the ','
+    thousands separator are removed in a single vectorized string operation over the distinct values of each column
     :param df: (pandas DataFrame) the dataset to transform
     :param columns: (list) columns with currency to clean
+    :param dtype: (string) not required, default is "float64". Numeric type of the cleaned columns ("float32" halves
+    the memory footprint)
+    :param inplace: (boolean) not required, default is True. If False, the given dataset is left untouched
     :return: transformed dataset, NaN are still there but for others the currency has been removed and the numeric format
     has been handled (',' separator for thousands)
     """
+    if not inplace:
+        df = df.copy()
     for column in columns:
-        df[column] = df[column].apply(lambda x: str.replace(x, '$', '') if not pd.isnull(x) else x)
-        df[column] = df[column].apply(lambda x: str.replace(x, ',', '') if not pd.isnull(x) else x)
-        df[column] = df[column].astype("float64")
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            # Prices repeat a lot (especially in the calendar), only distinct values are parsed
+            codes, uniques = pd.factorize(df[column])
+            parsed = pd.to_numeric(pd.Series(uniques, dtype=object).str.replace(r'[$,]', '', regex=True))
+            parsed = np.append(parsed.to_numpy(dtype), np.nan)
+            # Missing values have a -1 code which points to the NaN appended at the end
+            df[column] = parsed.take(codes).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
     return df
 
 
-def transform_t_f(df, columns):
+@instrumentation.instrumented()
+def transform_t_f(df, columns, dtype="float64", inplace=True):
     """
     Transform the given dataset: the given column which is categorical nominal ('t'/'f' which stands for True/False) is
     transformed to binary 0/1
     :param df: (pandas DataFrame) the dataset to transform
-    :param columns: (string) columns to transform
+    :param columns: (string or list) column(s) to transform
+    :param dtype: (string) not required, default is "float64" (NaN are kept) whatever the values of the batch, so that
+    a column has the same type in all batches. Can be any numeric type, "bool" or a nullable type such as "Int8" but
+    a type that cannot hold missing values (such as "bool" or "int8") is rejected if there is a missing value
+    :param inplace: (boolean) not required, default is True. If False, the given dataset is left untouched
+    :return: transformed dataset
+    """
+    if not inplace:
+        df = df.copy()
+    is_nullable = isinstance(pd.api.types.pandas_dtype(dtype), pd.api.extensions.ExtensionDtype)
+    for column in [columns] if isinstance(columns, str) else columns:
+        values = df[column]
+        is_true = (values == 't').to_numpy()
+        is_missing = ~(is_true | (values == 'f').to_numpy())
+        if is_nullable:
+            df[column] = pd.array(np.where(is_missing, None, is_true.astype("int8")), dtype=dtype)
+        elif is_missing.any() and not pd.api.types.is_float_dtype(dtype):
+            raise ValueError("Column {} has {} missing values which cannot be converted to {}, use a float or a "
+                             "nullable type".format(column, is_missing.sum(), dtype))
+        else:
+            df[column] = np.where(is_missing, np.nan, is_true).astype(dtype)
+    return df
+
+
+@instrumentation.instrumented()
+def split_host_location(host_location):
+    """
+    Split host locations ('<city>, <region>, <country>', '<region>, <country>' or '<country>') into their parts and
+    resolve aliases of those parts (see constants HOST_LOCATION_ALIASES, such as country codes). Locations repeat a lot,
+    so only distinct values are split, in a single vectorized string operation
+    :param host_location: (pandas Series) raw host locations
+    :return: (pandas DataFrame) 'city', 'region' and 'country' columns with the same index, parts are missing when the
+    location is missing or made of more than 3 parts
+    """
+    codes, uniques = pd.factorize(host_location)
+    parts = pd.Series(uniques, dtype=object).str.split(', ', expand=True)
+    nb_parts = parts.notnull().sum(axis=1).to_numpy() if parts.shape[0] > 0 else np.zeros(0, dtype=int)
+    parts = parts.reindex(columns=range(3))
+    df_parts = pd.DataFrame(index=parts.index, columns=cst.HOST_LOCATION_PARTS, dtype=object)
+    # Parts are right aligned: the last one is always the country
+    for nb in [1, 2, 3]:
+        is_nb = nb_parts == nb
+        df_parts.loc[is_nb, cst.HOST_LOCATION_PARTS[3 - nb:]] = parts.loc[is_nb, list(range(nb))].to_numpy()
+    for part in cst.HOST_LOCATION_PARTS:
+        aliases = {alias: value for (alias_part, alias), value in cst.HOST_LOCATION_ALIASES.items()
+                   if alias_part == part}
+        if len(aliases) > 0:
+            df_parts[part] = df_parts[part].map(lambda v: aliases.get(v, v))
+
+    # Missing locations have a -1 code which points to the missing row appended at the end
+    df_parts = pd.concat([df_parts, pd.DataFrame([[np.nan] * 3], columns=cst.HOST_LOCATION_PARTS)], ignore_index=True)
+    return pd.DataFrame(df_parts.to_numpy()[codes], columns=cst.HOST_LOCATION_PARTS, index=host_location.index)
+
+
+@instrumentation.instrumented()
+def flag_missing(df, column, flag_column, dtype="int8"):
+    """
+    Add a binary feature to the given dataset which is 1 if the given column value is missing, 0 otherwise
+    :param df: (pandas DataFrame) the dataset to transform
+    :param column: (string) column to check for missing values
+    :param flag_column: (string) name of the new binary column
+    :param dtype: (string) not required, default is "int8"
     :return: transformed dataset
     """
-    df[columns] = df[columns].map({'t': 1, 'f': 0})
+    df[flag_column] = df[column].isna().to_numpy().astype(dtype)
     return df
 
 
-def encode_categorical(df, one_hot_encode_col_list):
+@instrumentation.instrumented()
+def encode_categorical(df, one_hot_encode_col_list, encoder=None, verbose=True):
     """
     Transform the given dataset by creating dummy variables for each column in the given list
     :parameter df: (pandas Dataframe) the dataframe to transform
     :parameter one_hot_encode_col_list: (list) all columns to one-hot encode
+    :parameter encoder: (CategoricalEncoder) not required. If already fitted, its categories are reused so that the
+    output always has the same columns, otherwise it is fitted on the given dataframe and can be reused afterwards
+    :parameter verbose: (boolean) not required, default is True. If False, the new shape is not printed
     :return: (pandas Dataframe) the given dataframe transformed
     """
-    # Will be used for coherence control check
-    nb_new_cols = 0
-    new_df = df.copy()
-
-    for col in one_hot_encode_col_list:
-        nb_new_cols += new_df[col].nunique()
-        dummies = pd.get_dummies(new_df[col], prefix=col)
-        new_df = pd.concat([new_df, dummies], axis=1)
-
-    # Do not forget to remove the original columns as they are not needed anymore
-    new_df = new_df.drop(one_hot_encode_col_list, axis=1)
+    if encoder is None:
+        encoder = CategoricalEncoder()
+    if not hasattr(encoder, 'categories_'):
+        encoder.set_params(columns=one_hot_encode_col_list, output='frame').fit(df)
+    new_df = encoder.transform(df)
 
     # Coherence control
-    assert new_df.shape[1] == df.shape[1] - len(one_hot_encode_col_list) + nb_new_cols
-    print("After one-hot encoding, new shape is now {}".format(new_df.shape))
+    assert new_df.shape[1] == df.shape[1] - len(one_hot_encode_col_list) + len(encoder.dummy_columns_)
+    if verbose:
+        print("After one-hot encoding, new shape is now {}".format(new_df.shape))
     return new_df
 
 
-def clean_listings(df):
+def get_listings_input_schema():
+    """
+    Input schema of clean_listings: the only columns of the full listings dataset that are used by the cleaning (all
+    others, including the long free text ones, are dropped) with the dtype they should be parsed with
+    :return: (dict) key is the column name, value is the dtype
+    """
+    schema = {'id': 'int64', 'amenities': 'object', 'license': 'object'}
+    for col in ['host_is_superhost', 'host_identity_verified', 'is_location_exact', 'instant_bookable',
+                'neighbourhood_cleansed', 'room_type', 'bed_type', 'cancellation_policy']:
+        schema[col] = 'category'
+    for col in ['price', 'security_deposit', 'cleaning_fee', 'extra_people']:
+        schema[col] = 'object'
+    for col in ['accommodates', 'bathrooms', 'bedrooms', 'beds', 'guests_included', 'minimum_nights', 'maximum_nights',
+                'minimum_minimum_nights', 'maximum_minimum_nights', 'minimum_maximum_nights', 'maximum_maximum_nights',
+                'minimum_nights_avg_ntm', 'maximum_nights_avg_ntm', 'availability_30', 'availability_60',
+                'availability_90', 'availability_365', 'number_of_reviews', 'number_of_reviews_ltm',
+                'review_scores_rating', 'review_scores_accuracy', 'review_scores_cleanliness', 'review_scores_checkin',
+                'review_scores_communication', 'review_scores_location', 'review_scores_value', 'reviews_per_month']:
+        schema[col] = 'float64'
+    return schema
+
+
+def get_amenities_threshold(nb_listings):
+    """
+    Minimum number of listings for an amenity to be kept, relative to the number of listings of the city (642 for the
+    64293 listings of Paris)
+    :param nb_listings: (int) number of listings of the dataset
+    :return: (int) the threshold
+    """
+    return max(1, int(cst.AMENITIES_MIN_SHARE * nb_listings))
+
+
+@instrumentation.instrumented()
+def clean_listings(df, amenities_threshold=None, amenities_encoder=None, categorical_encoder=None, verbose=True):
     """
     Clean the given dataset:
         * drop unnecessary columns
@@ -83,7 +199,15 @@ def clean_listings(df):
         * transform binary nominal to binary numeric 0/1*
         * handle currency symbols
         * extract amenities and dummies
-    :param df: (pandas Dataframe) the dataframe to transform
+    :param df: (pandas Dataframe) the dataframe to transform, either the full listings dataset or only the columns given
+    by get_listings_input_schema()
+    :param amenities_threshold: (int) not required, minimum number of listings for an amenity to be kept. Default is
+    given by get_amenities_threshold (1% of the listings)
+    :param amenities_encoder: (AmenitiesEncoder) not required. If already fitted, its vocabulary is reused (no need to
+    tokenize the training set again), otherwise it is fitted on the given dataframe and can be reused afterwards
+    :param categorical_encoder: (CategoricalEncoder) not required, same as amenities_encoder for the one-hot encoded
+    categorical features (see encode_categorical)
+    :param verbose: (boolean) not required, default is True. If False, nothing is printed
     :return: (pandas Dataframe) a new dataframe transformed
     """
     cols_to_drop = ['id', 'listing_url', 'scrape_id', 'last_scraped', 'experiences_offered', 'notes', 'transit',
@@ -100,34 +224,35 @@ def clean_listings(df):
                     'requires_license', 'is_business_travel_ready', 'require_guest_profile_picture',
                     'require_guest_phone_verification', 'name', 'summary', 'space', 'description',
                     'neighborhood_overview', 'access', 'weekly_price', 'monthly_price', 'jurisdiction_names']
-    df_reduced = drop_cols(df, cols_to_drop)
+    # Columns never loaded (see get_listings_input_schema) do not have to be dropped
+    df_reduced = drop_cols(df, [col for col in cols_to_drop if col in df.columns], verbose)
 
     # From 't'/'f' to 0/1
     tf_cols = ['host_is_superhost', 'host_identity_verified', 'is_location_exact', 'instant_bookable']
     for feat in tf_cols:
         df_reduced = transform_t_f(df_reduced, feat)
 
-    df_reduced['license_missing'] = df_reduced['license'].apply(lambda x: 1 if pd.isnull(x) else 0)
+    df_reduced = flag_missing(df_reduced, 'license', 'license_missing')
 
     currency_cols = ['price', 'security_deposit', 'cleaning_fee', 'extra_people']
     df_reduced = clean_currency_columns(df_reduced, currency_cols)
 
     one_hot_cols = ['neighbourhood_cleansed', 'room_type', 'bed_type', 'cancellation_policy']
-    df_reduced = encode_categorical(df_reduced, one_hot_cols)
-
-    # Amenities
-    df_reduced.amenities = df_reduced.amenities.str.strip('{}')
-    df_reduced.amenities = df_reduced.amenities.str.replace('"', '')
-    df_only_amenities = df_reduced.amenities
-    df_only_amenities = df_only_amenities.str.get_dummies(sep=',')
-    # Build a dataframe that contains amenities as index and sum of listing containing this amenity as value
-    amen_dict = {}
-    for amenity in df_only_amenities.columns.tolist():
-        amen_dict[amenity] = df_only_amenities[amenity].sum()
-    df_amen_sum = pd.DataFrame.from_dict(amen_dict, orient='index', columns=['amen_sum'])
-    df_only_amenities_reduced = drop_cols(df_only_amenities, df_amen_sum[df_amen_sum['amen_sum'] < 642].index.tolist())
+    df_reduced = encode_categorical(df_reduced, one_hot_cols, categorical_encoder, verbose)
+
+    # Amenities: only those owned by at least 'amenities_threshold' listings are kept
+    if amenities_threshold is None:
+        amenities_threshold = get_amenities_threshold(df.shape[0])
+    if amenities_encoder is None:
+        amenities_encoder = AmenitiesEncoder(min_count=amenities_threshold)
+    if not hasattr(amenities_encoder, 'vocabulary_'):
+        amenities_encoder.set_params(min_count=amenities_threshold).fit(df_reduced['amenities'])
+    df_only_amenities_reduced = amenities_encoder.to_frame(df_reduced['amenities'])
+    if verbose:
+        print("After amenities encoding, {} amenities kept out of {}".format(df_only_amenities_reduced.shape[1],
+                                                                            len(amenities_encoder.all_vocabulary_)))
     # We're almost there, just concat and drop the original 'amenities' column
     df_clean = pd.concat([df_reduced, df_only_amenities_reduced], axis=1)
-    df_clean = drop_cols(df_clean, ['license', 'amenities'])
+    df_clean = drop_cols(df_clean, ['license', 'amenities'], verbose)
 
     return df_clean
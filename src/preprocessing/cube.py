@@ -0,0 +1,238 @@
+"""
+Created on 18 october 2026
+
+Package to hold the calendar aggregate cube: count, sum and sum of squares of some calendar features per
+(neighbourhood, date), built in a single pass. Means, standard deviations and counts per date or per date and
+neighbourhood are then derived from the cube without going through the calendar again
+
+@author: nidragedd
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import streaming
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import diskcache
+from src.utils import instrumentation
+
+
+class CalendarCube(object):
+    """
+    Aggregates of calendar features per (neighbourhood, date). Arrays are indexed by neighbourhood position then date
+    position, calendar rows without neighbourhood are kept under a NaN neighbourhood so that totals per date are exact
+    """
+    def __init__(self, neighbourhoods, dates, nb_rows, counts, sums, sums_sq):
+        """
+        :param neighbourhoods: (pandas Index) neighbourhoods, in order of first appearance
+        :param dates: (pandas Index) sorted dates
+        :param nb_rows: (numpy array) number of calendar rows per (neighbourhood, date)
+        :param counts: (dict) for each feature, number of non missing values per (neighbourhood, date)
+        :param sums: (dict) for each feature, sum of values per (neighbourhood, date)
+        :param sums_sq: (dict) for each feature, sum of squared values per (neighbourhood, date)
+        """
+        self.neighbourhoods = neighbourhoods
+        self.dates = dates
+        self.nb_rows = nb_rows
+        self.counts = counts
+        self.sums = sums
+        self.sums_sq = sums_sq
+
+    @property
+    def columns(self):
+        """
+        :return: (list) aggregated features
+        """
+        return list(self.sums)
+
+    @classmethod
+    def from_frame(cls, df, columns=None, neighbourhood_col='neighbourhood'):
+        """
+        Build the cube from a calendar dataset in memory
+        :param df: (pandas DataFrame) cleaned calendar with a 'date' feature, and the neighbourhood of each listing
+        :param columns: (list) not required, features to aggregate, default is cst.CALENDAR_CUBE_FEATURES (other names
+        can be given, such as 'price_x' once calendar and listings are merged)
+        :param neighbourhood_col: (string) not required, name of the neighbourhood feature. If it is not in the dataset,
+        all rows are aggregated under a NaN neighbourhood
+        :return: (CalendarCube) the cube
+        """
+        columns = cst.CALENDAR_CUBE_FEATURES if columns is None else columns
+        df = df[df['date'].notnull()]
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+        if neighbourhood_col in df.columns:
+            neigh_codes, neighbourhoods = pd.factorize(df[neighbourhood_col])
+            neighbourhoods = pd.Index(neighbourhoods)
+        else:
+            neigh_codes, neighbourhoods = np.full(df.shape[0], -1), pd.Index([], dtype=object)
+        if (neigh_codes < 0).any():
+            neigh_codes = np.where(neigh_codes < 0, len(neighbourhoods), neigh_codes)
+            neighbourhoods = neighbourhoods.append(pd.Index([np.nan], dtype=object))
+
+        shape = (len(neighbourhoods), len(dates))
+        flat = neigh_codes * len(dates) + date_codes
+        nb_rows = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape)
+        counts, sums, sums_sq = {}, {}, {}
+        for col in columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(values)
+            counts[col] = np.bincount(flat[valid], minlength=nb_rows.size).reshape(shape)
+            sums[col] = np.bincount(flat[valid], weights=values[valid], minlength=nb_rows.size).reshape(shape)
+            sums_sq[col] = np.bincount(flat[valid], weights=values[valid] ** 2, minlength=nb_rows.size).reshape(shape)
+        return cls(neighbourhoods, pd.Index(dates), nb_rows, counts, sums, sums_sq)
+
+    @classmethod
+    @instrumentation.instrumented('build_calendar_cube')
+    def from_calendar_file(cls, df_listings, chunk_size=cst.CALENDAR_CHUNK_SIZE, columns=None):
+        """
+        Build the cube by streaming the calendar dataset (see streaming.iter_calendar_chunks), memory stays bounded by
+        the chunk size
+        :param df_listings: (pandas DataFrame) listings with 'id' and 'neighbourhood' features
+        :param chunk_size: (int) not required, number of calendar rows read at once
+        :param columns: (list) not required, features to aggregate, default is cst.CALENDAR_CUBE_FEATURES
+        :return: (CalendarCube) the cube
+        """
+        cube = None
+        for chunk in streaming.iter_calendar_chunks(chunk_size, df_listings):
+            chunk_cube = cls.from_frame(chunk, columns)
+            cube = chunk_cube if cube is None else cube.merge(chunk_cube)
+        return cube
+
+    def merge(self, other):
+        """
+        Add the aggregates of another cube (such as the cube of another chunk of the calendar)
+        :param other: (CalendarCube) cube with the same features
+        :return: (CalendarCube) a new cube with the aggregates of both cubes
+        """
+        new_neighbourhoods = other.neighbourhoods[~other.neighbourhoods.isin(self.neighbourhoods)]
+        neighbourhoods = self.neighbourhoods.append(new_neighbourhoods)
+        dates = self.dates.union(other.dates)
+        shape = (len(neighbourhoods), len(dates))
+
+        def _add(a, b):
+            result = np.zeros(shape, dtype=a.dtype)
+            for cube, values in [(self, a), (other, b)]:
+                result[np.ix_(neighbourhoods.get_indexer(cube.neighbourhoods), dates.get_indexer(cube.dates))] += values
+            return result
+
+        return CalendarCube(neighbourhoods, dates, _add(self.nb_rows, other.nb_rows),
+                            {col: _add(self.counts[col], other.counts[col]) for col in self.columns},
+                            {col: _add(self.sums[col], other.sums[col]) for col in self.columns},
+                            {col: _add(self.sums_sq[col], other.sums_sq[col]) for col in self.columns})
+
+    def aggregate(self, column, group='date', stat='mean'):
+        """
+        Same result as df.groupby(group)[column].<stat>().reset_index() on the calendar the cube was built from
+        :param column: (string) aggregated feature
+        :param group: (string or list) 'date', or ['date', 'neighbourhood'] (in any order)
+        :param stat: (string) not required, 'mean' (default), 'std', 'sum' or 'count'
+        :return: (pandas DataFrame) one row per group, with the group keys as columns
+        """
+        group = [group] if isinstance(group, str) else list(group)
+        assert set(group) in ({'date'}, {'date', 'neighbourhood'}), "Cube can only be grouped by date and neighbourhood"
+        nb_rows, counts, sums, sums_sq = self.nb_rows, self.counts[column], self.sums[column], self.sums_sq[column]
+        if 'neighbourhood' in group:
+            known = self.neighbourhoods.notnull()
+            nb_rows, counts, sums, sums_sq = nb_rows[known], counts[known], sums[known], sums_sq[known]
+            keys = pd.MultiIndex.from_product([self.neighbourhoods[known], self.dates], names=['neighbourhood', 'date'])
+        else:
+            nb_rows, counts, sums, sums_sq = (a.sum(axis=0) for a in [nb_rows, counts, sums, sums_sq])
+            keys = self.dates.rename('date')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if stat == 'mean':
+                values = sums / counts
+            elif stat == 'std':
+                values = np.sqrt(np.maximum(sums_sq - sums ** 2 / counts, 0) / (counts - 1))
+            elif stat == 'sum':
+                values = sums
+            elif stat == 'count':
+                values = counts
+            else:
+                raise ValueError("Unknown stat '{}', should be 'mean', 'std', 'sum' or 'count'".format(stat))
+        values = np.where(counts > (1 if stat == 'std' else 0), values, 0 if stat in ('sum', 'count') else np.nan)
+        series = pd.Series(np.ravel(values), index=keys, name=column)[np.ravel(nb_rows) > 0]
+        return series.reset_index().sort_values(group).reset_index(drop=True)[group + [column]]
+
+    def save(self, path=cst.CALENDAR_CUBE_FILE, key=''):
+        """
+        Save the cube as a numpy .npz file
+        :param path: (string) not required, path of the file
+        :param key: (string) not required, fingerprint of the inputs the cube was built from, see load_key
+        """
+        arrays = {'neighbourhoods': self.neighbourhoods.fillna('').astype(str).to_numpy(dtype=str),
+                  'neighbourhoods_na': self.neighbourhoods.isnull(),
+                  # Dates are kept as datetime64 values or, if they have not been parsed, as strings
+                  'dates': self.dates.to_numpy() if self.dates.dtype.kind == 'M' else self.dates.astype(str).to_numpy(
+                      dtype=str),
+                  'columns': np.array(self.columns, dtype=str), 'nb_rows': self.nb_rows, 'key': np.array(key)}
+        for col in self.columns:
+            arrays.update({'count_' + col: self.counts[col], 'sum_' + col: self.sums[col],
+                           'sum_sq_' + col: self.sums_sq[col]})
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path=cst.CALENDAR_CUBE_FILE):
+        """
+        Load a cube saved by save
+        :param path: (string) not required, path of the file
+        :return: (CalendarCube) the cube
+        """
+        with np.load(path) as arrays:
+            neighbourhoods = pd.Index(arrays['neighbourhoods'].astype(object))
+            neighbourhoods = neighbourhoods.where(~arrays['neighbourhoods_na'], np.nan)
+            columns = arrays['columns'].tolist()
+            dates = arrays['dates'] if arrays['dates'].dtype.kind == 'M' else arrays['dates'].astype(object)
+            return cls(neighbourhoods, pd.Index(dates), arrays['nb_rows'],
+                       {col: arrays['count_' + col] for col in columns}, {col: arrays['sum_' + col] for col in columns},
+                       {col: arrays['sum_sq_' + col] for col in columns})
+
+    @staticmethod
+    def load_key(path=cst.CALENDAR_CUBE_FILE):
+        """
+        Read the fingerprint a cube was saved with, without loading the aggregates
+        :param path: (string) not required, path of the file
+        :return: (string) the fingerprint, None if the file does not exist or has been saved without fingerprint
+        """
+        try:
+            with np.load(path) as arrays:
+                return str(arrays['key']) if 'key' in arrays.files else None
+        except (IOError, OSError, ValueError):
+            return None
+
+
+def get_calendar_cube_key(df_listings, columns=None):
+    """
+    Fingerprint of the inputs a calendar cube depends on, apart from the calendar file itself: neighbourhood of each
+    listing and aggregated features
+    :param df_listings: (pandas DataFrame) listings with 'id' and 'neighbourhood' features
+    :param columns: (list) not required, features to aggregate, default is cst.CALENDAR_CUBE_FEATURES
+    :return: (string) the fingerprint
+    """
+    columns = cst.CALENDAR_CUBE_FEATURES if columns is None else columns
+    return diskcache.fingerprint(df_listings[['id', 'neighbourhood']], list(columns))
+
+
+def load_or_build_calendar_cube(df_listings, path=cst.CALENDAR_CUBE_FILE, chunk_size=cst.CALENDAR_CHUNK_SIZE,
+                                columns=None):
+    """
+    Load the calendar cube if it has already been saved after the last download of the calendar file, from the same
+    listings neighbourhoods and for the same features, otherwise build it from the calendar file and save it
+    :param df_listings: (pandas DataFrame) listings with 'id' and 'neighbourhood' features
+    :param path: (string) not required, path of the cube file
+    :param chunk_size: (int) not required, number of calendar rows read at once when building the cube
+    :param columns: (list) not required, features to aggregate, default is cst.CALENDAR_CUBE_FEATURES
+    :return: (CalendarCube) the cube
+    """
+    calendar_file = datacollector.get_data_file(cst.CALENDAR_FILE)
+    key = get_calendar_cube_key(df_listings, columns)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(calendar_file) and \
+            CalendarCube.load_key(path) == key:
+        return CalendarCube.load(path)
+    cube = CalendarCube.from_calendar_file(df_listings, chunk_size, columns)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cube.save(path, key)
+    print("Calendar cube of {} neighbourhoods and {} dates saved to {}".format(len(cube.neighbourhoods),
+                                                                              len(cube.dates), path))
+    return cube
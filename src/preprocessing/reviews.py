@@ -0,0 +1,172 @@
+"""
+Created on 18 october 2026
+
+Utility package used to process the reviews dataset chunk by chunk: tokenization (and lemmatization) of comments runs on
+a pool of processes and builds an on-disk term frequency index per listing, while per-listing aggregates (number of
+reviews per month, latest review date) are computed during the same pass over the file
+
+@author: nidragedd
+"""
+import os
+import re
+import glob
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.utils import constants as cst
+from src.utils import datacollector
+
+_TOKEN_PATTERN = re.compile(r"\w\w+", re.UNICODE)
+# Loaded once per worker process, only if lemmatization is asked
+_nlp = None
+
+
+def _get_nlp():
+    """
+    Inner method that loads the spacy model (used for lemmatization) the first time it is needed in a process
+    :return: the spacy language object
+    """
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(cst.SPACY_MODEL, disable=['parser', 'ner'])
+    return _nlp
+
+
+def tokenize(texts, lemmatize=False, stop_words=None):
+    """
+    Tokenize texts into lowercase words of at least 2 characters
+    :param texts: (list) texts to tokenize (missing values are considered as empty texts)
+    :param lemmatize: (boolean) not required, default is False. If True, words are replaced by their lemma (needs spacy)
+    :param stop_words: (set) not required, words to remove
+    :return: (list) one list of tokens per text
+    """
+    texts = ['' if pd.isnull(text) else str(text) for text in texts]
+    if lemmatize:
+        tokens = [[t.lemma_.lower() for t in doc if not t.is_punct and not t.is_space]
+                  for doc in _get_nlp().pipe(texts, batch_size=256)]
+    else:
+        tokens = [_TOKEN_PATTERN.findall(text.lower()) for text in texts]
+    if stop_words:
+        tokens = [[t for t in doc if t not in stop_words] for doc in tokens]
+    return tokens
+
+
+def _count_terms(listing_ids, comments, lemmatize, stop_words):
+    """
+    Inner method run in worker processes: count terms of a batch of reviews per listing
+    :param listing_ids: (numpy array) listing id of each review
+    :param comments: (list) comment of each review
+    :param lemmatize: (boolean) see tokenize
+    :param stop_words: (set) see tokenize
+    :return: (pandas DataFrame) 'listing_id', 'term', 'tf' (occurrences) and 'df' (number of reviews with the term)
+    """
+    rows_listing, rows_term, rows_tf = [], [], []
+    for listing_id, tokens in zip(listing_ids, tokenize(comments, lemmatize, stop_words)):
+        for term, count in Counter(tokens).items():
+            rows_listing.append(listing_id)
+            rows_term.append(term)
+            rows_tf.append(count)
+    df_terms = pd.DataFrame({'listing_id': np.array(rows_listing, dtype=np.int64), 'term': rows_term,
+                             'tf': np.array(rows_tf, dtype=np.int32), 'df': np.ones(len(rows_tf), dtype=np.int32)})
+    return df_terms.groupby(['listing_id', 'term'], sort=False).sum().reset_index()
+
+
+def _write_part(index_dir, part, futures):
+    """
+    Inner method that waits for the term counts of one chunk and writes them as one part of the on-disk index
+    :param index_dir: (string) path to the index directory
+    :param part: (int) part number
+    :param futures: (list) futures of the term counts of the chunk batches
+    """
+    df_terms = pd.concat([f.result() for f in futures])
+    df_terms = df_terms.groupby(['listing_id', 'term'], sort=False).sum().reset_index()
+    df_terms.to_parquet(os.path.join(index_dir, cst.REVIEWS_INDEX_PART_FILE.format(part)), index=False)
+
+
+def process_reviews(chunk_size=cst.REVIEWS_CHUNK_SIZE, nb_workers=None, lemmatize=False, stop_words=None,
+                    index_dir=cst.REVIEWS_INDEX_DIR_PATH):
+    """
+    Read the reviews dataset by chunks in a single pass. Comments of each chunk are tokenized on a pool of processes
+    (while the next chunk is read) and term counts per listing are written as a new part of the on-disk index. Number
+    of reviews per month and latest review date per listing are computed along the way and saved in the index directory
+    :param chunk_size: (int) not required, number of reviews read at once
+    :param nb_workers: (int) not required, default is the number of CPUs. Number of worker processes
+    :param lemmatize: (boolean) not required, default is False. If True, words are lemmatized with spacy
+    :param stop_words: (set) not required, words to remove
+    :param index_dir: (string) not required, path to the index directory (it is emptied first)
+    :return: (pandas DataFrame) one row per listing with 'listing_id', 'nb_reviews' and 'last_review_date'
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    for old_file in glob.glob(os.path.join(index_dir, '*.parquet')):
+        os.remove(old_file)
+    nb_workers = os.cpu_count() if nb_workers is None else nb_workers
+
+    reader = pd.read_csv(datacollector.get_data_file(cst.REVIEWS_FILE), sep=',', header=0, compression='gzip',
+                         usecols=['listing_id', 'date', 'comments'], chunksize=chunk_size)
+    monthly_parts, last_dates = [], []
+    pending = None
+    nb_reviews = 0
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        for part, chunk in enumerate(reader):
+            nb_reviews += chunk.shape[0]
+            listing_ids = chunk['listing_id'].to_numpy()
+            comments = chunk['comments'].tolist()
+            bounds = np.linspace(0, chunk.shape[0], nb_workers + 1).astype(int)
+            futures = [executor.submit(_count_terms, listing_ids[start:end], comments[start:end], lemmatize, stop_words)
+                       for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+            # Per-listing aggregates are cheap, they are computed here while workers are busy
+            dates = pd.to_datetime(chunk['date'])
+            monthly_parts.append(chunk.groupby(['listing_id', dates.dt.to_period('M').rename('month')]).size())
+            last_dates.append(dates.groupby(chunk['listing_id']).max())
+
+            # At most 2 chunks in memory: the one being read and the one being tokenized
+            if pending is not None:
+                _write_part(index_dir, *pending)
+            pending = (part, futures)
+        if pending is not None:
+            _write_part(index_dir, *pending)
+
+    df_monthly = pd.concat(monthly_parts).groupby(level=[0, 1]).sum().rename('nb_reviews').reset_index()
+    df_monthly['month'] = df_monthly['month'].astype(str)
+    df_listings = pd.concat(last_dates).groupby(level=0).max().rename('last_review_date').to_frame()
+    df_listings.insert(0, 'nb_reviews', df_monthly.groupby('listing_id')['nb_reviews'].sum())
+    df_listings = df_listings.rename_axis('listing_id').reset_index()
+    df_monthly.to_parquet(os.path.join(index_dir, cst.REVIEWS_PER_MONTH_FILE), index=False)
+    df_listings.to_parquet(os.path.join(index_dir, cst.REVIEWS_PER_LISTING_FILE), index=False)
+    print("{} reviews processed for {} listings".format(nb_reviews, df_listings.shape[0]))
+    return df_listings
+
+
+def load_term_frequencies(listing_ids=None, index_dir=cst.REVIEWS_INDEX_DIR_PATH):
+    """
+    Read the on-disk term frequency index built by process_reviews
+    :param listing_ids: (list) not required, default is None (all listings). Only those listings are read
+    :param index_dir: (string) not required, path to the index directory
+    :return: (pandas DataFrame) 'listing_id', 'term', 'tf' (occurrences) and 'df' (number of reviews with the term),
+    empty if there is no index
+    """
+    listing_ids = None if listing_ids is None else list(listing_ids)
+    parts = []
+    for f in sorted(glob.glob(os.path.join(index_dir, cst.REVIEWS_INDEX_PART_FILE.replace('{:05d}', '*')))):
+        df_part = pd.read_parquet(f)
+        # Filtered here: parquet readers only apply row filters to partition keys of a dataset, not inside a file
+        parts.append(df_part if listing_ids is None else df_part[df_part['listing_id'].isin(listing_ids)])
+    if len(parts) == 0:
+        return pd.DataFrame({'listing_id': pd.Series(dtype='int64'), 'term': pd.Series(dtype='object'),
+                             'tf': pd.Series(dtype='int64'), 'df': pd.Series(dtype='int64')})
+    return pd.concat(parts).groupby(['listing_id', 'term'], sort=False).sum().reset_index()
+
+
+def load_reviews_aggregates(index_dir=cst.REVIEWS_INDEX_DIR_PATH):
+    """
+    Read the per-listing aggregates computed by process_reviews, ready to be joined to listings on 'listing_id'
+    :param index_dir: (string) not required, path to the index directory
+    :return: (tuple) per listing aggregates, number of reviews per listing and month (pandas DataFrame)
+    """
+    return (pd.read_parquet(os.path.join(index_dir, cst.REVIEWS_PER_LISTING_FILE)),
+            pd.read_parquet(os.path.join(index_dir, cst.REVIEWS_PER_MONTH_FILE)))
@@ -0,0 +1,102 @@
+"""
+Created on 18 october 2026
+
+Utility package used to process the calendar dataset chunk by chunk, so that memory stays bounded by the chunk size
+whatever the size of the file
+
+@author: nidragedd
+"""
+import pandas as pd
+
+from src.preprocessing import cleaning
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import instrumentation
+
+
+def _clean_calendar_chunk(chunk):
+    """
+    Inner method that applies the same cleaning as notebooks do on the whole calendar dataset, to one chunk only
+    :param chunk: (pandas DataFrame) a chunk of the calendar dataset
+    :return: (pandas DataFrame) the cleaned chunk with a new 'adjusted_price_delta' column
+    """
+    chunk = cleaning.transform_t_f(chunk, 'available')
+    chunk = cleaning.clean_currency_columns(chunk, ['price', 'adjusted_price'])
+    chunk['adjusted_price_delta'] = chunk['adjusted_price'] - chunk['price']
+    return chunk
+
+
+def _partial_aggregate(chunk, keys):
+    """
+    Inner method that computes sums and counts of the aggregated features for one chunk. Those partial aggregates can
+    be summed together, which is not the case of means
+    :param chunk: (pandas DataFrame) a cleaned chunk of the calendar dataset
+    :param keys: (list) features for the groupby
+    :return: (pandas DataFrame) sum and count for each aggregated feature, indexed by keys
+    """
+    gb = chunk.groupby(keys, sort=False)[cst.CALENDAR_AGG_FEATURES]
+    sums = gb.sum(min_count=1).fillna(0).add_suffix('_sum')
+    counts = gb.count().add_suffix('_count')
+    return pd.concat([sums, counts], axis=1)
+
+
+def _combine(partials, keys):
+    """
+    Inner method that folds several partial aggregates into a single one
+    :param partials: (list) list of partial aggregates built by _partial_aggregate
+    :param keys: (list) features used for the groupby
+    :return: (pandas DataFrame) the folded partial aggregate
+    """
+    return pd.concat(partials).groupby(level=keys, sort=False).sum()
+
+
+def iter_calendar_chunks(chunk_size=cst.CALENDAR_CHUNK_SIZE, df_listings=None):
+    """
+    Read the calendar dataset by chunks of bounded size and clean each of them
+    :param chunk_size: (int) not required, number of rows read at once
+    :param df_listings: (pandas DataFrame) not required, if given its 'neighbourhood' feature is joined on 'listing_id'
+    :return: (generator) cleaned chunks of the calendar dataset
+    """
+    neighbourhoods = None if df_listings is None else df_listings.set_index('id')['neighbourhood']
+    reader = pd.read_csv(datacollector.get_data_file(cst.CALENDAR_FILE), sep=',', header=0, compression='gzip',
+                         usecols=['listing_id', 'date', 'available', 'price', 'adjusted_price'], chunksize=chunk_size)
+    for chunk in reader:
+        chunk = _clean_calendar_chunk(chunk)
+        if neighbourhoods is not None:
+            chunk['neighbourhood'] = chunk['listing_id'].map(neighbourhoods)
+        yield chunk
+
+
+@instrumentation.instrumented()
+def aggregate_calendar(by=None, df_listings=None, chunk_size=cst.CALENDAR_CHUNK_SIZE, combine_every=10):
+    """
+    Stream the calendar dataset and aggregate it per date and optionally per listing or per neighbourhood. For each
+    group we get the mean price, mean adjusted price, mean delta between adjusted price and price, the availability rate
+    and the number of calendar rows
+    :param by: (string) not required, default is None (aggregate per date only). Can be 'listing_id' or 'neighbourhood'
+    :param df_listings: (pandas DataFrame) listings with 'id' and 'neighbourhood' features, required if
+    by='neighbourhood'
+    :param chunk_size: (int) not required, number of calendar rows read at once
+    :param combine_every: (int) not required, number of chunks after which partial aggregates are folded together
+    :return: (pandas DataFrame) the aggregated data, one row per group, with the group keys as columns
+    """
+    if by == 'neighbourhood' and df_listings is None:
+        raise ValueError("Listings dataset is required to aggregate the calendar per neighbourhood")
+    keys = ['date'] if by is None else ['date', by]
+
+    partials = []
+    nb_rows = 0
+    for chunk in iter_calendar_chunks(chunk_size, df_listings if by == 'neighbourhood' else None):
+        nb_rows += chunk.shape[0]
+        partials.append(_partial_aggregate(chunk, keys))
+        if len(partials) >= combine_every:
+            partials = [_combine(partials, keys)]
+    agg = _combine(partials, keys)
+
+    df_agg = pd.DataFrame(index=agg.index)
+    for feat in cst.CALENDAR_AGG_FEATURES:
+        df_agg[feat] = agg['{}_sum'.format(feat)] / agg['{}_count'.format(feat)]
+    df_agg['nb_rows'] = agg['available_count'].astype('int64')
+    df_agg = df_agg.sort_index().reset_index()
+    print("Calendar aggregated from {} rows to {} rows".format(nb_rows, df_agg.shape[0]))
+    return df_agg
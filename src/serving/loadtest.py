@@ -0,0 +1,105 @@
+"""
+Created on 18 october 2026
+
+Load-test harness for the price prediction service: many concurrent keep-alive clients send prediction requests and
+we measure latency percentiles and throughput
+
+@author: nidragedd
+"""
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from src.utils import constants as cst
+
+
+async def _client(host, port, bodies, latencies):
+    """
+    Inner method, one client sending its requests one after the other on a single keep-alive connection
+    :param host: (string) service host
+    :param port: (int) service port
+    :param bodies: (list) encoded JSON bodies to send
+    :param latencies: (list) latency of each request in seconds is appended to this list
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            writer.write("POST /predict HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n"
+                         "Content-Length: {}\r\n\r\n".format(host, len(body)).encode() + body)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            assert b' 200 ' in status, "Prediction request failed: {}".format(status)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def _run(host, port, bodies, concurrency):
+    """
+    Inner method that spreads the requests among the concurrent clients and runs them
+    """
+    latencies = []
+    await asyncio.gather(*[_client(host, port, bodies[i::concurrency], latencies) for i in range(concurrency)])
+    return latencies
+
+
+def run_load_test(listings, host=cst.SERVICE_HOST, port=cst.SERVICE_PORT, concurrency=32, nb_requests=2000,
+                  listings_per_request=1):
+    """
+    Send prediction requests to a running service and report latency and throughput
+    :param listings: (list) list of dict, raw listings used as request payloads (cycled if needed)
+    :param host: (string) not required, service host
+    :param port: (int) not required, service port
+    :param concurrency: (int) not required, number of concurrent clients
+    :param nb_requests: (int) not required, total number of requests
+    :param listings_per_request: (int) not required, number of listings priced by each request
+    :return: (dict) 'p50', 'p95', 'p99' latencies in milliseconds, 'requests_per_s' and 'listings_per_s' throughput
+    """
+    bodies = []
+    for i in range(nb_requests):
+        start = i * listings_per_request
+        batch = [listings[(start + j) % len(listings)] for j in range(listings_per_request)]
+        bodies.append(json.dumps({'listings': batch}, default=str).encode())
+
+    start = time.perf_counter()
+    latencies = asyncio.get_event_loop().run_until_complete(_run(host, port, bodies, concurrency))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    results = {'p50': np.percentile(latencies, 50), 'p95': np.percentile(latencies, 95),
+               'p99': np.percentile(latencies, 99), 'requests_per_s': nb_requests / elapsed,
+               'listings_per_s': nb_requests * listings_per_request / elapsed}
+    print("{} requests ({} concurrent clients) in {:.2f}s: {:.0f} requests/s, {:.0f} listings/s, "
+          "latency p50 {:.1f}ms, p95 {:.1f}ms, p99 {:.1f}ms"
+          .format(nb_requests, concurrency, elapsed, results['requests_per_s'], results['listings_per_s'],
+                  results['p50'], results['p95'], results['p99']))
+    return results
+
+
+if __name__ == '__main__':
+    from src.preprocessing import cleaning
+    from src.utils import datacollector
+
+    parser = argparse.ArgumentParser(description="Load test of the price prediction service")
+    parser.add_argument('--host', default=cst.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=cst.SERVICE_PORT)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--listings-per-request', type=int, default=1)
+    args = parser.parse_args()
+
+    df = datacollector.load_data_file(cst.LISTING_FULL_FILE, schema=cleaning.get_listings_input_schema())
+    run_load_test(df.sample(min(1000, df.shape[0]), random_state=42).to_dict('records'), args.host, args.port,
+                  args.concurrency, args.requests, args.listings_per_request)
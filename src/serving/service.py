@@ -0,0 +1,301 @@
+"""
+Created on 18 october 2026
+
+Local HTTP service (asyncio, no web framework) that prices raw listings on demand. The trained pipeline is loaded once,
+concurrent requests are coalesced into micro-batches so that cleaning and prediction run vectorized on several listings
+at once.
+
+Endpoints:
+    * POST /predict with a JSON body {"listings": [{...raw listing features...}, ...]} returns {"prices": [...]}
+    * GET /health
+
+@author: nidragedd
+"""
+import os
+import json
+import pickle
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import cleaning
+from src.utils import constants as cst
+from src.utils.featurestore import FeatureStore
+
+
+def save_price_model(pipeline, columns, amenities_encoder, categorical_encoder, model_file=None):
+    """
+    Save everything needed to price raw listings: the fitted pipeline (imputation + model), the training columns and
+    the encoders fitted by cleaning.clean_listings on the training data
+    :param pipeline: (object) fitted sklearn Pipeline or model with a .predict method
+    :param columns: (list) training features, in the order expected by the pipeline
+    :param amenities_encoder: (AmenitiesEncoder) encoder fitted by clean_listings
+    :param categorical_encoder: (CategoricalEncoder) encoder fitted by clean_listings
+    :param model_file: (string) not required, default is the price model file in the models directory
+    """
+    model_file = os.path.join(cst.MODELS_DIR_PATH, cst.PRICE_MODEL_FILE) if model_file is None else model_file
+    os.makedirs(os.path.dirname(model_file), exist_ok=True)
+    with open(model_file, 'wb') as f:
+        pickle.dump({'pipeline': pipeline, 'columns': list(columns), 'amenities_encoder': amenities_encoder,
+                     'categorical_encoder': categorical_encoder}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class PricePredictor(object):
+    """
+    Clean raw listings exactly as cleaning.clean_listings does and predict their price with the trained pipeline
+    """
+    def __init__(self, model_file=None):
+        """
+        :param model_file: (string) not required, default is the price model file in the models directory
+        """
+        model_file = os.path.join(cst.MODELS_DIR_PATH, cst.PRICE_MODEL_FILE) if model_file is None else model_file
+        with open(model_file, 'rb') as f:
+            artifact = pickle.load(f)
+        self.pipeline = artifact['pipeline']
+        self.columns = artifact['columns']
+        self.amenities_encoder = artifact['amenities_encoder']
+        self.categorical_encoder = artifact['categorical_encoder']
+        self.schema = cleaning.get_listings_input_schema()
+
+    def _to_frame(self, listings):
+        """
+        Inner method that builds a raw listings dataset with the columns and types of the listings file
+        :param listings: (list) list of dict, raw features of each listing (missing features are considered missing)
+        :return: (pandas DataFrame) raw listings
+        """
+        df = pd.DataFrame.from_records(listings).reindex(columns=list(self.schema))
+        for col, dtype in self.schema.items():
+            if dtype == 'float64':
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            else:
+                # Such as in the CSV file: text values (prices given as numbers are still parsed by the cleaning)
+                df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+        return df
+
+    def predict(self, listings):
+        """
+        Predict the price of raw listings
+        :param listings: (list) list of dict, raw features of each listing
+        :return: (numpy array) predicted prices
+        """
+        df_clean = cleaning.clean_listings(self._to_frame(listings), amenities_encoder=self.amenities_encoder,
+                                           categorical_encoder=self.categorical_encoder, verbose=False)
+        return np.asarray(self.pipeline.predict(df_clean.reindex(columns=self.columns)), dtype=float)
+
+    def predict_ids(self, ids, scrape_date=None, feature_store=None):
+        """
+        Predict the price of listings already cleaned by a snapshot ingestion, their features are read from the
+        feature store instead of cleaning them again
+        :param ids: (list) listing ids
+        :param scrape_date: (string) not required, default is the latest snapshot of the feature store
+        :param feature_store: (FeatureStore) not required, default is the feature store of the data directory
+        :return: (numpy array) predicted prices, NaN for listings that are not in the snapshot
+        """
+        features = (FeatureStore() if feature_store is None else feature_store).open(scrape_date)
+        X = pd.DataFrame(features.get_rows(ids, self.columns), columns=self.columns)
+        prices = np.asarray(self.pipeline.predict(X), dtype=float)
+        prices[features.lookup(ids) < 0] = np.nan
+        return prices
+
+
+class MicroBatcher(object):
+    """
+    Coalesce concurrent prediction requests: the first request waits at most max_wait_ms for others, then all waiting
+    listings (up to max_batch_size) are predicted in a single call run in a worker thread
+    """
+    def __init__(self, predictor, max_batch_size=cst.SERVICE_MAX_BATCH_SIZE, max_wait_ms=cst.SERVICE_MAX_WAIT_MS):
+        """
+        :param predictor: (PricePredictor) the predictor
+        :param max_batch_size: (int) not required, maximum number of listings per batch
+        :param max_wait_ms: (float) not required, maximum time a request waits for others
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.
+        self.queue = asyncio.Queue()
+        # A single thread: predictions are vectorized, no need to run several batches at once
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def predict(self, listings):
+        """
+        Queue listings to be predicted with the next batch
+        :param listings: (list) list of dict, raw features of each listing
+        :return: (list) predicted prices
+        """
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((listings, future))
+        return await future
+
+    async def run(self):
+        """
+        Batching loop, to be scheduled as a task of the event loop
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            requests = [await self.queue.get()]
+            nb_listings = len(requests[0][0])
+            deadline = loop.time() + self.max_wait
+            while nb_listings < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                requests.append(request)
+                nb_listings += len(request[0])
+
+            # Requests of clients that are gone are not predicted
+            requests = [request for request in requests if not request[1].done()]
+            listings = [listing for request in requests for listing in request[0]]
+            try:
+                prices = await loop.run_in_executor(self.executor, self.predictor.predict, listings)
+            except Exception:
+                # One malformed request must not fail the others: each request is predicted on its own
+                for request in requests:
+                    await self._predict_one(request)
+                continue
+            start = 0
+            for request_listings, future in requests:
+                if not future.done():
+                    future.set_result(prices[start:start + len(request_listings)].tolist())
+                start += len(request_listings)
+
+    async def _predict_one(self, request):
+        """
+        Inner method that predicts a single request, its future gets the prices or the error
+        :param request: (tuple) listings of the request and its future
+        """
+        listings, future = request
+        try:
+            prices = await asyncio.get_event_loop().run_in_executor(self.executor, self.predictor.predict, listings)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(prices.tolist())
+
+
+async def _send_response(writer, status, payload):
+    """
+    Inner method that writes a JSON HTTP response
+    :param writer: (asyncio StreamWriter) connection
+    :param status: (string) HTTP status, such as '200 OK'
+    :param payload: (dict) JSON body
+    """
+    body = json.dumps(payload).encode()
+    writer.write("HTTP/1.1 {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n"
+                 .format(status, len(body)).encode() + body)
+    await writer.drain()
+
+
+def build_handler(batcher):
+    """
+    Build the asyncio connection handler of the service. Connections are kept alive until the client closes them
+    :param batcher: (MicroBatcher) the batcher used for predictions
+    :return: (coroutine function) handler for asyncio.start_server
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode().split(' ', 2)
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, value = line.decode().split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                    content_length = int(headers.get('content-length', 0))
+                    if content_length < 0:
+                        raise ValueError("negative Content-Length")
+                except ValueError as e:
+                    # The rest of the stream cannot be trusted: the client gets an answer then the connection is closed
+                    await _send_response(writer, '400 Bad Request', {'error': 'malformed request: {}'.format(e)})
+                    break
+                body = await reader.readexactly(content_length)
+
+                if method == 'GET' and path == '/health':
+                    await _send_response(writer, '200 OK', {'status': 'ok'})
+                elif method == 'POST' and path == '/predict':
+                    try:
+                        payload = json.loads(body.decode())
+                        listings = payload['listings'] if isinstance(payload, dict) and 'listings' in payload \
+                            else [payload]
+                        prices = await batcher.predict(listings)
+                    except (ValueError, KeyError, TypeError) as e:
+                        await _send_response(writer, '400 Bad Request', {'error': str(e)})
+                    except Exception as e:
+                        # Such as a coherence check of the cleaning, the client still gets an answer
+                        await _send_response(writer, '500 Internal Server Error',
+                                             {'error': '{}: {}'.format(type(e).__name__, e)})
+                    else:
+                        await _send_response(writer, '200 OK', {'prices': prices})
+                else:
+                    await _send_response(writer, '404 Not Found', {'error': 'unknown endpoint'})
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def start_service(predictor, host=cst.SERVICE_HOST, port=cst.SERVICE_PORT,
+                        max_batch_size=cst.SERVICE_MAX_BATCH_SIZE, max_wait_ms=cst.SERVICE_MAX_WAIT_MS):
+    """
+    Start the prediction service in the running event loop
+    :param predictor: (PricePredictor) the predictor
+    :param host: (string) not required, interface to listen on
+    :param port: (int) not required, port to listen on (0 to let the system choose one)
+    :param max_batch_size: (int) not required, maximum number of listings per batch
+    :param max_wait_ms: (float) not required, maximum time a request waits for others
+    :return: (tuple) asyncio server, batching task
+    """
+    batcher = MicroBatcher(predictor, max_batch_size, max_wait_ms)
+    batch_task = asyncio.ensure_future(batcher.run())
+    server = await asyncio.start_server(build_handler(batcher), host, port)
+    print("Price prediction service listening on {}:{}".format(*server.sockets[0].getsockname()[:2]))
+    return server, batch_task
+
+
+def serve(model_file=None, host=cst.SERVICE_HOST, port=cst.SERVICE_PORT, max_batch_size=cst.SERVICE_MAX_BATCH_SIZE,
+          max_wait_ms=cst.SERVICE_MAX_WAIT_MS):
+    """
+    Load the price model and run the prediction service until interrupted
+    :param model_file: (string) not required, default is the price model file in the models directory
+    :param host: (string) not required, interface to listen on
+    :param port: (int) not required, port to listen on
+    :param max_batch_size: (int) not required, maximum number of listings per batch
+    :param max_wait_ms: (float) not required, maximum time a request waits for others
+    """
+    predictor = PricePredictor(model_file)
+    loop = asyncio.get_event_loop()
+    server, _ = loop.run_until_complete(start_service(predictor, host, port, max_batch_size, max_wait_ms))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Airbnb listings price prediction service")
+    parser.add_argument('--model', default=None, help="path to the price model file")
+    parser.add_argument('--host', default=cst.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=cst.SERVICE_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=cst.SERVICE_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=cst.SERVICE_MAX_WAIT_MS)
+    args = parser.parse_args()
+    serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait_ms)
@@ -0,0 +1,77 @@
+"""
+Created on 18 october 2026
+
+Price model scored with NumPy only, from the arrays exported by modeling.treeexport: no xgboost nor sklearn import
+which makes batch scoring jobs and short-lived workers start much faster. Arrays are memory-mapped, so workers that
+load the same model share its pages
+
+@author: nidragedd
+"""
+import os
+import json
+
+import numpy as np
+
+from src.utils import constants as cst
+
+
+class TreeModel(object):
+    """
+    Impute cleaned listings with the fitted imputation values then evaluate all trees over a batch at once: at each
+    step, every (listing, tree) pair moves down one level
+    """
+    def __init__(self, model_dir=cst.TREE_MODEL_DIR_PATH, mmap=True):
+        """
+        :param model_dir: (string) not required, directory of the exported model (see treeexport.export_tree_model)
+        :param mmap: (boolean) not required, default is True to memory-map the arrays instead of reading them
+        """
+        with open(os.path.join(model_dir, cst.TREE_MODEL_INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        splits = np.load(os.path.join(model_dir, cst.TREE_MODEL_SPLITS_FILE), mmap_mode=mmap_mode)
+        values = np.load(os.path.join(model_dir, cst.TREE_MODEL_VALUES_FILE), mmap_mode=mmap_mode)
+        self.feature, self.left, self.right, self.missing = (splits[:, i] for i in range(4))
+        self.threshold, self.leaf_value = values[:, 0], values[:, 1]
+        self.fill_values = np.load(os.path.join(model_dir, cst.TREE_MODEL_FILL_VALUES_FILE))
+        self.columns = index['columns']
+        self.feature_positions = np.asarray(index['feature_positions'], dtype=np.int64)
+        self.roots = np.asarray(index['roots'], dtype=np.int32)
+        self.max_depth = index['max_depth']
+        self.base_score = index['base_score']
+
+    def _prepare(self, X):
+        """
+        Inner method that reorders features as the model expects them and fills missing values
+        :param X: (pandas DataFrame or 2D numpy array) cleaned features, arrays must follow the columns order
+        :return: (numpy array) float32 features
+        """
+        if hasattr(X, 'columns'):
+            X = X[self.columns].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)[:, self.feature_positions]
+        X = np.where(np.isnan(X), self.fill_values, X)
+        # XGBoost compares float32 values with float32 thresholds
+        return X.astype(np.float32)
+
+    def _predict_batch(self, X):
+        """
+        Inner method that sums the leaf values of all trees for a batch of prepared features
+        """
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        rows = np.arange(X.shape[0])[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            nodes = np.where(np.isnan(x), self.missing[nodes],
+                             np.where(x < self.threshold[nodes], self.left[nodes], self.right[nodes]))
+        return self.leaf_value[nodes].sum(axis=1, dtype=np.float32) + np.float32(self.base_score)
+
+    def predict(self, X, batch_size=cst.TREE_MODEL_BATCH_SIZE):
+        """
+        Predict the price of cleaned listings
+        :param X: (pandas DataFrame or 2D numpy array) cleaned features, arrays must follow the columns order
+        :param batch_size: (int) not required, number of listings evaluated at once (memory grows with batch size times
+        number of trees)
+        :return: (numpy array) predicted prices
+        """
+        X = self._prepare(X)
+        return np.concatenate([self._predict_batch(X[start:start + batch_size])
+                               for start in range(0, max(X.shape[0], 1), batch_size)])
@@ -0,0 +1,339 @@
+"""
+Created on 18 october 2026
+
+Utility package used to measure how long the heavy operations of this project take
+
+@author: nidragedd
+"""
+import os
+import json
+import time
+import platform
+import datetime
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.modeling import modeling
+from src.preprocessing import cleaning
+from src.preprocessing.cube import CalendarCube
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils import synthetic
+
+
+def time_call(func, *args, **kwargs):
+    """
+    Call the given function with the given arguments and measure its wall time
+    :param func: (function) the function to call
+    :return: (tuple) the result of the call, elapsed time in seconds
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def measure_call(func, *args, **kwargs):
+    """
+    Call the given function with the given arguments and measure its wall time and its peak of memory allocations.
+    Memory is measured with tracemalloc, which sees Python objects and numpy arrays but not the buffers allocated by C
+    code outside of Python allocators (such as the tokenizer of the pandas CSV parser): the peak is a lower bound of the
+    memory actually used. If tracemalloc is already tracing (instrumented stages, nested calls), it is left running and
+    the peak is taken relative to the memory traced when the call starts, then it is an upper bound of the peak of the
+    call if an enclosing peak was higher
+    :param func: (function) the function to call
+    :return: (tuple) the result of the call, elapsed time in seconds, peak memory in bytes
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        result, elapsed = time_call(func, *args, **kwargs)
+        peak = max(0, tracemalloc.get_traced_memory()[1] - start_memory)
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark_cached_loading(filenames=None):
+    """
+    Compare a cold load (gzip + CSV parsing) with a warm load (typed columnar cache) for the given raw data files.
+    Caches are (re)built during the run
+    :param filenames: (list) not required, default is the calendar and the full listings files
+    :return: (dict) key is the file name and value is a tuple (cold load time, warm load time) in seconds
+    """
+    if filenames is None:
+        filenames = [cst.CALENDAR_FILE, cst.LISTING_FULL_FILE]
+
+    timings = {}
+    for filename in filenames:
+        df, cold = time_call(datacollector.load_data_file, filename, use_cache=False)
+        datacollector.build_cache(filename)
+        _, warm = time_call(datacollector.load_data_file, filename)
+        timings[filename] = (cold, warm)
+        print("File {} ({} rows): CSV load {:.2f}s, cache load {:.2f}s (x{:.1f} faster)"
+              .format(filename, df.shape[0], cold, warm, cold / warm))
+    return timings
+
+
+def _legacy_clean_currency_columns(df, columns):
+    """
+    Inner method, former row-wise implementation of cleaning.clean_currency_columns kept as the benchmark reference
+    """
+    for column in columns:
+        df[column] = df[column].apply(lambda x: str.replace(x, '$', '') if not pd.isnull(x) else x)
+        df[column] = df[column].apply(lambda x: str.replace(x, ',', '') if not pd.isnull(x) else x)
+        df[column] = df[column].astype("float64")
+    return df
+
+
+def _legacy_transform_t_f(df, columns):
+    """
+    Inner method, former implementation of cleaning.transform_t_f kept as the benchmark reference
+    """
+    df[columns] = df[columns].map({'t': 1, 'f': 0})
+    return df
+
+
+def _build_calendar_like_frame(nb_rows, seed=42):
+    """
+    Inner method that builds a raw calendar-like dataset ('$1,234.00' prices, 't'/'f' availability)
+    :param nb_rows: (int) number of rows
+    :param seed: (int) not required, random seed
+    :return: (pandas DataFrame) the raw dataset
+    """
+    rng = np.random.RandomState(seed)
+    prices = pd.Series(rng.randint(10, 3000, size=nb_rows)).map('${:,.2f}'.format)
+    prices[rng.rand(nb_rows) < 0.001] = np.nan
+    return pd.DataFrame({'available': np.where(rng.rand(nb_rows) < 0.3, 't', 'f').astype(object),
+                         'price': prices.astype(object), 'adjusted_price': prices.astype(object)})
+
+
+def benchmark_calendar_cleaning(nb_rows=5000000):
+    """
+    Compare the former row-wise cleaning of the calendar dataset with the vectorized one (with compact dtypes), both in
+    terms of time and memory footprint of the cleaned dataset
+    :param nb_rows: (int) not required, default is 5 millions rows (about the size of one year of Paris calendar)
+    :return: (dict) times in seconds and memory in bytes for the 'legacy' and 'vectorized' implementations
+    """
+    df_raw = _build_calendar_like_frame(nb_rows)
+
+    def _legacy(df):
+        df = _legacy_transform_t_f(df, 'available')
+        return _legacy_clean_currency_columns(df, ['price', 'adjusted_price'])
+
+    def _vectorized(df):
+        df = cleaning.transform_t_f(df, 'available', dtype="int8")
+        return cleaning.clean_currency_columns(df, ['price', 'adjusted_price'], dtype="float32")
+
+    results = {}
+    for name, func in [('legacy', _legacy), ('vectorized', _vectorized)]:
+        df, elapsed = time_call(func, df_raw.copy())
+        memory = df.memory_usage(deep=True).sum()
+        results[name] = (elapsed, memory)
+        print("{} cleaning of {} rows: {:.2f}s, {:.1f} MB".format(name, nb_rows, elapsed, memory / 1024 ** 2))
+    print("Speedup: x{:.1f}, memory reduction: x{:.1f}".format(results['legacy'][0] / results['vectorized'][0],
+                                                               results['legacy'][1] / results['vectorized'][1]))
+    return results
+
+
+def benchmark_listings_projection():
+    """
+    Compare loading + cleaning the full listings file with all its columns against loading only the columns declared in
+    cleaning.get_listings_input_schema() (CSV file is parsed in both cases, no cache involved)
+    :return: (dict) load time in seconds, cleaning time in seconds, size of the loaded dataset in bytes and peak memory
+    allocations in bytes (see measure_call, buffers of the CSV parser are not counted) for 'all columns' and 'projected'
+    loading
+    """
+    def _run(schema):
+        df, load_time = time_call(datacollector.load_data_file, cst.LISTING_FULL_FILE, use_cache=False, schema=schema)
+        loaded_size = df.memory_usage(deep=True).sum()
+        _, clean_time = time_call(cleaning.clean_listings, df)
+        return load_time, clean_time, loaded_size
+
+    results = {}
+    for name, schema in [('all columns', None), ('projected', cleaning.get_listings_input_schema())]:
+        (load_time, clean_time, loaded_size), _, peak = measure_call(_run, schema)
+        results[name] = (load_time, clean_time, loaded_size, peak)
+    for name, (load_time, clean_time, loaded_size, peak) in results.items():
+        print("{}: load {:.2f}s, cleaning {:.2f}s, loaded dataset {:.1f} MB, peak traced memory {:.1f} MB"
+              .format(name, load_time, clean_time, loaded_size / 1024 ** 2, peak / 1024 ** 2))
+    return results
+
+
+def _setup_listings(nb_rows):
+    """
+    Inner method, raw listings restricted to the input columns of clean_listings
+    """
+    return synthetic.generate_listings(nb_rows)[list(cleaning.get_listings_input_schema())]
+
+
+def _setup_results(nb_rows, nb_models=5, seed=42):
+    """
+    Inner method, results dataset such as the one built in the modeling notebooks (y_true and one column per model)
+    """
+    rng = np.random.RandomState(seed)
+    y_true = rng.lognormal(4.4, 0.5, nb_rows).round()
+    df = pd.DataFrame({'y_true': y_true})
+    for i in range(nb_models):
+        df['y_model_{}'.format(i)] = y_true * (1 + rng.normal(0, 0.3, nb_rows))
+    return df
+
+
+def _setup_imputation(nb_rows):
+    """
+    Inner method, cleaned listings features (without the target) given to the imputation step of the pipelines
+    """
+    return synthetic.get_synthetic_clean_listings(nb_rows).drop(columns=['price'])
+
+
+def _setup_viz_listings(nb_rows):
+    """
+    Inner method, listings with parsed prices as given to the visualization functions
+    """
+    return cleaning.clean_currency_columns(synthetic.generate_listings(nb_rows), ['price'])
+
+
+def _setup_viz_calendar(nb_rows):
+    """
+    Inner method, cleaned calendar with the neighbourhood of each listing as given to the visualization functions
+    """
+    df = synthetic.generate_calendar(nb_rows)
+    df = cleaning.clean_currency_columns(cleaning.transform_t_f(df, 'available'), ['price', 'adjusted_price'])
+    neighbourhoods = synthetic.generate_listings(df['listing_id'].max()).set_index('id')['neighbourhood']
+    df['neighbourhood'] = df['listing_id'].map(neighbourhoods)
+    return df
+
+
+def _run_viz_listings_groupbys(df):
+    """
+    Inner method, aggregates computed by plot_listings_summary_neighbourhood and plot_room_type_mean_price
+    """
+    df['neighbourhood'].value_counts()
+    for column in ['availability_365', 'price', 'minimum_nights', 'reviews_per_month',
+                   'calculated_host_listings_count']:
+        df.groupby('neighbourhood')[column].mean()
+    df.groupby('room_type')['price'].mean()
+
+
+def _run_viz_calendar_groupbys(df):
+    """
+    Inner method, aggregates computed by lineplot_feature_over_time (per date and per date and neighbourhood)
+    """
+    df.groupby('date')['price'].mean()
+    df.groupby(['date', 'neighbourhood'])['price'].mean()
+
+
+def _run_viz_calendar_cube(df):
+    """
+    Inner method, same aggregates as _run_viz_calendar_groupbys read from the calendar cube built in one pass
+    """
+    cube = CalendarCube.from_frame(df)
+    cube.aggregate('price', 'date')
+    cube.aggregate('price', ['date', 'neighbourhood'])
+
+
+def get_benchmark_cases():
+    """
+    Cases of the benchmark suite. Setup functions build the input data from synthetic datasets (not timed), run
+    functions are the timed operations. Run functions must not modify their input (it is reused between repetitions)
+    :return: (dict) key is the case name and value is a tuple (setup function, run function)
+    """
+    one_hot_cols = ['neighbourhood_cleansed', 'room_type', 'bed_type', 'cancellation_policy']
+    currency_cols = ['price', 'security_deposit', 'cleaning_fee', 'extra_people']
+    return {
+        'clean_listings': (_setup_listings, lambda df: cleaning.clean_listings(df.copy(), verbose=False)),
+        'encode_categorical': (_setup_listings, lambda df: cleaning.encode_categorical(df, one_hot_cols,
+                                                                                       verbose=False)),
+        'clean_currency_columns': (_setup_listings, lambda df: cleaning.clean_currency_columns(df, currency_cols,
+                                                                                               inplace=False)),
+        'split_host_location': (_setup_viz_listings, lambda df: cleaning.split_host_location(df['host_location'])),
+        'classify_results': (_setup_results, lambda df: modeling.classify_results(df.copy())),
+        'imputation': (_setup_imputation, lambda df: modeling.get_column_transformer().fit_transform(df)),
+        'viz_listings_groupbys': (_setup_viz_listings, _run_viz_listings_groupbys),
+        'viz_calendar_groupbys': (_setup_viz_calendar, _run_viz_calendar_groupbys),
+        'viz_calendar_cube': (_setup_viz_calendar, _run_viz_calendar_cube),
+    }
+
+
+def _get_git_commit():
+    """
+    Inner method that gives the current git commit, if any
+    :return: (string) short hash of the commit or None
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark_suite(sizes=None, cases=None, repeat=3, label=None, results_file=cst.BENCHMARK_RESULTS_FILE):
+    """
+    Run the benchmark suite on synthetic data of several sizes and append the results to the results file
+    :param sizes: (list) not required, number of rows of the input data. Default is cst.BENCHMARK_SIZES (up to 10
+    millions rows can be used, memory permitting)
+    :param cases: (list) not required, names of the cases to run. Default is all of get_benchmark_cases()
+    :param repeat: (int) not required, number of timed runs per case and size (best and median times are kept)
+    :param label: (string) not required, free text to identify the run (such as the name of the optimization tried)
+    :param results_file: (string) not required, JSON lines file where results are appended
+    :return: (pandas DataFrame) results of this run, one row per case and size
+    """
+    sizes = cst.BENCHMARK_SIZES if sizes is None else sizes
+    all_cases = get_benchmark_cases()
+    cases = list(all_cases) if cases is None else cases
+    run = {'run_id': datetime.datetime.now().strftime('%Y%m%d-%H%M%S'), 'label': label, 'commit': _get_git_commit(),
+           'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__}
+
+    records = []
+    for nb_rows in sizes:
+        for case in cases:
+            setup, func = all_cases[case]
+            data = setup(nb_rows)
+            times = [time_call(func, data)[1] for _ in range(repeat)]
+            record = dict(run, case=case, nb_rows=nb_rows, repeat=repeat, best_s=min(times),
+                          median_s=float(np.median(times)))
+            records.append(record)
+            print("{} on {} rows: best {:.3f}s, median {:.3f}s".format(case, nb_rows, record['best_s'],
+                                                                        record['median_s']))
+            del data
+
+    os.makedirs(os.path.dirname(results_file), exist_ok=True)
+    with open(results_file, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return pd.DataFrame(records)
+
+
+def compare_benchmark_runs(baseline_run=None, candidate_run=None, threshold=cst.BENCHMARK_REGRESSION_THRESHOLD,
+                           results_file=cst.BENCHMARK_RESULTS_FILE):
+    """
+    Compare the best times of two runs of the benchmark suite, for the cases and sizes they have in common
+    :param baseline_run: (string) not required, run_id of the reference run. Default is the second latest run
+    :param candidate_run: (string) not required, run_id of the run to check. Default is the latest run
+    :param threshold: (float) not required, a case is a regression when it is slower than the baseline by more than
+    this ratio (0.1 means 10% slower)
+    :param results_file: (string) not required, JSON lines file of the results
+    :return: (pandas DataFrame) one row per case and size with both times, their ratio and a 'regression' flag
+    """
+    df = pd.read_json(results_file, lines=True, dtype={'run_id': str})
+    run_ids = sorted(df['run_id'].unique())
+    assert len(run_ids) >= 2 or (baseline_run is not None and candidate_run is not None), \
+        "At least 2 runs are needed for a comparison"
+    baseline_run = run_ids[-2] if baseline_run is None else baseline_run
+    candidate_run = run_ids[-1] if candidate_run is None else candidate_run
+
+    keys = ['case', 'nb_rows']
+    df_cmp = df[df['run_id'] == baseline_run].set_index(keys)[['best_s']].join(
+        df[df['run_id'] == candidate_run].set_index(keys)[['best_s']], how='inner', lsuffix='_baseline',
+        rsuffix='_candidate')
+    df_cmp['ratio'] = df_cmp['best_s_candidate'] / df_cmp['best_s_baseline']
+    df_cmp['regression'] = df_cmp['ratio'] > 1 + threshold
+    print("Run {} compared to run {}: {} regression(s) out of {} cases".format(candidate_run, baseline_run,
+                                                                             df_cmp['regression'].sum(),
+                                                                             df_cmp.shape[0]))
+    return df_cmp.reset_index()
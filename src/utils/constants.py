@@ -9,8 +9,28 @@ Constants file
 DATA_DIR_PATH = "../data"
 CLEAN_DATA_DIR_PATH = DATA_DIR_PATH + "/clean"
 RESULTS_DIR_PATH = DATA_DIR_PATH + "/results"
+CACHE_DIR_PATH = DATA_DIR_PATH + "/cache"
+LOGS_DIR_PATH = DATA_DIR_PATH + "/logs"
 
-DATA_BASE_URL = "http://data.insideairbnb.com/france/ile-de-france/paris/2019-07-09/"
+SNAPSHOTS_DIR_PATH = DATA_DIR_PATH + "/snapshots"
+
+INSIDE_AIRBNB_URL = "http://data.insideairbnb.com/"
+# Path of each city on Inside Airbnb, scrape dates are specific to each city (see the "get the data" page)
+CITIES = {
+    'paris': "france/ile-de-france/paris",
+    'lyon': "france/auvergne-rhone-alpes/lyon",
+    'bordeaux': "france/nouvelle-aquitaine/bordeaux",
+    'london': "united-kingdom/england/london",
+    'amsterdam': "the-netherlands/north-holland/amsterdam",
+    'berlin': "germany/be/berlin",
+    'madrid': "spain/comunidad-de-madrid/madrid",
+    'barcelona': "spain/catalonia/barcelona",
+    'rome': "italy/lazio/rome",
+    'new-york-city': "united-states/ny/new-york-city"
+}
+CITY_BASE_URL = INSIDE_AIRBNB_URL + CITIES['paris'] + "/"
+SCRAPE_DATE = "2019-07-09"
+DATA_BASE_URL = CITY_BASE_URL + SCRAPE_DATE + "/"
 LISTING_FULL_FILE = "listings.csv.gz"
 LISTING_LIGHT_FILE = "listings.csv"
 CALENDAR_FILE = "calendar.csv.gz"
@@ -23,6 +43,79 @@ DATA_REVIEWS = DATA_BASE_URL + "data/" + REVIEWS_FILE
 DATA_LISTING_LIGHT = DATA_BASE_URL + "visualisations/" + LISTING_LIGHT_FILE
 DATA_NEIGHBOURHOODS = DATA_BASE_URL + "visualisations/" + NEIGHBOURHOODS_FILE
 
+# Downloads
+MANIFEST_FILE = "manifest.json"
+DOWNLOAD_MAX_WORKERS = 4
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_PART_EXTENSION = ".part"
+# Version of the remote file a partial download comes from, kept next to the partial file
+DOWNLOAD_PART_META_EXTENSION = ".json"
+
+# Snapshots
+SNAPSHOT_HASHES_FILE = "listings_hashes.parquet"
+SNAPSHOT_CLEAN_FILE = "listings_clean.parquet"
+SNAPSHOT_ENCODERS_FILE = "listings_encoders.pkl"
+
+# Feature store: cleaned features of each snapshot, keyed by listing id (see src/utils/featurestore.py)
+FEATURE_STORE_DIR_PATH = DATA_DIR_PATH + "/features"
+FEATURE_STORE_REGISTRY_FILE = "columns_registry.json"
+FEATURE_STORE_X_FILE = "features.npy"
+FEATURE_STORE_TARGET_FILE = "target.npy"
+FEATURE_STORE_IDS_FILE = "ids.npy"
+FEATURE_STORE_HASH_KEYS_FILE = "hash_keys.npy"
+FEATURE_STORE_HASH_POSITIONS_FILE = "hash_positions.npy"
+FEATURE_STORE_INDEX_FILE = "index.json"
+FEATURE_STORE_DATA_DIR_PREFIX = "data_"
+FEATURE_STORE_LOCK_FILE = ".lock"
+FEATURE_STORE_LOCK_TIMEOUT = 60
+FEATURE_STORE_TARGET = 'price'
+
+# Typed columnar cache: columns parsed once when the raw file is converted (other columns keep read_csv inference)
+CACHE_FORMAT_VERSION = 2
+CACHE_FILE_EXTENSION = ".parquet"
+NAME_INDEX_FILE = "listings_name_index.pkl"
+CACHE_PARSE_DATES = {
+    LISTING_FULL_FILE: ['last_scraped', 'host_since', 'calendar_last_scraped', 'first_review', 'last_review'],
+    LISTING_LIGHT_FILE: ['last_review'],
+    CALENDAR_FILE: ['date'],
+    REVIEWS_FILE: ['date'],
+    NEIGHBOURHOODS_FILE: []
+}
+CACHE_CATEGORIES = {
+    LISTING_FULL_FILE: ['experiences_offered', 'host_response_time', 'neighbourhood_cleansed', 'property_type',
+                        'room_type', 'bed_type', 'cancellation_policy'],
+    LISTING_LIGHT_FILE: ['neighbourhood', 'room_type'],
+    CALENDAR_FILE: [],
+    REVIEWS_FILE: [],
+    NEIGHBOURHOODS_FILE: []
+}
+# Currency columns stored as floats ('$1,200.00' becomes 1200.0)
+CACHE_CURRENCY_COLUMNS = {
+    CALENDAR_FILE: ['price', 'adjusted_price']
+}
+
+# Streaming aggregation of the calendar dataset
+CALENDAR_CHUNK_SIZE = 1000000
+CALENDAR_AGG_FEATURES = ['price', 'adjusted_price', 'adjusted_price_delta', 'available']
+# Aliases of host location parts, keyed by (part, raw value), see cleaning.split_host_location
+HOST_LOCATION_ALIASES = {('country', 'FR'): 'France', ('country', 'US'): 'United States',
+                         ('country', 'GB'): 'United Kingdom', ('country', 'IT'): 'Italy', ('country', 'CN'): 'China',
+                         ('country', 'London'): 'United Kingdom', ('country', 'LONDON'): 'United Kingdom'}
+HOST_LOCATION_PARTS = ['city', 'region', 'country']
+
+# Calendar aggregate cube per (neighbourhood, date) used by the time series plots (see src/preprocessing/cube.py)
+CALENDAR_CUBE_FEATURES = ['price', 'adjusted_price', 'available']
+CALENDAR_CUBE_FILE = CACHE_DIR_PATH + "/calendar_cube.npz"
+
+# Streaming text processing of the reviews dataset
+REVIEWS_CHUNK_SIZE = 100000
+REVIEWS_INDEX_DIR_PATH = DATA_DIR_PATH + "/reviews_index"
+REVIEWS_INDEX_PART_FILE = "terms-{:05d}.parquet"
+REVIEWS_PER_LISTING_FILE = "reviews_per_listing.parquet"
+REVIEWS_PER_MONTH_FILE = "reviews_per_listing_month.parquet"
+SPACY_MODEL = "fr_core_news_sm"
+
 LST_X_TRAIN_FILE = 'full_listings_x_train.csv'
 LST_Y_TRAIN_FILE = 'full_listings_y_train.csv'
 LST_X_VAL_FILE = 'full_listings_x_val.csv'
@@ -30,4 +123,81 @@ LST_Y_VAL_FILE = 'full_listings_y_val.csv'
 LST_X_TEST_FILE = 'full_listings_x_test.csv'
 LST_Y_TEST_FILE = 'full_listings_y_test.csv'
 
+# Binary bundle of the 6 splits: float32 features of all splits stacked in a single memory-mappable array
+LST_SPLITS_BUNDLE_DIR = 'full_listings_splits'
+LST_SPLITS_X_FILE = 'x.npy'
+LST_SPLITS_Y_FILE = 'y.npy'
+LST_SPLITS_INDEX_FILE = 'index.json'
+LST_SPLITS_DMATRIX_FILE = '{}.dmatrix'
+LST_SPLITS_NAMES = ['train', 'val', 'test']
+
+CV_LOG_FILE = LOGS_DIR_PATH + "/xgb_cv_curves.jsonl"
+CV_CACHE_DIR_PATH = CACHE_DIR_PATH + "/cv"
+CV_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Training data shared with the search workers and imputed folds (see modeling.SharedDataRandomSearch)
+SHARED_DATA_X_FILE = 'x.npy'
+SHARED_DATA_COLUMNS_FILE = 'columns.json'
+FOLD_IMPUTER_FILE = 'imputer_{}.pkl'
+FOLD_IMPUTED_FILE = 'imputed_{}.npy'
+
+MODELS_DIR_PATH = DATA_DIR_PATH + "/models"
+PRICE_MODEL_FILE = "price_model.pkl"
+# Trees of the price model flattened into NumPy arrays (see src/modeling/treeexport.py and src/serving/treemodel.py)
+TREE_MODEL_DIR_PATH = MODELS_DIR_PATH + "/price_trees"
+TREE_MODEL_INDEX_FILE = "model.json"
+TREE_MODEL_SPLITS_FILE = "splits.npy"
+TREE_MODEL_VALUES_FILE = "values.npy"
+TREE_MODEL_FILL_VALUES_FILE = "fill_values.npy"
+TREE_MODEL_BATCH_SIZE = 4096
+
+# Prediction service
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_MAX_BATCH_SIZE = 256
+SERVICE_MAX_WAIT_MS = 5
+
 LST_RESULTS_FILE = 'listings_price_prediction.csv'
+
+# Evaluation: classes of absolute percentage error between predicted and true price (upper bounds are included)
+PRICE_ERROR_BINS = [2, 5, 10, 20, 40]
+PRICE_ERROR_CLASSES = ['1-very accurate (< 2%)', '2-pretty good (2% < x < 5%)', '3-good (5% < x < 10%)',
+                       '4-acceptable (10% < x < 20%)', '5-bad (20% < x < 40%)', '6-awful (> 40%)']
+BOOTSTRAP_NB_RESAMPLES = 1000
+BOOTSTRAP_MAX_BATCH_BYTES = 256 * 1024 ** 2
+
+# Stage instrumentation (see src/utils/instrumentation.py), disabled by default
+STAGES_LOG_FILE = LOGS_DIR_PATH + "/stages.jsonl"
+
+# Benchmark suite (see src/utils/benchmark.py): results of all runs are appended so that they can be compared
+BENCHMARK_RESULTS_FILE = LOGS_DIR_PATH + "/benchmarks.jsonl"
+BENCHMARK_SIZES = [10000, 100000, 1000000]
+BENCHMARK_REGRESSION_THRESHOLD = 0.1
+
+# Imputation of the modeling pipelines (see modeling.get_column_transformer and outofcore.ChunkedImputer)
+IMPUTATION_MODE_FEATURES = ['host_is_superhost', 'host_identity_verified', 'bathrooms', 'bedrooms', 'beds',
+                            'security_deposit', 'review_scores_accuracy', 'review_scores_cleanliness',
+                            'review_scores_checkin', 'review_scores_communication', 'review_scores_location',
+                            'review_scores_value', 'review_scores_rating']
+IMPUTATION_MEAN_FEATURES = ['cleaning_fee', 'reviews_per_month']
+
+# Out-of-core training: splits are read from disk by chunks of this number of rows
+OOC_CHUNK_SIZE = 100000
+OOC_CACHE_DIR_PATH = CACHE_DIR_PATH + "/xgb_external_memory"
+
+# Amenities owned by less than this share of the listings are dropped (642 listings for Paris, 1% of 64293 listings)
+AMENITIES_MIN_SHARE = 0.01
+
+# Multi-city pipeline (see src/pipeline/cities.py): one directory per city and scrape date
+CITIES_DIR_PATH = DATA_DIR_PATH + "/cities"
+CITIES_SUMMARY_FILE = "cities_summary.csv"
+CITIES_XGB_PARAMS = {'objective': 'reg:squarederror', 'n_estimators': 300, 'learning_rate': 0.1,
+                     'colsample_bytree': 0.6, 'max_depth': 6, 'seed': 42}
+
+# Incremental model updates on new snapshots (see src/modeling/incremental.py)
+INCREMENTAL_STATE_FILE = "price_model_incremental.pkl"
+WARM_START_ROUNDS = 50
+WARM_START_EARLY_STOPPING_ROUNDS = 10
+WARM_START_MAX_RMSE_DRIFT = 0.05
+# Listings whose id modulo this value is 0 are the validation set (early stopping of warm starts), 1 the holdout set
+# (drift guard): both stay the same from one snapshot to another
+VALIDATION_ID_MODULO = 10
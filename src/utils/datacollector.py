@@ -6,10 +6,18 @@ Utility package used by notebooks to collect data
 @author: nidragedd
 """
 import os
+import json
 import shutil
+import hashlib
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
 
+from src.preprocessing import cleaning
 from src.utils import constants as cst
+from src.utils import instrumentation
 
 
 def _build_data_dir(data_dir):
@@ -23,14 +31,15 @@ def _build_data_dir(data_dir):
     os.makedirs(data_dir, exist_ok=True)
 
 
-def get_data_file(filename, from_clean_dir=False):
+def get_data_file(filename, from_clean_dir=False, data_dir=cst.DATA_DIR_PATH):
     """
     Get the full path to the data file with given file name
     :param filename: (string) data file name to load
     :param from_clean_dir: (boolean) not required, default is False. If True, file is loaded from data clean directory
+    :param data_dir: (string) not required, default is the DATA folder. Used if from_clean_dir is False
     :return: (string) full path to the data file with given file name
     """
-    data_dir = cst.CLEAN_DATA_DIR_PATH if from_clean_dir else cst.DATA_DIR_PATH
+    data_dir = cst.CLEAN_DATA_DIR_PATH if from_clean_dir else data_dir
     return os.path.join(data_dir, filename)
 
 
@@ -42,52 +51,431 @@ def get_files_list():
     return [cst.LISTING_FULL_FILE, cst.LISTING_LIGHT_FILE, cst.CALENDAR_FILE, cst.REVIEWS_FILE, cst.NEIGHBOURHOODS_FILE]
 
 
-def _download_file_from_url(url, local_filename):
+def _get_cache_files(filename, cache_dir=cst.CACHE_DIR_PATH):
     """
-    Download a file from the given url and save it in DATA folder under the given local filename
+    Inner method that gives the path to the typed columnar cache file and its metadata file for a given raw file
+    :param filename: (string) raw data file name
+    :param cache_dir: (string) not required, default is the CACHE folder
+    :return: (tuple) path to the cache file, path to the metadata file
+    """
+    # Full file name is kept ('listings.csv.gz' and 'listings.csv' are different files)
+    cache_file = os.path.join(cache_dir, filename.replace('.', '_') + cst.CACHE_FILE_EXTENSION)
+    return cache_file, cache_file + ".meta.json"
+
+
+def _get_source_signature(source_file):
+    """
+    Inner method that builds the signature of a raw data file, used to know if its cache is still valid
+    :param source_file: (string) path to the raw data file
+    :return: (dict) cache format version, size and last modification time of the raw file
+    """
+    stat = os.stat(source_file)
+    return {'version': cst.CACHE_FORMAT_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _is_cache_valid(filename, data_dir=cst.DATA_DIR_PATH, cache_dir=cst.CACHE_DIR_PATH):
+    """
+    Inner method that checks whether the cache of a raw data file exists and has been built from the current raw file
+    :param filename: (string) raw data file name
+    :param data_dir: (string) not required, default is the DATA folder
+    :param cache_dir: (string) not required, default is the CACHE folder
+    :return: (boolean) True if the cache can be reused
+    """
+    cache_file, meta_file = _get_cache_files(filename, cache_dir)
+    if not os.path.exists(cache_file) or not os.path.exists(meta_file):
+        return False
+    with open(meta_file, 'r') as f:
+        meta = json.load(f)
+    return meta == _get_source_signature(get_data_file(filename, data_dir=data_dir))
+
+
+@instrumentation.instrumented()
+def read_raw_data_file(filename, schema=None, data_dir=cst.DATA_DIR_PATH):
+    """
+    Parse a raw data file (CSV, compressed or not) with the dates, categories and currencies declared in the constants
+    file
+    :param filename: (string) raw data file name
+    :param schema: (dict) not required, default is None (all columns). If given, key is a column name and value its
+    dtype: only those columns are parsed, directly with this dtype
+    :param data_dir: (string) not required, default is the DATA folder
+    :return: (pandas DataFrame) the parsed data
+    """
+    source_file = get_data_file(filename, data_dir=data_dir)
+    compression = 'gzip' if filename.endswith(".gz") else 'infer'
+    usecols = None if schema is None else list(schema)
+    df = pd.read_csv(source_file, sep=',', header=0, compression=compression, low_memory=False, usecols=usecols,
+                     dtype=schema)
+    for col in cst.CACHE_PARSE_DATES.get(filename, []):
+        if col in df.columns and (schema is None or col not in schema):
+            df[col] = pd.to_datetime(df[col])
+    for col in cst.CACHE_CATEGORIES.get(filename, []):
+        if col in df.columns and (schema is None or col not in schema):
+            df[col] = df[col].astype('category')
+    currency_cols = [col for col in cst.CACHE_CURRENCY_COLUMNS.get(filename, [])
+                     if col in df.columns and (schema is None or col not in schema)]
+    if len(currency_cols) > 0:
+        df = cleaning.clean_currency_columns(df, currency_cols)
+    return df
+
+
+@instrumentation.instrumented()
+def build_cache(filename, data_dir=cst.DATA_DIR_PATH, cache_dir=cst.CACHE_DIR_PATH):
+    """
+    Convert a raw data file into its typed columnar cache (parquet file) and record the raw file signature next to it
+    :param filename: (string) raw data file name
+    :param data_dir: (string) not required, default is the DATA folder
+    :param cache_dir: (string) not required, default is the CACHE folder
+    :return: (pandas DataFrame) the parsed data
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file, meta_file = _get_cache_files(filename, cache_dir)
+    df = read_raw_data_file(filename, data_dir=data_dir)
+    df.to_parquet(cache_file, index=False)
+    with open(meta_file, 'w') as f:
+        json.dump(_get_source_signature(get_data_file(filename, data_dir=data_dir)), f)
+    print("Cache built for file {} in {}".format(filename, cache_file))
+    return df
+
+
+@instrumentation.instrumented()
+def load_data_file(filename, use_cache=True, columns=None, schema=None, data_dir=cst.DATA_DIR_PATH,
+                   cache_dir=cst.CACHE_DIR_PATH):
+    """
+    Load a raw data file as a typed pandas DataFrame. The first call converts the CSV file into a columnar cache, next
+    calls read this cache as long as the raw file remains unchanged (same size and modification time)
+    :param filename: (string) raw data file name, should be one of the get_files_list()
+    :param use_cache: (boolean) not required, default is True. If False, the CSV file is parsed and no cache is written
+    :param columns: (list) not required, default is None. If given, only those columns are read from the cache
+    :param schema: (dict) not required, default is None. Column name as key and dtype as value. If given, only those
+    columns are read (from the cache or from the CSV file) with the given dtypes and in the order of the file, 'columns'
+    parameter is then ignored
+    :param data_dir: (string) not required, default is the DATA folder
+    :param cache_dir: (string) not required, default is the CACHE folder
+    :return: (pandas DataFrame) the loaded data
+    """
+    if schema is not None:
+        columns = list(schema)
+    if not use_cache:
+        df = read_raw_data_file(filename, schema, data_dir)
+    elif _is_cache_valid(filename, data_dir, cache_dir):
+        cache_file = _get_cache_files(filename, cache_dir)[0]
+        if schema is not None:
+            columns = [col for col in pq.read_schema(cache_file).names if col in schema]
+        df = pd.read_parquet(cache_file, columns=columns)
+    else:
+        df = build_cache(filename, data_dir, cache_dir)
+    if schema is not None:
+        # Same order as the file (as read_csv does with usecols), not the order of the schema
+        columns = [col for col in df.columns if col in schema]
+    df = df if columns is None else df[columns]
+    if schema is not None:
+        df = df.astype({col: dtype for col, dtype in schema.items() if df[col].dtype != dtype})
+    return df
+
+
+def build_all_caches(force=False):
+    """
+    Build the typed columnar cache for all data files of this project
+    :param force: (boolean) not required, default is False. If True, caches are rebuilt even if they are still valid
+    """
+    for filename in get_files_list():
+        if force or not _is_cache_valid(filename):
+            build_cache(filename)
+
+
+def get_files_urls(data_base_url=cst.DATA_BASE_URL):
+    """
+    Utility class - Build a list of (url, data file name) to download
+    :param data_base_url: (string) not required, url of one snapshot of one city on Inside Airbnb (default is the Paris
+    snapshot of this project), such as cst.INSIDE_AIRBNB_URL + cst.CITIES['paris'] + "/2019-07-09/"
+    :return: (list) list of tuples (url of the file, name of the file in local DATA folder)
+    """
+    return [(data_base_url + "data/" + cst.LISTING_FULL_FILE, cst.LISTING_FULL_FILE),
+            (data_base_url + "visualisations/" + cst.LISTING_LIGHT_FILE, cst.LISTING_LIGHT_FILE),
+            (data_base_url + "data/" + cst.CALENDAR_FILE, cst.CALENDAR_FILE),
+            (data_base_url + "data/" + cst.REVIEWS_FILE, cst.REVIEWS_FILE),
+            (data_base_url + "visualisations/" + cst.NEIGHBOURHOODS_FILE, cst.NEIGHBOURHOODS_FILE)]
+
+
+def _load_manifest(data_dir):
+    """
+    Inner method that loads the manifest of downloaded files (remote version and checksum of each file)
+    :param data_dir: (string) path to the data directory
+    :return: (dict) key is the local file name, value is a dict with 'url', 'etag', 'last_modified', 'size' and 'sha256'
+    """
+    manifest_file = os.path.join(data_dir, cst.MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(data_dir, manifest):
+    """
+    Inner method that saves the manifest of downloaded files
+    :param data_dir: (string) path to the data directory
+    :param manifest: (dict) the manifest to save
+    """
+    with open(os.path.join(data_dir, cst.MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _compute_sha256(file_path):
+    """
+    Inner method that computes the SHA-256 checksum of a file, reading it by blocks
+    :param file_path: (string) path to the file
+    :return: (string) hexadecimal checksum
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(cst.DOWNLOAD_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _get_remote_version(session, url):
+    """
+    Inner method that asks the server for the current version of a remote file, without downloading it
+    :param session: (requests Session) HTTP session to use
+    :param url: (string) url of the file
+    :return: (dict) 'etag', 'last_modified' and 'size' of the remote file (None when not given by the server)
+    """
+    r = session.head(url, allow_redirects=True, timeout=cst.DOWNLOAD_TIMEOUT)
+    r.raise_for_status()
+    size = r.headers.get('Content-Length')
+    return {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'),
+            'size': int(size) if size is not None else None}
+
+
+def _is_up_to_date(entry, remote, target_file):
+    """
+    Inner method that checks whether a local file is the same as the remote one
+    :param entry: (dict) manifest entry of the local file (None if never downloaded)
+    :param remote: (dict) current version of the remote file
+    :param target_file: (string) path to the local file
+    :return: (boolean) True if the download can be skipped
+    """
+    if entry is None or not os.path.exists(target_file) or os.path.getsize(target_file) != entry['size']:
+        return False
+    if remote['etag'] is not None or remote['last_modified'] is not None:
+        return remote['etag'] == entry['etag'] and remote['last_modified'] == entry['last_modified']
+    return remote['size'] == entry['size']
+
+
+def _get_validator(version):
+    """
+    Inner method that gives the HTTP validator of a version of a remote file (ETag, or Last-Modified if no ETag)
+    :param version: (dict) version of the remote file (see _get_remote_version)
+    :return: (string) the validator, None if the server gives none
+    """
+    return version['etag'] if version['etag'] is not None else version['last_modified']
+
+
+def _load_part_validator(part_meta_file):
+    """
+    Inner method that loads the validator of the remote file a partial download has been started from
+    :param part_meta_file: (string) path to the metadata file of the partial download
+    :return: (tuple) True if the metadata file exists, the validator (None if the server gave none)
+    """
+    if not os.path.exists(part_meta_file):
+        return False, None
+    with open(part_meta_file, 'r') as f:
+        return True, json.load(f)['validator']
+
+
+def _download_file_from_url(url, local_filename, data_dir=cst.DATA_DIR_PATH, manifest=None, session=None):
+    """
+    Download a file from the given url and save it in DATA folder under the given local filename. The file is first
+    written as '<local_filename>.part' so that an interrupted download is resumed (HTTP Range request) instead of being
+    restarted. The version of the remote file the partial file comes from is kept next to it: the download is only
+    resumed if the remote file is still this version. Download is skipped if the remote file has not changed since the
+    last download
     :param url: (string) url of the file to retrieve
     :param local_filename: (string) name of the file in local DATA folder
+    :param data_dir: (string) not required, default is the DATA folder
+    :param manifest: (dict) not required, manifest of previous downloads
+    :param session: (requests Session) not required, HTTP session to use
+    :return: (dict) manifest entry of the downloaded file, None if the download has been skipped
     """
-    print("Download started for file {}".format(url))
-    target_file = os.path.join(cst.DATA_DIR_PATH, local_filename)
-    with requests.get(url, stream=True) as r:
-        with open(target_file, 'wb') as f:
-            shutil.copyfileobj(r.raw, f)
+    session = requests.Session() if session is None else session
+    target_file = os.path.join(data_dir, local_filename)
+    part_file = target_file + cst.DOWNLOAD_PART_EXTENSION
+    remote = _get_remote_version(session, url)
+    entry = None if manifest is None else manifest.get(local_filename)
+    if _is_up_to_date(entry, remote, target_file):
+        print("File {} is up to date, download skipped".format(local_filename))
+        return None
+
+    part_meta_file = part_file + cst.DOWNLOAD_PART_META_EXTENSION
+    validator = _get_validator(remote)
+    has_part_meta, part_validator = _load_part_validator(part_meta_file)
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    if offset > 0 and (not has_part_meta or part_validator != validator
+                       or (remote['size'] is not None and offset > remote['size'])):
+        # Partial file of another version of the remote file (or of an unknown one): restart from scratch
+        print("Partial file of another version of {} discarded".format(local_filename))
+        offset = 0
+        os.remove(part_file)
+    # If the partial file is already complete, it has just not been renamed before an interruption
+    if remote['size'] is None or offset < remote['size'] or not os.path.exists(part_file):
+        headers = {}
+        if offset > 0:
+            headers['Range'] = 'bytes={}-'.format(offset)
+            # The partial content is only sent if the remote file is still the one the partial file comes from
+            if part_validator is not None:
+                headers['If-Range'] = part_validator
+        print("Download {} for file {}".format("resumed at byte {}".format(offset) if offset > 0 else "started", url))
+        with session.get(url, stream=True, headers=headers, timeout=cst.DOWNLOAD_TIMEOUT) as r:
+            r.raise_for_status()
+            # 206 means the server accepted the range, otherwise the whole file is sent again
+            if r.status_code != 206:
+                with open(part_meta_file, 'w') as f:
+                    json.dump({'validator': _get_validator({'etag': r.headers.get('ETag'),
+                                                            'last_modified': r.headers.get('Last-Modified')})}, f)
+            with open(part_file, 'ab' if r.status_code == 206 else 'wb') as f:
+                for block in r.iter_content(chunk_size=cst.DOWNLOAD_BLOCK_SIZE):
+                    f.write(block)
+
+    size = os.path.getsize(part_file)
+    if remote['size'] is not None and size != remote['size']:
+        raise IOError("Incomplete download for file {}: {} bytes out of {}".format(url, size, remote['size']))
+    os.replace(part_file, target_file)
+    if os.path.exists(part_meta_file):
+        os.remove(part_meta_file)
     print("Download finished for file {}".format(url))
+    return {'url': url, 'etag': remote['etag'], 'last_modified': remote['last_modified'], 'size': size,
+            'sha256': _compute_sha256(target_file)}
 
 
-def collect_data():
+def collect_data(files_urls=None, data_dir=cst.DATA_DIR_PATH, max_workers=cst.DOWNLOAD_MAX_WORKERS):
     """
-    Method to call to gather all files for this project
+    Method to call to gather all files for this project. Files are downloaded concurrently, files that have not changed
+    since the last call are skipped and a manifest with the checksum of each file is kept in the data directory
+    :param files_urls: (list) not required, default is get_files_urls(). List of tuples (url, local file name)
+    :param data_dir: (string) not required, default is the DATA folder
+    :param max_workers: (int) not required, maximum number of files downloaded at the same time
+    :return: (dict) the manifest of all downloaded files
     """
-    _build_data_dir(cst.DATA_DIR_PATH)
+    os.makedirs(data_dir, exist_ok=True)
+    files_urls = get_files_urls() if files_urls is None else files_urls
+    manifest = _load_manifest(data_dir)
 
-    _download_file_from_url(cst.DATA_LISTING_FULL, cst.LISTING_FULL_FILE)
-    _download_file_from_url(cst.DATA_LISTING_LIGHT, cst.LISTING_LIGHT_FILE)
-    _download_file_from_url(cst.DATA_CALENDAR, cst.CALENDAR_FILE)
-    _download_file_from_url(cst.DATA_REVIEWS, cst.REVIEWS_FILE)
-    _download_file_from_url(cst.DATA_NEIGHBOURHOODS, cst.NEIGHBOURHOODS_FILE)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_download_file_from_url, url, filename, data_dir, manifest): filename
+                   for url, filename in files_urls}
+        errors = []
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except (requests.RequestException, IOError) as e:
+                print("Download failed for file {}: {}".format(futures[future], e))
+                errors.append(futures[future])
+                continue
+            if entry is not None:
+                manifest[futures[future]] = entry
+                # Saved after each file so that a failure on another file does not lose this one
+                _save_manifest(data_dir, manifest)
 
+    if len(errors) > 0:
+        raise IOError("Download failed for files {}, call again to resume".format(errors))
+    return manifest
 
-def save_listing_splits(splits):
+
+def save_listing_splits(splits, clean_dir=cst.CLEAN_DATA_DIR_PATH):
     """
     Save splits files corresponding to listings.csv.gz dataset
     :param splits: (list) list of splits dataset. Must be ordered x+y train, x+y val, x+y test
+    :param clean_dir: (string) not required, default is the data clean folder
     """
-    _build_data_dir(cst.CLEAN_DATA_DIR_PATH)
+    _build_data_dir(clean_dir)
 
     filenames = [cst.LST_X_TRAIN_FILE, cst.LST_Y_TRAIN_FILE, cst.LST_X_VAL_FILE, cst.LST_Y_VAL_FILE,
                  cst.LST_X_TEST_FILE, cst.LST_Y_TEST_FILE]
 
     for split, filename in zip(splits, filenames):
-        split.to_csv(os.path.join(cst.CLEAN_DATA_DIR_PATH, filename), index=False)
-    print("All files saved to {} folder".format(cst.CLEAN_DATA_DIR_PATH))
+        split.to_csv(os.path.join(clean_dir, filename), index=False)
+    save_listing_splits_bundle(splits, clean_dir)
+    print("All files saved to {} folder".format(clean_dir))
+
+
+def get_listing_splits_bundle_dir(clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    :param clean_dir: (string) not required, default is the data clean folder
+    :return: (string) path to the directory of the binary bundle of listings splits
+    """
+    return os.path.join(clean_dir, cst.LST_SPLITS_BUNDLE_DIR)
+
+
+def save_listing_splits_bundle(splits, clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Save splits corresponding to listings.csv.gz dataset as a single binary bundle: features of all splits stacked in
+    one float32 array, targets in another one and a small index (column names and rows of each split)
+    :param splits: (list) list of splits dataset. Must be ordered x+y train, x+y val, x+y test
+    :param clean_dir: (string) not required, default is the data clean folder
+    """
+    bundle_dir = get_listing_splits_bundle_dir(clean_dir)
+    _build_data_dir(bundle_dir)
+
+    xs, ys = splits[0::2], splits[1::2]
+    columns = xs[0].columns.tolist()
+    index = {'columns': columns, 'splits': {}}
+    start = 0
+    for name, x, y in zip(cst.LST_SPLITS_NAMES, xs, ys):
+        # Same columns in the same order for all splits, otherwise rows would be meaningless
+        assert x.columns.tolist() == columns
+        assert x.shape[0] == len(y)
+        index['splits'][name] = [start, start + x.shape[0]]
+        start += x.shape[0]
+
+    np.save(os.path.join(bundle_dir, cst.LST_SPLITS_X_FILE),
+            np.concatenate([x[columns].to_numpy(dtype=np.float32) for x in xs]))
+    np.save(os.path.join(bundle_dir, cst.LST_SPLITS_Y_FILE),
+            np.concatenate([np.asarray(y, dtype=np.float32).ravel() for y in ys]))
+    with open(os.path.join(bundle_dir, cst.LST_SPLITS_INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    print("Splits bundle saved to {} folder".format(bundle_dir))
+
+
+@instrumentation.instrumented()
+def load_listing_splits_bundle(as_frame=True, clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    Load the binary bundle of listings splits. Arrays are memory-mapped, nothing is parsed nor copied until used
+    :param as_frame: (boolean) not required, default is True. If False, numpy arrays (views on the memory-mapped
+    file) are returned instead of pandas DataFrame and Series
+    :param clean_dir: (string) not required, default is the data clean folder
+    :return: (tuple) X_train, y_train, X_val, y_val, X_test, y_test
+    """
+    bundle_dir = get_listing_splits_bundle_dir(clean_dir)
+    with open(os.path.join(bundle_dir, cst.LST_SPLITS_INDEX_FILE), 'r') as f:
+        index = json.load(f)
+    x_all = np.load(os.path.join(bundle_dir, cst.LST_SPLITS_X_FILE), mmap_mode='r')
+    y_all = np.load(os.path.join(bundle_dir, cst.LST_SPLITS_Y_FILE), mmap_mode='r')
+
+    splits = []
+    for name in cst.LST_SPLITS_NAMES:
+        start, end = index['splits'][name]
+        if as_frame:
+            splits.append(pd.DataFrame(x_all[start:end], columns=index['columns'], copy=False))
+            splits.append(pd.Series(y_all[start:end], copy=False))
+        else:
+            splits.extend([x_all[start:end], y_all[start:end]])
+    return tuple(splits)
+
+
+def get_listing_splits_columns(clean_dir=cst.CLEAN_DATA_DIR_PATH):
+    """
+    :param clean_dir: (string) not required, default is the data clean folder
+    :return: (list) feature names of the binary bundle of listings splits, in the same order as its columns
+    """
+    with open(os.path.join(get_listing_splits_bundle_dir(clean_dir), cst.LST_SPLITS_INDEX_FILE), 'r') as f:
+        return json.load(f)['columns']
 
 
-def save_price_predictions_results(results):
+def save_price_predictions_results(results, results_dir=cst.RESULTS_DIR_PATH):
     """
     Save the predictions of our different models locally
     :param results: (pandas DataFrame) different models predictions compared to ground truth
+    :param results_dir: (string) not required, default is the results folder
     """
-    _build_data_dir(cst.RESULTS_DIR_PATH)
-    results.to_csv(os.path.join(cst.RESULTS_DIR_PATH, cst.LST_RESULTS_FILE), index=False)
+    _build_data_dir(results_dir)
+    results.to_csv(os.path.join(results_dir, cst.LST_RESULTS_FILE), index=False)
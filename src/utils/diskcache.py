@@ -0,0 +1,146 @@
+"""
+Created on 18 october 2026
+
+Utility package used to memoize expensive results (cross validation runs, fitted models) on disk. Entries are keyed by
+a fingerprint of the data and the parameters, least recently used entries are evicted when the cache gets too big
+
+@author: nidragedd
+"""
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def _update_hash(sha, obj):
+    """
+    Inner method that feeds the given object into a hash, arrays are hashed from their raw bytes
+    :param sha: hashlib object to update
+    :param obj: object to hash (numpy array, pandas DataFrame/Series, list, tuple, dict or JSON serializable value)
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        _update_hash(sha, obj.columns.tolist() if isinstance(obj, pd.DataFrame) else obj.name)
+        sha.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        sha.update(str((obj.shape, obj.dtype.str)).encode())
+        sha.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        sha.update(b'[')
+        for item in obj:
+            _update_hash(sha, item)
+        sha.update(b']')
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=str):
+            sha.update(str(k).encode())
+            _update_hash(sha, obj[k])
+    else:
+        sha.update(json.dumps(obj, sort_keys=True, default=repr).encode())
+
+
+def fingerprint(*objs):
+    """
+    Compute a fingerprint of the given objects (data and/or parameters)
+    :return: (string) hexadecimal SHA-256 of all given objects
+    """
+    sha = hashlib.sha256()
+    for obj in objs:
+        _update_hash(sha, obj)
+    return sha.hexdigest()
+
+
+def fingerprint_dmatrix(dmatrix):
+    """
+    Compute a fingerprint of an XGBoost DMatrix from its binary serialization
+    :param dmatrix: (DMatrix) the data
+    :return: (string) hexadecimal SHA-256 of the data
+    """
+    sha = hashlib.sha256()
+    tmp_dir = tempfile.mkdtemp()
+    tmp_file = os.path.join(tmp_dir, 'data.buffer')
+    try:
+        dmatrix.save_binary(tmp_file)
+        with open(tmp_file, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        os.rmdir(tmp_dir)
+    return sha.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Pickled results stored as one file per key in a directory, with a maximum total size
+    """
+    def __init__(self, cache_dir, max_bytes):
+        """
+        :param cache_dir: (string) path to the cache directory
+        :param max_bytes: (int) when the cache gets bigger, least recently used entries are removed
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        """
+        Inner method that gives the path of the file of an entry
+        """
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def get(self, key, default=None):
+        """
+        Get a cached result
+        :param key: (string) key of the entry (see fingerprint)
+        :param default: not required, value returned if the key is not in the cache
+        :return: the cached result or the default value
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return default
+        # Mark as recently used, the entry may have been evicted by another process meanwhile: result is still valid
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return result
+
+    def set(self, key, result):
+        """
+        Store a result, then evict least recently used entries if needed
+        :param key: (string) key of the entry (see fingerprint)
+        :param result: object to store, it must be picklable
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written to a temporary file first so that concurrent readers never see a partial entry
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the total size is below the maximum size
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                # Already removed by another process
+                pass
+            total -= size
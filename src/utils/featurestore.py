@@ -0,0 +1,326 @@
+"""
+Created on 18 october 2026
+
+Utility package used to persist the cleaned features of each snapshot, keyed by listing id, so that training,
+evaluation and prediction read the very same precomputed features instead of running the cleaning again.
+Features are stored as a memory-mapped float32 matrix. Column positions come from a versioned registry: a new column
+gets a new position at the end, existing positions never change, so a column has the same position in all snapshots.
+Arrays of a snapshot are written in a new data directory, then its index file (written atomically) points to it: a
+snapshot being replaced can still be read, readers see either the old arrays or the new ones
+
+@author: nidragedd
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from src.utils import constants as cst
+
+# Multiplier of the Fibonacci hashing of listing ids (2^64 divided by the golden ratio)
+_HASH_MULTIPLIER = np.uint64(11400714819323198485)
+_EMPTY_KEY = np.iinfo(np.int64).min
+
+
+def _hash_slots(ids, nb_bits):
+    """
+    Inner method that gives the initial slot of each id in a hash table of 2^nb_bits slots
+    :param ids: (numpy array) int64 listing ids
+    :param nb_bits: (int) log2 of the number of slots
+    :return: (numpy array) int64 slots
+    """
+    with np.errstate(over='ignore'):
+        hashed = ids.astype(np.uint64) * _HASH_MULTIPLIER
+    return (hashed >> np.uint64(64 - nb_bits)).astype(np.int64)
+
+
+def build_hash_table(ids):
+    """
+    Build an open addressing hash table (linear probing, load factor at most 0.5) of listing ids, so that the row of an
+    id is found in constant time, directly from the memory-mapped arrays
+    :param ids: (numpy array) unique int64 listing ids
+    :return: (tuple) keys (int64 numpy array, empty slots hold the minimum int64 value) and row positions (int64
+    numpy array) of each slot
+    """
+    nb_bits = max(1, int(np.ceil(np.log2(max(2 * len(ids), 2)))))
+    mask = (1 << nb_bits) - 1
+    keys = np.full(1 << nb_bits, _EMPTY_KEY, dtype=np.int64)
+    positions = np.full(1 << nb_bits, -1, dtype=np.int64)
+    pending = np.arange(len(ids))
+    slots = _hash_slots(ids, nb_bits)
+    while len(pending) > 0:
+        # Among ids that target the same free slot, the first one takes it, the others probe the next slot
+        free = keys[slots] == _EMPTY_KEY
+        candidates, first = np.unique(slots[free], return_index=True)
+        winners = pending[free][first]
+        keys[candidates] = ids[winners]
+        positions[candidates] = winners
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[np.flatnonzero(free)[first]] = True
+        pending, slots = pending[~placed], (slots[~placed] + 1) & mask
+    return keys, positions
+
+
+def lookup_hash_table(keys, positions, ids):
+    """
+    Find the row positions of some ids in a hash table built by build_hash_table
+    :param keys: (numpy array) keys of the hash table
+    :param positions: (numpy array) row positions of the hash table
+    :param ids: (array like) listing ids to look for
+    :return: (numpy array) row position of each id, -1 for unknown ids
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    nb_bits = int(np.log2(len(keys)))
+    mask = len(keys) - 1
+    result = np.full(len(ids), -1, dtype=np.int64)
+    pending = np.arange(len(ids))
+    slots = _hash_slots(ids, nb_bits)
+    while len(pending) > 0:
+        found_keys = keys[slots]
+        found = found_keys == ids[pending]
+        result[pending[found]] = positions[slots[found]]
+        # An empty slot ends the probing: the id is unknown
+        ongoing = ~found & (found_keys != _EMPTY_KEY)
+        pending, slots = pending[ongoing], (slots[ongoing] + 1) & mask
+    return result
+
+
+def _write_json(path, payload):
+    """
+    Inner method that writes a JSON file through a temporary file so that readers never see a partial file
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_file, path)
+
+
+@contextlib.contextmanager
+def _lock_dir(directory, timeout=cst.FEATURE_STORE_LOCK_TIMEOUT):
+    """
+    Inner context manager that prevents concurrent writers of a directory: a lock file is created exclusively (works on
+    all platforms), writers wait until it is removed
+    :param directory: (string) directory to lock
+    :param timeout: (float) not required, maximum number of seconds to wait for the lock
+    """
+    lock_file = os.path.join(directory, cst.FEATURE_STORE_LOCK_FILE)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.time() > deadline:
+                raise IOError("Feature store locked by another writer for more than {}s, remove {} if no writer is "
+                              "running".format(timeout, lock_file))
+            time.sleep(0.05)
+    try:
+        os.close(fd)
+        yield
+    finally:
+        os.remove(lock_file)
+
+
+class SnapshotFeatures(object):
+    """
+    Read-only access to the features of one snapshot, arrays are memory-mapped
+    """
+    def __init__(self, snapshot_dir, registry):
+        """
+        :param snapshot_dir: (string) directory of the snapshot in the feature store
+        :param registry: (list) versions of the columns registry, see FeatureStore.get_columns
+        """
+        with open(os.path.join(snapshot_dir, cst.FEATURE_STORE_INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        # Data directory the index points to (see FeatureStore.write_snapshot)
+        data_dir = os.path.join(snapshot_dir, index['data_dir'])
+        self.version = index['version']
+        self.columns = registry[self.version - 1]['columns']
+        self._positions = {col: i for i, col in enumerate(self.columns)}
+        self.X = np.load(os.path.join(data_dir, cst.FEATURE_STORE_X_FILE), mmap_mode='r')
+        self.target = np.load(os.path.join(data_dir, cst.FEATURE_STORE_TARGET_FILE), mmap_mode='r')
+        self.ids = np.load(os.path.join(data_dir, cst.FEATURE_STORE_IDS_FILE), mmap_mode='r')
+        self._hash_keys = np.load(os.path.join(data_dir, cst.FEATURE_STORE_HASH_KEYS_FILE), mmap_mode='r')
+        self._hash_positions = np.load(os.path.join(data_dir, cst.FEATURE_STORE_HASH_POSITIONS_FILE),
+                                       mmap_mode='r')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, ids):
+        """
+        :param ids: (array like) listing ids
+        :return: (numpy array) row position of each id, -1 for ids that are not in this snapshot
+        """
+        return lookup_hash_table(self._hash_keys, self._hash_positions, ids)
+
+    def _select(self, rows, columns):
+        """
+        Inner method that reads some rows and columns, columns unknown in this snapshot version are missing (NaN)
+        :param rows: (numpy array or slice) row positions
+        :param columns: (list) column names, None for all columns of this snapshot
+        :return: (numpy array) float32 features
+        """
+        if columns is None:
+            return np.asarray(self.X[rows])
+        positions = np.array([self._positions.get(col, -1) for col in columns], dtype=np.int64)
+        values = np.asarray(self.X[rows])[:, np.maximum(positions, 0)]
+        values[:, positions < 0] = np.nan
+        return values
+
+    def get_rows(self, ids, columns=None):
+        """
+        Read the features of some listings
+        :param ids: (array like) listing ids
+        :param columns: (list) not required, column names in the expected order (such as the training columns of a
+        model), default is all columns of this snapshot
+        :return: (numpy array) float32 features, rows of unknown ids are missing (NaN)
+        """
+        rows = self.lookup(ids)
+        values = self._select(np.maximum(rows, 0), columns)
+        values[rows < 0] = np.nan
+        return values
+
+    def get_frame(self, ids=None, columns=None, start=None, stop=None):
+        """
+        Read features as a DataFrame indexed by listing id, with the target column
+        :param ids: (array like) not required, listing ids to read, default is a slice of rows
+        :param columns: (list) not required, column names, default is all columns of this snapshot
+        :param start: (int) not required, first row of the slice, default is the first row
+        :param stop: (int) not required, row after the last row of the slice, default is the end
+        :return: (pandas DataFrame) features and target
+        """
+        if ids is None:
+            rows = slice(start, stop)
+            values = self._select(rows, columns)
+            target, index = np.asarray(self.target[rows]), np.asarray(self.ids[rows])
+        else:
+            rows = self.lookup(ids)
+            values = self.get_rows(ids, columns)
+            target = np.where(rows >= 0, self.target[np.maximum(rows, 0)], np.nan)
+            index = np.asarray(ids, dtype=np.int64)
+        df = pd.DataFrame(values, columns=self.columns if columns is None else list(columns),
+                          index=pd.Index(index, name='id'))
+        df[cst.FEATURE_STORE_TARGET] = target
+        return df
+
+
+class FeatureStore(object):
+    """
+    Cleaned features of all snapshots, one directory per snapshot (scrape date) with a columns registry shared by all
+    snapshots
+    """
+    def __init__(self, store_dir=cst.FEATURE_STORE_DIR_PATH):
+        """
+        :param store_dir: (string) not required, root directory of the feature store
+        """
+        self.store_dir = store_dir
+
+    def get_registry(self):
+        """
+        :return: (list) versions of the columns registry, each one is a dict with 'version' and 'columns' keys. The
+        columns of a version start with the columns of the previous version
+        """
+        registry_file = os.path.join(self.store_dir, cst.FEATURE_STORE_REGISTRY_FILE)
+        if not os.path.exists(registry_file):
+            return []
+        with open(registry_file, 'r') as f:
+            return json.load(f)
+
+    def get_columns(self, version=None):
+        """
+        :param version: (int) not required, default is the latest version
+        :return: (list) columns of this version of the registry, in storage order
+        """
+        registry = self.get_registry()
+        return registry[(version or len(registry)) - 1]['columns'] if len(registry) > 0 else []
+
+    def _register_columns(self, columns):
+        """
+        Inner method that adds new columns at the end of the registry, a new version is created only if needed. The
+        store must be locked by the caller (see write_snapshot)
+        :param columns: (list) columns of a snapshot
+        :return: (int) registry version that contains all these columns
+        """
+        registry = self.get_registry()
+        known = self.get_columns()
+        known_set = set(known)
+        new_columns = [col for col in columns if col not in known_set]
+        if len(new_columns) > 0 or len(registry) == 0:
+            registry.append({'version': len(registry) + 1, 'columns': known + new_columns})
+            _write_json(os.path.join(self.store_dir, cst.FEATURE_STORE_REGISTRY_FILE), registry)
+            print("Features registry version {}: {} new columns".format(len(registry), len(new_columns)))
+        return len(registry)
+
+    def list_snapshots(self):
+        """
+        :return: (list) scrape dates of the snapshots in the feature store, sorted from the oldest to the newest
+        """
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(d for d in os.listdir(self.store_dir)
+                      if os.path.exists(os.path.join(self.store_dir, d, cst.FEATURE_STORE_INDEX_FILE)))
+
+    def write_snapshot(self, scrape_date, df_clean):
+        """
+        Save the cleaned features of a snapshot (replace them if they already exist). Arrays are written in a new data
+        directory of the snapshot, then the index file is replaced to point to it: readers see either the old arrays or
+        the new ones, never a mix of both. The previous data directory is kept for the readers that are opening it,
+        older ones are removed. Writers are serialized by a lock of the store (the columns registry is shared)
+        :param scrape_date: (string) scrape date of the snapshot
+        :param df_clean: (pandas DataFrame) cleaned listings indexed by listing id (see snapshots.ingest_snapshot),
+        with the target column
+        """
+        assert df_clean.index.is_unique, "Listing ids should be unique"
+        features = df_clean.drop(columns=[cst.FEATURE_STORE_TARGET])
+        ids = np.asarray(df_clean.index, dtype=np.int64)
+        snapshot_dir = os.path.join(self.store_dir, scrape_date)
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+        with _lock_dir(self.store_dir):
+            version = self._register_columns(features.columns.tolist())
+            columns = self.get_columns(version)
+            index_file = os.path.join(snapshot_dir, cst.FEATURE_STORE_INDEX_FILE)
+            previous_data_dir = None
+            if os.path.exists(index_file):
+                with open(index_file, 'r') as f:
+                    previous_data_dir = json.load(f)['data_dir']
+
+            data_dir = tempfile.mkdtemp(dir=snapshot_dir, prefix=cst.FEATURE_STORE_DATA_DIR_PREFIX)
+            try:
+                X = np.lib.format.open_memmap(os.path.join(data_dir, cst.FEATURE_STORE_X_FILE), mode='w+',
+                                              dtype=np.float32, shape=(len(ids), len(columns)))
+                X[:] = np.nan
+                positions = [columns.index(col) for col in features.columns]
+                X[:, positions] = features.to_numpy(dtype=np.float32)
+                X.flush()
+                del X
+                np.save(os.path.join(data_dir, cst.FEATURE_STORE_TARGET_FILE),
+                        df_clean[cst.FEATURE_STORE_TARGET].to_numpy(dtype=np.float32))
+                np.save(os.path.join(data_dir, cst.FEATURE_STORE_IDS_FILE), ids)
+                hash_keys, hash_positions = build_hash_table(ids)
+                np.save(os.path.join(data_dir, cst.FEATURE_STORE_HASH_KEYS_FILE), hash_keys)
+                np.save(os.path.join(data_dir, cst.FEATURE_STORE_HASH_POSITIONS_FILE), hash_positions)
+            except BaseException:
+                shutil.rmtree(data_dir, ignore_errors=True)
+                raise
+            _write_json(index_file, {'version': version, 'nb_rows': len(ids), 'data_dir': os.path.basename(data_dir)})
+
+            kept = {os.path.basename(data_dir), previous_data_dir}
+            for d in os.listdir(snapshot_dir):
+                if d.startswith(cst.FEATURE_STORE_DATA_DIR_PREFIX) and d not in kept:
+                    shutil.rmtree(os.path.join(snapshot_dir, d), ignore_errors=True)
+        print("Features of {} listings saved to {} folder".format(len(ids), snapshot_dir))
+
+    def open(self, scrape_date=None):
+        """
+        :param scrape_date: (string) not required, default is the latest snapshot of the feature store
+        :return: (SnapshotFeatures) features of this snapshot
+        """
+        scrape_date = self.list_snapshots()[-1] if scrape_date is None else scrape_date
+        return SnapshotFeatures(os.path.join(self.store_dir, scrape_date), self.get_registry())
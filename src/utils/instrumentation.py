@@ -0,0 +1,187 @@
+"""
+Created on 18 october 2026
+
+Utility package used to know where the time goes: stages of the pipeline (loading, cleaning, fitting...) record their
+wall time, CPU time, peak memory and row counts as JSON lines. Instrumentation is disabled by default, instrumented
+functions then cost a single boolean check
+
+Memory is measured with tracemalloc without touching its global state (no reset of the peak, no clear of the traces),
+so that other tracers such as benchmark.measure_call keep working: each stage reports the traced memory relative to
+what was traced when it started. The peak of a stage is exact when the stage reaches a new peak of the process,
+otherwise it is an upper bound (the peak reached before the stage started), which is often the case of nested stages
+
+Usage:
+    instrumentation.enable()
+    with instrumentation.stage('my_stage') as record:
+        ...
+        record['rows_out'] = df.shape[0]
+    df_stages = instrumentation.load_records()
+
+@author: nidragedd
+"""
+import os
+import json
+import time
+import datetime
+import functools
+import threading
+import tracemalloc
+
+import pandas as pd
+
+from src.utils import constants as cst
+
+_state = {'enabled': False, 'log_file': None, 'trace_memory': False, 'started_tracemalloc': False}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(log_file=cst.STAGES_LOG_FILE, trace_memory=True):
+    """
+    Start recording stages
+    :param log_file: (string) not required, JSON lines file where records are appended
+    :param trace_memory: (boolean) not required, default is True. Peak memory of each stage is measured with
+    tracemalloc, which slows down allocations: set it to False to get timings only
+    """
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    _state['log_file'] = log_file
+    _state['trace_memory'] = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state['started_tracemalloc'] = True
+    _state['enabled'] = True
+
+
+def disable():
+    """
+    Stop recording stages
+    """
+    _state['enabled'] = False
+    if _state['started_tracemalloc']:
+        tracemalloc.stop()
+        _state['started_tracemalloc'] = False
+
+
+def is_enabled():
+    """
+    :return: (boolean) True if stages are being recorded
+    """
+    return _state['enabled']
+
+
+def _get_stack():
+    """
+    Inner method that gives the stages currently running in this thread (outermost first)
+    """
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _write(record):
+    """
+    Inner method that appends a record to the JSON lines sink
+    :param record: (dict) the stage record
+    """
+    line = json.dumps(record, default=str)
+    with _lock:
+        with open(_state['log_file'], 'a') as f:
+            f.write(line + '\n')
+
+
+def _count_rows(obj):
+    """
+    Inner method that gives the number of rows of a dataset (pandas, numpy, scipy or XGBoost DMatrix)
+    :return: (int) number of rows or None if the object is not a dataset
+    """
+    shape = getattr(obj, 'shape', None)
+    if shape is not None and len(shape) > 0:
+        return int(shape[0])
+    if hasattr(obj, 'num_row'):
+        return int(obj.num_row())
+    return None
+
+
+class stage(object):
+    """
+    Context manager that records one stage. The yielded record is a dict where the caller can add fields, such as
+    'rows_in' and 'rows_out'. Nested stages are recorded with the path of their parents ('clean_listings/drop_cols')
+    """
+    def __init__(self, name, **fields):
+        """
+        :param name: (string) name of the stage
+        :param fields: additional fields to record
+        """
+        self.name = name
+        self.record = fields
+
+    def __enter__(self):
+        if not _state['enabled']:
+            return self.record
+        stack = _get_stack()
+        self.path = '/'.join([frame['name'] for frame in stack] + [self.name])
+        # Baseline of the memory measures of this stage
+        memory = tracemalloc.get_traced_memory()[0] if _state['trace_memory'] and tracemalloc.is_tracing() else None
+        stack.append({'name': self.name, 'memory': memory})
+        self.started_at = datetime.datetime.now().isoformat()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not _state['enabled'] or not hasattr(self, 'wall'):
+            return False
+        wall, cpu = time.perf_counter() - self.wall, time.process_time() - self.cpu
+        stack = _get_stack()
+        peak, delta = None, None
+        start_memory = stack.pop()['memory']
+        if start_memory is not None and tracemalloc.is_tracing():
+            current, process_peak = tracemalloc.get_traced_memory()
+            # Upper bound if the process peak has been reached before this stage (see module documentation)
+            peak = max(0, process_peak - start_memory)
+            delta = current - start_memory
+        record = {'stage': self.path, 'started_at': self.started_at, 'wall_s': wall, 'cpu_s': cpu,
+                  'peak_memory_bytes': peak, 'memory_delta_bytes': delta, 'pid': os.getpid(),
+                  'failed': exc_type is not None}
+        record.update(self.record)
+        _write(record)
+        return False
+
+
+def instrumented(name=None):
+    """
+    Decorator that records each call of the decorated function as a stage, with the number of rows of its first argument
+    ('rows_in') and of its result ('rows_out') when they are datasets
+    :param name: (string) not required, name of the stage. Default is '<module>.<function>', such as
+    'cleaning.drop_cols'
+    :return: the decorator
+    """
+    def decorator(func):
+        stage_name = name if name is not None else '{}.{}'.format(func.__module__.split('.')[-1], func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return func(*args, **kwargs)
+            with stage(stage_name) as record:
+                rows_in = _count_rows(args[0]) if len(args) > 0 else None
+                if rows_in is not None:
+                    record['rows_in'] = rows_in
+                result = func(*args, **kwargs)
+                rows_out = _count_rows(result)
+                if rows_out is not None:
+                    record['rows_out'] = rows_out
+            return result
+        return wrapper
+    return decorator
+
+
+def load_records(log_file=cst.STAGES_LOG_FILE):
+    """
+    Load the recorded stages
+    :param log_file: (string) not required, JSON lines file of the records
+    :return: (pandas DataFrame) one row per recorded stage
+    """
+    if not os.path.exists(log_file):
+        return pd.DataFrame()
+    return pd.read_json(log_file, lines=True)
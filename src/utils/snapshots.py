@@ -0,0 +1,183 @@
+"""
+Created on 18 october 2026
+
+Utility package used to keep several Inside Airbnb snapshots (scrape dates) side by side and to process a new snapshot
+incrementally: only listings added or changed since the previous snapshot go through the cleaning again
+
+@author: nidragedd
+"""
+import os
+import pickle
+
+import pandas as pd
+
+from src.preprocessing import cleaning
+from src.preprocessing.amenities import AmenitiesEncoder
+from src.preprocessing.categorical import CategoricalEncoder
+from src.utils import constants as cst
+from src.utils import datacollector
+from src.utils.featurestore import FeatureStore
+
+
+def get_snapshot_dir(scrape_date):
+    """
+    Get the path to the directory of a given snapshot
+    :param scrape_date: (string) scrape date of the snapshot, such as '2019-07-09'
+    :return: (string) path to the snapshot directory
+    """
+    return os.path.join(cst.SNAPSHOTS_DIR_PATH, scrape_date)
+
+
+def list_snapshots():
+    """
+    :return: (list) scrape dates of all snapshots available locally, sorted from the oldest to the newest
+    """
+    if not os.path.exists(cst.SNAPSHOTS_DIR_PATH):
+        return []
+    return sorted(d for d in os.listdir(cst.SNAPSHOTS_DIR_PATH) if os.path.isdir(get_snapshot_dir(d)))
+
+
+def collect_snapshot(scrape_date, base_url=cst.CITY_BASE_URL):
+    """
+    Download all files of the snapshot scraped at the given date into its own directory
+    :param scrape_date: (string) scrape date of the snapshot, such as '2019-07-09'
+    :param base_url: (string) not required, url of the city on Inside Airbnb (default is Paris)
+    :return: (dict) the manifest of the downloaded files
+    """
+    files_urls = datacollector.get_files_urls(base_url + scrape_date + "/")
+    return datacollector.collect_data(files_urls, get_snapshot_dir(scrape_date))
+
+
+def load_snapshot_listings(scrape_date):
+    """
+    Load the listings of a given snapshot, only the columns used by the cleaning (see
+    cleaning.get_listings_input_schema)
+    :param scrape_date: (string) scrape date of the snapshot
+    :return: (pandas DataFrame) listings of this snapshot
+    """
+    return datacollector.read_raw_data_file(cst.LISTING_FULL_FILE, schema=cleaning.get_listings_input_schema(),
+                                            data_dir=get_snapshot_dir(scrape_date))
+
+
+def compute_row_hashes(df):
+    """
+    Compute a hash per listing over the features read by the cleaning (see cleaning.get_listings_input_schema), so
+    that a listing whose other columns (scrape dates, free texts, ...) changed is not cleaned again. Columns are cast to
+    the dtypes of the schema first: a numeric column inferred as int64 in a snapshot and as float64 in another one (NaN
+    values) gives the same hashes
+    :param df: (pandas DataFrame) raw listings dataset
+    :return: (pandas Series) uint64 hash indexed by listing 'id'
+    """
+    schema = cleaning.get_listings_input_schema()
+    cols = sorted(schema)
+    hashes = pd.util.hash_pandas_object(df[cols].astype({col: schema[col] for col in cols}), index=False)
+    return pd.Series(hashes.to_numpy(), index=df['id'].to_numpy(), name='row_hash')
+
+
+def compute_delta(previous_hashes, new_hashes):
+    """
+    Compare the row hashes of 2 snapshots
+    :param previous_hashes: (pandas Series) hashes of the previous snapshot, indexed by listing id
+    :param new_hashes: (pandas Series) hashes of the new snapshot, indexed by listing id
+    :return: (dict) with keys 'added', 'removed' and 'changed', each value is an Index of listing ids
+    """
+    common = new_hashes.index.intersection(previous_hashes.index)
+    changed = common[new_hashes[common].to_numpy() != previous_hashes[common].to_numpy()]
+    return {'added': new_hashes.index.difference(previous_hashes.index),
+            'removed': previous_hashes.index.difference(new_hashes.index),
+            'changed': changed}
+
+
+def _save_snapshot_outputs(scrape_date, hashes, df_clean, encoders):
+    """
+    Inner method that saves the row hashes, the cleaned listings and the fitted encoders of a snapshot
+    :param scrape_date: (string) scrape date of the snapshot
+    :param hashes: (pandas Series) row hashes indexed by listing id
+    :param df_clean: (pandas DataFrame) cleaned listings indexed by listing id
+    :param encoders: (dict) fitted encoders used by cleaning.clean_listings
+    """
+    snapshot_dir = get_snapshot_dir(scrape_date)
+    hashes.rename_axis('id').to_frame().to_parquet(os.path.join(snapshot_dir, cst.SNAPSHOT_HASHES_FILE))
+    df_clean.rename_axis('id').to_parquet(os.path.join(snapshot_dir, cst.SNAPSHOT_CLEAN_FILE))
+    with open(os.path.join(snapshot_dir, cst.SNAPSHOT_ENCODERS_FILE), 'wb') as f:
+        pickle.dump(encoders, f)
+
+
+def load_snapshot_outputs(scrape_date):
+    """
+    Load what has been saved by ingest_snapshot for a given snapshot
+    :param scrape_date: (string) scrape date of the snapshot
+    :return: (tuple) row hashes (pandas Series), cleaned listings indexed by id (pandas DataFrame), encoders (dict)
+    """
+    snapshot_dir = get_snapshot_dir(scrape_date)
+    hashes = pd.read_parquet(os.path.join(snapshot_dir, cst.SNAPSHOT_HASHES_FILE))['row_hash']
+    df_clean = pd.read_parquet(os.path.join(snapshot_dir, cst.SNAPSHOT_CLEAN_FILE))
+    with open(os.path.join(snapshot_dir, cst.SNAPSHOT_ENCODERS_FILE), 'rb') as f:
+        encoders = pickle.load(f)
+    return hashes, df_clean, encoders
+
+
+def _is_ingested(scrape_date):
+    """
+    Inner method that checks whether a snapshot has already been ingested
+    :param scrape_date: (string) scrape date of the snapshot
+    :return: (boolean) True if its outputs exist
+    """
+    snapshot_dir = get_snapshot_dir(scrape_date)
+    return all(os.path.exists(os.path.join(snapshot_dir, f))
+               for f in [cst.SNAPSHOT_HASHES_FILE, cst.SNAPSHOT_CLEAN_FILE, cst.SNAPSHOT_ENCODERS_FILE])
+
+
+def _clean(df, encoders):
+    """
+    Inner method that cleans raw listings while keeping their id as index
+    :param df: (pandas DataFrame) raw listings
+    :param encoders: (dict) encoders given to cleaning.clean_listings, fitted if they are not already
+    :return: (pandas DataFrame) cleaned listings indexed by listing id
+    """
+    df_clean = cleaning.clean_listings(df.set_index(df['id'].to_numpy()),
+                                       amenities_encoder=encoders['amenities'],
+                                       categorical_encoder=encoders['categorical'])
+    return df_clean
+
+
+def ingest_snapshot(scrape_date, previous_date=None, feature_store=None):
+    """
+    Clean the listings of a snapshot. If a previous snapshot has already been ingested, only the listings added or
+    changed since then are cleaned (with the encoders fitted on the previous snapshot so that columns stay the same) and
+    merged into the previous cleaned output, listings removed are dropped. Cleaned features are also saved in the
+    feature store (see featurestore.FeatureStore)
+    :param scrape_date: (string) scrape date of the snapshot to ingest
+    :param previous_date: (string) not required, default is the most recent snapshot already ingested before this one
+    :param feature_store: (FeatureStore) not required, default is the feature store of the data directory
+    :return: (pandas DataFrame) cleaned listings of this snapshot, indexed by listing id
+    """
+    if previous_date is None:
+        candidates = [d for d in list_snapshots() if d < scrape_date and _is_ingested(d)]
+        previous_date = candidates[-1] if len(candidates) > 0 else None
+
+    df = load_snapshot_listings(scrape_date)
+    hashes = compute_row_hashes(df)
+
+    if previous_date is None:
+        print("No previous snapshot, full cleaning of {} listings".format(df.shape[0]))
+        encoders = {'amenities': AmenitiesEncoder(), 'categorical': CategoricalEncoder()}
+        df_clean = _clean(df, encoders)
+    else:
+        previous_hashes, previous_clean, encoders = load_snapshot_outputs(previous_date)
+        delta = compute_delta(previous_hashes, hashes)
+        print("Delta with snapshot {}: {} added, {} removed, {} changed listings out of {}"
+              .format(previous_date, len(delta['added']), len(delta['removed']), len(delta['changed']), df.shape[0]))
+        to_clean = delta['added'].append(delta['changed'])
+        kept = previous_clean.drop(delta['removed'].append(delta['changed']))
+        if len(to_clean) > 0:
+            df_delta_clean = _clean(df[df['id'].isin(to_clean)], encoders)
+            df_clean = pd.concat([kept, df_delta_clean[kept.columns]])
+        else:
+            df_clean = kept
+        # Same order as the raw file
+        df_clean = df_clean.loc[df['id'].to_numpy()]
+
+    _save_snapshot_outputs(scrape_date, hashes, df_clean, encoders)
+    (FeatureStore() if feature_store is None else feature_store).write_snapshot(scrape_date, df_clean)
+    return df_clean
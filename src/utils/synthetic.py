@@ -0,0 +1,244 @@
+"""
+Created on 18 october 2026
+
+Utility package used to generate synthetic listings, calendar and reviews datasets with the same schema and raw formats
+as the Inside Airbnb files ('$1,234.00' prices, 't'/'f' flags, '{TV,Wifi,...}' amenities), at any size. Values are
+drawn from small pools of distinct raw strings so that even 10 millions rows are generated without any Python loop
+
+@author: nidragedd
+"""
+import os
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import cleaning
+from src.utils import constants as cst
+
+NEIGHBOURHOODS = ['Louvre', 'Bourse', 'Temple', 'Hôtel-de-Ville', 'Panthéon', 'Luxembourg', 'Palais-Bourbon',
+                  'Élysée', 'Opéra', 'Entrepôt', 'Popincourt', 'Reuilly', 'Gobelins', 'Observatoire', 'Vaugirard',
+                  'Passy', 'Batignolles-Monceau', 'Buttes-Montmartre', 'Buttes-Chaumont', 'Ménilmontant']
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Hotel room', 'Shared room']
+BED_TYPES = ['Real Bed', 'Pull-out Sofa', 'Couch', 'Futon', 'Airbed']
+CANCELLATION_POLICIES = ['flexible', 'moderate', 'strict_14_with_grace_period', 'super_strict_30', 'super_strict_60']
+HOST_LOCATIONS = ['Paris, Île-de-France, France', 'Paris, France', 'France', 'London, England, United Kingdom',
+                  'New York, New York, United States', 'Île-de-France, France', 'FR']
+AMENITIES = ['Wifi', 'Kitchen', 'Heating', 'Essentials', 'Washer', 'Hair dryer', 'Laptop friendly workspace',
+             'Hangers', 'Iron', 'TV', 'Shampoo', 'Hot water', 'Elevator', 'Smoke detector', 'Dishwasher',
+             'Coffee maker', 'Refrigerator', 'Dishes and silverware', 'Cooking basics', 'Oven', 'Stove', 'Microwave',
+             'Family/kid friendly', 'Bed linens', 'Long term stays allowed', 'Host greets you', 'Lock on bedroom door',
+             'Buzzer/wireless intercom', 'Air conditioning', 'Free street parking', 'Paid parking off premises',
+             'Dryer', 'Cable TV', 'Extra pillows and blankets', 'Private entrance', 'Patio or balcony',
+             'Pets allowed', 'Smoking allowed', 'Breakfast', 'Carbon monoxide detector', 'First aid kit',
+             'Fire extinguisher', 'Bathtub', 'Luggage dropoff allowed', 'Self check-in', 'Lockbox', 'Crib',
+             'High chair', 'Room-darkening shades', 'Garden or backyard', 'Gym', 'Pool', 'Hot tub',
+             'Suitable for events', 'Wheelchair accessible', 'Building staff', 'Doorman', 'Keypad', 'Safety card',
+             '24-hour check-in']
+REVIEW_SENTENCES = ["Great location, close to the metro.", "The apartment was clean and cosy.",
+                    "Our host was very welcoming and helpful.", "A bit noisy at night but we slept well.",
+                    "Perfect stay, we will come back!", "The place is smaller than it looks on the pictures.",
+                    "Lots of restaurants and shops around.", "Check-in was easy and quick."]
+
+
+def _format_prices(values):
+    """
+    Inner method that formats integer prices as raw Inside Airbnb strings ('$1,234.00'), each distinct value is
+    formatted once
+    :param values: (numpy array) integer prices
+    :return: (numpy array) raw price strings
+    """
+    uniques, codes = np.unique(values, return_inverse=True)
+    return np.array(['${:,.2f}'.format(v) for v in uniques], dtype=object)[codes.ravel()]
+
+
+def _with_missing(values, rng, rate):
+    """
+    Inner method that replaces a random share of the given values by NaN
+    :param values: (numpy array) values, object or float
+    :param rng: (numpy RandomState) random generator
+    :param rate: (float) share of missing values
+    :return: (numpy array) values with missing ones
+    """
+    values = values.astype(object) if values.dtype == object else values.astype(np.float64)
+    values[rng.rand(values.shape[0]) < rate] = np.nan
+    return values
+
+
+def _t_f(rng, nb_rows, p_true, missing_rate=0.):
+    """
+    Inner method that draws raw 't'/'f' flags
+    """
+    return _with_missing(np.where(rng.rand(nb_rows) < p_true, 't', 'f').astype(object), rng, missing_rate)
+
+
+def _amenities_pool(rng, pool_size):
+    """
+    Inner method that builds distinct raw amenities strings, popular amenities being more frequent (as in real data)
+    :param rng: (numpy RandomState) random generator
+    :param pool_size: (int) number of strings to build
+    :return: (numpy array) raw amenities strings
+    """
+    popularity = np.linspace(0.98, 0.01, len(AMENITIES))
+    owned = rng.rand(pool_size, len(AMENITIES)) < popularity
+    names = np.array(['"{}"'.format(a) if ' ' in a else a for a in AMENITIES], dtype=object)
+    return np.array(['{' + ','.join(names[row]) + '}' for row in owned], dtype=object)
+
+
+def generate_listings(nb_rows, seed=42, start_id=1):
+    """
+    Generate a raw listings dataset with all the columns of cleaning.get_listings_input_schema() and the ones used by
+    the visualizations ('neighbourhood', 'host_location', 'latitude', 'longitude', 'calculated_host_listings_count')
+    :param nb_rows: (int) number of listings
+    :param seed: (int) not required, random seed
+    :param start_id: (int) not required, id of the first listing
+    :return: (pandas DataFrame) raw listings, as read from the CSV file
+    """
+    rng = np.random.RandomState(seed)
+    n = nb_rows
+    neighbourhoods = rng.randint(0, len(NEIGHBOURHOODS), n)
+    room_types = rng.choice(len(ROOM_TYPES), n, p=[0.85, 0.12, 0.02, 0.01])
+    accommodates = rng.randint(1, 9, n).astype(np.float64)
+    prices = np.maximum(10, (rng.lognormal(4.4, 0.5, n) * (1 + 0.15 * accommodates)
+                             * np.where(room_types == 0, 1., 0.6)).astype(np.int64))
+
+    df = pd.DataFrame({'id': np.arange(start_id, start_id + n, dtype=np.int64)})
+    df['host_location'] = _with_missing(rng.choice(np.array(HOST_LOCATIONS, dtype=object), n), rng, 0.005)
+    df['host_is_superhost'] = _t_f(rng, n, 0.15, 0.001)
+    df['host_identity_verified'] = _t_f(rng, n, 0.4, 0.001)
+    df['calculated_host_listings_count'] = rng.geometric(0.6, n)
+    df['neighbourhood'] = np.array(NEIGHBOURHOODS, dtype=object)[neighbourhoods]
+    df['neighbourhood_cleansed'] = df['neighbourhood']
+    df['latitude'] = 48.86 + rng.normal(0, 0.02, n)
+    df['longitude'] = 2.34 + rng.normal(0, 0.03, n)
+    df['is_location_exact'] = _t_f(rng, n, 0.8)
+    df['room_type'] = np.array(ROOM_TYPES, dtype=object)[room_types]
+    df['accommodates'] = accommodates
+    df['bathrooms'] = _with_missing(rng.choice([0.5, 1., 1.5, 2.], n, p=[0.05, 0.8, 0.1, 0.05]), rng, 0.002)
+    df['bedrooms'] = _with_missing(np.minimum(rng.poisson(accommodates / 2.5), 6).astype(np.float64), rng, 0.002)
+    df['beds'] = _with_missing(np.maximum(1, rng.poisson(accommodates / 2)).astype(np.float64), rng, 0.002)
+    df['bed_type'] = rng.choice(np.array(BED_TYPES, dtype=object), n, p=[0.9, 0.05, 0.03, 0.01, 0.01])
+    df['amenities'] = _amenities_pool(rng, min(n, 20000))[rng.randint(0, min(n, 20000), n)]
+    df['price'] = _format_prices(prices)
+    df['security_deposit'] = _with_missing(_format_prices(rng.choice([0, 100, 200, 300, 500, 1000], n)), rng, 0.3)
+    df['cleaning_fee'] = _with_missing(_format_prices(rng.choice([0, 10, 20, 30, 50, 80], n)), rng, 0.2)
+    df['guests_included'] = rng.randint(1, 4, n).astype(np.float64)
+    df['extra_people'] = _format_prices(rng.choice([0, 10, 15, 20, 30], n))
+    min_nights = rng.choice([1., 2., 3., 4., 5., 7., 30.], n)
+    max_nights = rng.choice([30., 90., 365., 1125.], n)
+    for prefix, values in [('minimum', min_nights), ('maximum', max_nights)]:
+        df['{}_nights'.format(prefix)] = values
+        df['minimum_{}_nights'.format(prefix)] = values
+        df['maximum_{}_nights'.format(prefix)] = values
+        df['{}_nights_avg_ntm'.format(prefix)] = values
+    availability = rng.randint(0, 366, n)
+    for days in [30, 60, 90, 365]:
+        df['availability_{}'.format(days)] = np.minimum(availability, days).astype(np.float64)
+    df['number_of_reviews'] = rng.negative_binomial(1, 0.05, n).astype(np.float64)
+    df['number_of_reviews_ltm'] = np.floor(df['number_of_reviews'] * rng.rand(n))
+    no_review = df['number_of_reviews'] == 0
+    for col in ['review_scores_rating', 'review_scores_accuracy', 'review_scores_cleanliness', 'review_scores_checkin',
+                'review_scores_communication', 'review_scores_location', 'review_scores_value']:
+        scores = np.clip(rng.normal(95, 6, n), 20, 100) if col == 'review_scores_rating' \
+            else np.clip(rng.normal(9.5, 0.8, n).round(), 2, 10)
+        df[col] = np.where(no_review, np.nan, scores)
+    df['reviews_per_month'] = np.where(no_review, np.nan, np.round(rng.gamma(1., 1., n), 2))
+    df['license'] = _with_missing(np.full(n, '7510112345678', dtype=object), rng, 0.8)
+    df['instant_bookable'] = _t_f(rng, n, 0.35)
+    df['cancellation_policy'] = rng.choice(np.array(CANCELLATION_POLICIES, dtype=object), n,
+                                           p=[0.3, 0.25, 0.4, 0.03, 0.02])
+    return df
+
+
+def generate_calendar(nb_rows, seed=42, start_date='2019-07-09', nb_days=365):
+    """
+    Generate a raw calendar dataset: one row per listing and per day, listings ids start at 1 (as generate_listings)
+    :param nb_rows: (int) number of rows, the number of listings is deduced from it (nb_rows / nb_days)
+    :param seed: (int) not required, random seed
+    :param start_date: (string) not required, first day of the calendar
+    :param nb_days: (int) not required, number of days per listing
+    :return: (pandas DataFrame) raw calendar, as read from the CSV file
+    """
+    rng = np.random.RandomState(seed)
+    nb_listings = int(np.ceil(nb_rows / nb_days))
+    days = pd.date_range(start_date, periods=nb_days).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    base_prices = np.maximum(10, rng.lognormal(4.4, 0.5, nb_listings).astype(np.int64))
+
+    listing_pos = np.repeat(np.arange(nb_listings), nb_days)[:nb_rows]
+    day_pos = np.tile(np.arange(nb_days), nb_listings)[:nb_rows]
+    # Prices are higher during week-ends and some listings offer discounts
+    prices = (base_prices[listing_pos] * np.where(np.isin(day_pos % 7, [4, 5]), 1.2, 1.)).astype(np.int64)
+    adjusted = (prices * np.where(rng.rand(nb_rows) < 0.05, 0.9, 1.)).astype(np.int64)
+    return pd.DataFrame({'listing_id': listing_pos + 1, 'date': days[day_pos],
+                         'available': _t_f(rng, nb_rows, 0.3), 'price': _format_prices(prices),
+                         'adjusted_price': _format_prices(adjusted),
+                         'minimum_nights': rng.choice([1., 2., 3., 7.], nb_rows),
+                         'maximum_nights': rng.choice([30., 365., 1125.], nb_rows)})
+
+
+def generate_reviews(nb_rows, nb_listings=None, seed=42, start_date='2012-01-01', end_date='2019-07-09'):
+    """
+    Generate a raw reviews dataset
+    :param nb_rows: (int) number of reviews
+    :param nb_listings: (int) not required, number of reviewed listings (ids start at 1). Default is nb_rows / 20
+    :param seed: (int) not required, random seed
+    :param start_date: (string) not required, date of the oldest review
+    :param end_date: (string) not required, date of the latest review
+    :return: (pandas DataFrame) raw reviews, as read from the CSV file
+    """
+    rng = np.random.RandomState(seed)
+    nb_listings = max(1, nb_rows // 20) if nb_listings is None else nb_listings
+    days = pd.date_range(start_date, end_date).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    comments = np.array([' '.join(rng.choice(REVIEW_SENTENCES, rng.randint(1, 5))) for _ in range(1000)],
+                        dtype=object)
+    df = pd.DataFrame({'listing_id': np.sort(rng.randint(1, nb_listings + 1, nb_rows)),
+                       'id': np.arange(1, nb_rows + 1, dtype=np.int64),
+                       'date': np.sort(days[rng.randint(0, len(days), nb_rows)])})
+    df['reviewer_id'] = rng.randint(1, 10 ** 8, nb_rows)
+    df['reviewer_name'] = rng.choice(np.array(['Anna', 'Marc', 'Julie', 'John', 'Sofia', 'Li'], dtype=object), nb_rows)
+    df['comments'] = comments[rng.randint(0, len(comments), nb_rows)]
+    return df
+
+
+def save_synthetic_data(data_dir, nb_listings, nb_reviews=None, nb_days=365, chunk_size=1000000, seed=42):
+    """
+    Write synthetic raw files with the same names and formats as the downloaded ones (gzip CSV), so that loaders and
+    streaming functions can be run on them. The calendar is generated and written chunk by chunk
+    :param data_dir: (string) directory where files are written
+    :param nb_listings: (int) number of listings (the calendar has nb_listings * nb_days rows)
+    :param nb_reviews: (int) not required, number of reviews. Default is 20 reviews per listing
+    :param nb_days: (int) not required, number of days of the calendar
+    :param chunk_size: (int) not required, maximum number of calendar listings generated at once is chunk_size / nb_days
+    :param seed: (int) not required, random seed
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    df_listings = generate_listings(nb_listings, seed)
+    # Columns that clean_listings drops are not generated, except those used by visualizations
+    df_listings.to_csv(os.path.join(data_dir, cst.LISTING_FULL_FILE), index=False, compression='gzip')
+
+    listings_per_chunk = max(1, chunk_size // nb_days)
+    with gzip.open(os.path.join(data_dir, cst.CALENDAR_FILE), 'wt') as f:
+        for i, start in enumerate(range(0, nb_listings, listings_per_chunk)):
+            nb = min(listings_per_chunk, nb_listings - start)
+            chunk = generate_calendar(nb * nb_days, seed + i, nb_days=nb_days)
+            chunk['listing_id'] += start
+            chunk.to_csv(f, index=False, header=(i == 0))
+
+    nb_reviews = 20 * nb_listings if nb_reviews is None else nb_reviews
+    generate_reviews(nb_reviews, nb_listings, seed).to_csv(os.path.join(data_dir, cst.REVIEWS_FILE), index=False,
+                                                           compression='gzip')
+    print("Synthetic data ({} listings, {} calendar rows, {} reviews) saved to {}".format(
+        nb_listings, nb_listings * nb_days, nb_reviews, data_dir))
+
+
+def get_synthetic_clean_listings(nb_rows, seed=42, amenities_threshold=None):
+    """
+    Generate listings and clean them as notebooks do, such as the input of the modeling phase
+    :param nb_rows: (int) number of listings
+    :param seed: (int) not required, random seed
+    :param amenities_threshold: (int) not required, default is relative to the number of listings (see
+    cleaning.get_amenities_threshold)
+    :return: (pandas DataFrame) cleaned listings
+    """
+    df = generate_listings(nb_rows, seed)[list(cleaning.get_listings_input_schema())]
+    return cleaning.clean_listings(df, amenities_threshold=amenities_threshold, verbose=False)
@@ -5,6 +5,14 @@ Utility package used by notebooks to query data and print values, pandas DataFra
 
 @author: nidragedd
 """
+import os
+import pickle
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from src.utils import constants as cst
 
 
 def print_basic_info_for_feature(data, column):
@@ -21,18 +29,223 @@ def print_basic_info_for_feature(data, column):
     print(data[column].unique()[:8])
 
 
-def get_hp_infos_for_listing(df, query_name):
+class ListingNameIndex(object):
+    """
+    N-gram index over listing names: a substring query only checks the listings that contain all the trigrams of the
+    query instead of scanning all names (queries of 1 to 3 characters are answered by their own posting list). Names
+    are also sorted so that names starting with the query are found by binary search. Also gives the row position of a
+    listing from its id
+    """
+    # Saved indexes of another version are rebuilt (see load_or_build_name_index)
+    VERSION = 2
+
+    def __init__(self, df, case_sensitive=True):
+        """
+        Build the index
+        :param df: (pandas DataFrame) dataset that contains all listings, with 'id' and 'name' features
+        :param case_sensitive: (boolean) not required, default is True (same behaviour as str.find)
+        """
+        self.version = self.VERSION
+        self.case_sensitive = case_sensitive
+        self.names = df['name'].fillna('').astype(str).to_numpy(dtype=object)
+        self.ids = pd.Index(df['id'].to_numpy())
+        self.fingerprint = self.compute_fingerprint(df)
+        # Names are normalized once, queries are checked against these
+        self.normalized = np.array([self._normalize(name) for name in self.names], dtype=object)
+        # Same names as a fixed width unicode array, so that candidates are checked with vectorized string operations
+        self.normalized_text = self.normalized.astype(str)
+        self.lengths = np.array([len(name) for name in self.normalized], dtype=np.int64)
+        self.sorted_positions = np.argsort(self.normalized, kind='stable')
+        self.sorted_names = self.normalized[self.sorted_positions]
+
+        postings = defaultdict(list)
+        for position, name in enumerate(self.normalized):
+            for gram in self._ngrams(name):
+                postings[gram].append(position)
+        # Positions are appended in increasing order so posting lists are already sorted
+        self.postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    @staticmethod
+    def compute_fingerprint(df):
+        """
+        :param df: (pandas DataFrame) dataset with 'id' and 'name' features
+        :return: (int) hash of ids and names, used to know if a saved index still matches a dataset
+        """
+        return int(pd.util.hash_pandas_object(df[['id', 'name']], index=False).sum())
+
+    def _normalize(self, text):
+        """
+        Inner method that puts a text in the case used by the index
+        """
+        return text if self.case_sensitive else text.lower()
+
+    @staticmethod
+    def _ngrams(text, sizes=(1, 2, 3)):
+        """
+        Inner method that gives the distinct n-grams of a text
+        """
+        return {text[i:i + n] for n in sizes for i in range(len(text) - n + 1)}
+
+    def _shortest_postings(self, query):
+        """
+        Inner method that gives the posting lists of the trigrams of a query, shortest first
+        :param query: (string) normalized query of more than 3 characters
+        :return: (list) sorted positions of each trigram
+        """
+        return sorted((self.postings.get(gram, np.empty(0, dtype=np.int32)) for gram in self._ngrams(query, (3,))),
+                      key=len)
+
+    def _candidates(self, query):
+        """
+        Inner method that gives the positions of listings that may contain the query
+        :param query: (string) normalized query
+        :return: (tuple) sorted positions, True if they all contain the query (no need to check them)
+        """
+        if len(query) == 0:
+            return np.arange(len(self.names)), True
+        if len(query) <= 3:
+            return self.postings.get(query, np.empty(0, dtype=np.int32)), True
+        # Intersecting the two rarest trigrams removes most false candidates, checking the others is cheaper than
+        # intersecting more lists
+        lists = self._shortest_postings(query)[:2]
+        candidates = lists[0]
+        if len(lists) > 1 and len(candidates) > 0:
+            candidates = np.intersect1d(candidates, lists[1], assume_unique=True)
+        return candidates, False
+
+    def _prefix_positions(self, query):
+        """
+        Inner method that gives the positions of listings whose name starts with the query (binary search)
+        :param query: (string) normalized query, not empty
+        :return: (numpy array) positions, in sorted names order
+        """
+        start = np.searchsorted(self.sorted_names, query, side='left')
+        # Smallest text greater than all texts starting with the query
+        stop = np.searchsorted(self.sorted_names, query[:-1] + chr(ord(query[-1]) + 1), side='left')
+        return self.sorted_positions[start:stop]
+
+    def _rank(self, query, positions, found, top_k=None):
+        """
+        Inner method that sorts matches: exact name first, then by position of the query in the name, by name length
+        and by dataset order
+        :param query: (string) normalized query
+        :param positions: (numpy array) positions of the matches
+        :param found: (numpy array) position of the query in each matching name
+        :param top_k: (int) not required, default is None (all matches). Only the best top_k are sorted
+        :return: (numpy array) sorted positions
+        """
+        lengths = self.lengths[positions]
+        not_exact = (found != 0) | (lengths != len(query))
+        # All criteria packed in a single integer key (names length bounds both found and lengths)
+        max_length = int(self.lengths.max()) + 1 if len(self.lengths) > 0 else 1
+        keys = ((not_exact * max_length + found) * max_length + lengths) * len(self.names) + positions
+        if top_k is not None and top_k < len(keys):
+            keys = keys[np.argpartition(keys, top_k)[:top_k]]
+        return np.sort(keys) % len(self.names)
+
+    def search(self, query, top_k=None):
+        """
+        Find listings whose name contains the given query. Results are ranked: exact name first, then names starting
+        with the query, then by position of the query in the name and by name length
+        :param query: (string) substring to look for
+        :param top_k: (int) not required, default is None (all matches). Maximum number of results
+        :return: (list) ids of the matching listings, best match first
+        """
+        query = self._normalize(query)
+        if top_k is not None and len(query) > 0:
+            # Names starting with the query rank before all others: enough of them means no other name to check
+            prefix = self._prefix_positions(query)
+            if len(prefix) >= top_k:
+                return self.ids[self._rank(query, prefix, np.zeros(len(prefix), dtype=np.int64), top_k)].tolist()
+
+        candidates, verified = self._candidates(query)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        found = np.char.find(self.normalized_text[candidates], query).astype(np.int64)
+        if not verified:
+            candidates, found = candidates[found > -1], found[found > -1]
+        return self.ids[self._rank(query, candidates, found, top_k)].tolist()
+
+    def find_first(self, query):
+        """
+        Find the first listing, in dataset order, whose name contains the given query (same result as a full scan)
+        :param query: (string) substring to look for
+        :return: id of the listing, None if not found
+        """
+        query = self._normalize(query)
+        if len(query) <= 3:
+            candidates = self._candidates(query)[0]
+            return self.ids[candidates[0]] if len(candidates) > 0 else None
+        # Positions of the rarest trigram are checked in dataset order, the first one that contains the query wins
+        for position in self._shortest_postings(query)[0]:
+            if query in self.normalized[position]:
+                return self.ids[position]
+        return None
+
+    def search_many(self, queries, top_k=None):
+        """
+        Run several queries against the index
+        :param queries: (list) substrings to look for
+        :param top_k: (int) not required, maximum number of results per query
+        :return: (dict) key is the query, value the list of ids found (see search)
+        """
+        return {query: self.search(query, top_k) for query in queries}
+
+    def get_positions(self, ids):
+        """
+        Get the row positions of the given listing ids in the indexed dataset
+        :param ids: (list) listing ids
+        :return: (numpy array) row positions, -1 for an unknown id
+        """
+        return self.ids.get_indexer(ids)
+
+    def save(self, path):
+        """
+        Persist the index on disk
+        :param path: (string) file path
+        """
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_or_build_name_index(df, path=None, case_sensitive=True):
+    """
+    Load the listing name index saved on disk if it has been built from the same dataset, otherwise build and save it
+    :param df: (pandas DataFrame) dataset that contains all listings
+    :param path: (string) not required, default is the name index file in the data cache directory
+    :param case_sensitive: (boolean) not required, default is True
+    :return: (ListingNameIndex) the index
+    """
+    path = os.path.join(cst.CACHE_DIR_PATH, cst.NAME_INDEX_FILE) if path is None else path
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+        if getattr(index, 'version', 1) == ListingNameIndex.VERSION and index.case_sensitive == case_sensitive \
+                and index.fingerprint == ListingNameIndex.compute_fingerprint(df):
+            return index
+    index = ListingNameIndex(df, case_sensitive)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    index.save(path)
+    return index
+
+
+def get_hp_infos_for_listing(df, query_name, name_index=None):
     """
     Get airbnb homepage informations from a dataset and given a listing name
     :param df: (pandas DataFrame) dataset that contains all listings
     :param query_name: (string) will be used to query the 'name' feature in the dataset
+    :param name_index: (ListingNameIndex) not required, index built on the same dataset. If not given, all names are
+    scanned
     :return: (pandas DataFrame) found information or None
     """
     info_cols = ['id', 'name', 'room_type', 'beds', 'price', 'number_of_reviews', 'review_scores_rating',
                  'host_is_superhost']
-    lst_id = df[df['name'].str.find(query_name) > -1].id.tolist()
-    if len(lst_id) > 0:
-        return df[df['id'] == lst_id[0]][info_cols]
+    if name_index is not None:
+        lst_id = name_index.find_first(query_name)
+        if lst_id is not None:
+            return df.iloc[name_index.get_positions([lst_id])][info_cols]
     else:
-        print("No listing found with this query '{}'".format(query_name))
-        return None
+        lst_id = df[df['name'].str.find(query_name) > -1].id.tolist()
+        if len(lst_id) > 0:
+            return df[df['id'] == lst_id[0]][info_cols]
+    print("No listing found with this query '{}'".format(query_name))
+    return None
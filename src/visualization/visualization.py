@@ -8,9 +8,11 @@ All functions that plots graphs with matplotlib/seaborn should be within this pa
 """
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 import numpy as np
 
+from src.preprocessing import cleaning
+from src.preprocessing.amenities import AmenitiesEncoder
+from src.preprocessing.cube import CalendarCube
 from src.utils import utils
 
 
@@ -76,41 +78,12 @@ def barplot_something_per_neighbourhood_sorted(df, column):
     plt.show()
 
 
-def _inner_split_location(row):
-    """
-    Inner method called through 'apply' on the whole dataset
-    :param row: each row is given as argument of the function
-    :return: row
-    """
-    elements = row['host_location'].split(', ')
-    if len(elements) == 3:
-        row['city'] = elements[0]
-        row['region'] = elements[1]
-        row['country'] = elements[2]
-    elif len(elements) == 2:
-        row['region'] = elements[0]
-        row['country'] = elements[1]
-    elif len(elements) == 1:
-        row['country'] = elements[0]
-    return row
-
-
 def barplot_hostlocation(df):
     """
     Barplot the host location
     :param df: (pandas DataFrame) dataset to explore
     """
-    df_host_loc = df[df['host_location'].notnull()][['id', 'host_location']]
-    df_host_loc = df_host_loc.apply(_inner_split_location, axis=1)
-
-    # Update country codes with country name
-    df_host_loc.country.replace('FR', 'France', inplace=True)
-    df_host_loc.country.replace('US', 'United States', inplace=True)
-    df_host_loc.country.replace('GB', 'United Kingdom', inplace=True)
-    df_host_loc.country.replace('IT', 'Italy', inplace=True)
-    df_host_loc.country.replace('CN', 'China', inplace=True)
-    df_host_loc.country.replace('London', 'United Kingdom', inplace=True)
-    df_host_loc.country.replace('LONDON', 'United Kingdom', inplace=True)
+    df_host_loc = cleaning.split_host_location(df.loc[df['host_location'].notnull(), 'host_location'])
 
     # Plot countries and cities
     figure, axis = plt.subplots(2, 1, figsize=(15, 12))
@@ -212,13 +185,19 @@ def scatterplot_xy_top_flop_expensive_places(df, nb_elements):
 def lineplot_feature_over_time(df, column, group, hue=None, col_title=None):
     """
     Plot variation over time of a mean value for a given column
-    :param df: (pandas DataFrame) the dataset that contains data
+    :param df: (pandas DataFrame) the dataset that contains data, can also be the output of
+    streaming.aggregate_calendar as long as 'group' matches the aggregation keys, or a CalendarCube (see
+    cube.CalendarCube) to avoid going through the whole calendar again for each plot
     :param column: (string) the column to use for plotting
     :param group: (string or list) features for the groupby
     :param hue: (string) the feature for color change (if multiple groupby)
     :param col_title: (string) if column has not a readable version you can specify another one with this parameter
     """
-    av_time = df.groupby(group)[column].mean().reset_index()
+    if isinstance(df, CalendarCube):
+        av_time = df.aggregate(column, group)
+        df = av_time
+    else:
+        av_time = df.groupby(group)[column].mean().reset_index()
     figure, axis = plt.subplots(1, 1, figsize=(15, 8))
     axis.set_title("Mean {} over time".format(column if col_title is None else col_title))
     if hue is None:
@@ -237,17 +216,25 @@ def lineplot_feature_over_time(df, column, group, hue=None, col_title=None):
 def lineplot_feature_distinct_neighbourhood_over_time(df, column, group, col_title=None):
     """
     Plot variation over time per neighbourhood for a specific feature/column of the given dataset
-    :param df: (pandas DataFrame) the dataset that contains data
+    :param df: (pandas DataFrame) the dataset that contains data, or a CalendarCube (see cube.CalendarCube)
     :param column: (string) the column to use for plotting
     :param group: (string or list) features for the groupby
     :param col_title: (string) if column has not a readable version you can specify another one with this parameter
     """
     figure, axis = plt.subplots(5, 4, figsize=(16, 12))
-    neighs = df['neighbourhood'].unique().tolist()
+    group = [group] if isinstance(group, str) else list(group)
+    # All neighbourhoods are aggregated at once, then each plot takes its own part
+    if isinstance(df, CalendarCube):
+        neighs = df.neighbourhoods.dropna().tolist()
+        av_all = df.aggregate(column, ['neighbourhood'] + group)
+    else:
+        neighs = df['neighbourhood'].unique().tolist()
+        av_all = df.groupby(['neighbourhood'] + group)[column].mean().reset_index()
+    av_per_neigh = {neigh: av_time for neigh, av_time in av_all.groupby('neighbourhood', sort=False)}
     counter = 0
     for i in range(0, 5):
         for j in range(0, 4):
-            av_time = df[df['neighbourhood'] == neighs[counter]].groupby(group)[column].mean().reset_index()
+            av_time = av_per_neigh.get(neighs[counter], av_all.iloc[:0])
             axis[i][j].set_title("Mean {} for {}".format(column if col_title is None else col_title, neighs[counter]))
             sns.lineplot(x="date", y=column, data=av_time, ax=axis[i][j])
             axis[i][j].set(xticks='')
@@ -259,20 +246,17 @@ def plot_amenities_nb_features_and_tresholds(df_only_amenities):
     """
     Plot a single line representing the number of amenities that would be kept per treshold value (from 0 to 6000 with
     some particular values such as 0.01% of the number of listings, 0.1%, 1%, etc)
-    :param df_only_amenities: (pandas DataFrame) dataset with only amenities
+    :param df_only_amenities: (pandas DataFrame or AmenitiesEncoder) dataset with only amenities or fitted encoder
     :return dataframe that contains amenities as index and sum of listing containing this amenity as value
     """
-    # Build a dataframe that contains amenities as index and sum of listing containing this amenity as value
-    amen_dict = {}
-    for amenity in df_only_amenities.columns.tolist():
-        amen_dict[amenity] = df_only_amenities[amenity].sum()
-    df_amen_sum = pd.DataFrame.from_dict(amen_dict, orient='index', columns=['amen_sum'])
+    if not isinstance(df_only_amenities, AmenitiesEncoder):
+        df_only_amenities = AmenitiesEncoder().fit_from_dummies(df_only_amenities)
+    # Dataframe that contains amenities as index and sum of listing containing this amenity as value
+    df_amen_sum = df_only_amenities.get_frequencies()
 
     # Take some specific treshold values
     tresholds = [20, 64, 128, 642, 1000, 1284, 1926, 3000, 4000, 5000, 6000]
-    y = []
-    for t in tresholds:
-        y.append(df_amen_sum[df_amen_sum['amen_sum'] > t].shape[0])
+    y = df_only_amenities.nb_features_above(tresholds)
 
     figure, axis = plt.subplots(1, 1, figsize=(15, 5))
     axis.set_title('Nb of features kept per treshold value')
@@ -0,0 +1,11 @@
+"""
+Created on 18 october 2026
+
+Shared configuration of the tests: they are run from the root of the repository (python -m pytest tests)
+
+@author: nidragedd
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,56 @@
+"""
+Created on 18 october 2026
+
+Tests of the calendar cube cache: the saved cube is reused only for the same calendar file, listings neighbourhoods
+and aggregated features
+
+@author: nidragedd
+"""
+import pandas as pd
+import pytest
+
+from src.preprocessing import cube
+from src.utils import datacollector
+
+
+@pytest.fixture
+def calendar_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'calendar.csv.gz')
+    pd.DataFrame({'listing_id': [1, 1, 2, 2, 3], 'date': ['2019-07-09', '2019-07-10'] * 2 + ['2019-07-09'],
+                  'available': ['t', 'f', 't', 't', 'f'], 'price': ['$10.00', '$12.00', '$20.00', '$22.00', '$30.00'],
+                  'adjusted_price': ['$10.00', '$12.00', '$20.00', '$22.00', '$30.00']}).to_csv(path, index=False)
+    monkeypatch.setattr(datacollector, 'get_data_file', lambda filename, *args, **kwargs: path)
+    return path
+
+
+def _build_count(monkeypatch):
+    builds = []
+    build = cube.CalendarCube.from_calendar_file.__func__
+
+    def _counted(cls, *args, **kwargs):
+        builds.append(1)
+        return build(cls, *args, **kwargs)
+    monkeypatch.setattr(cube.CalendarCube, 'from_calendar_file', classmethod(_counted))
+    return builds
+
+
+def test_cube_cache_is_keyed_on_listings_and_columns(calendar_file, tmp_path, monkeypatch):
+    builds = _build_count(monkeypatch)
+    path = str(tmp_path / 'cache' / 'calendar_cube.npz')
+    df_listings = pd.DataFrame({'id': [1, 2, 3], 'neighbourhood': ['A', 'A', 'B']})
+
+    first = cube.load_or_build_calendar_cube(df_listings, path=path)
+    again = cube.load_or_build_calendar_cube(df_listings, path=path)
+    assert len(builds) == 1
+    pd.testing.assert_frame_equal(first.aggregate('price', ['date', 'neighbourhood']),
+                                  again.aggregate('price', ['date', 'neighbourhood']))
+
+    # Listing 2 moved to another neighbourhood: the saved cube is stale
+    moved = cube.load_or_build_calendar_cube(df_listings.assign(neighbourhood=['A', 'B', 'B']), path=path)
+    assert len(builds) == 2
+    by_neighbourhood = moved.aggregate('price', ['date', 'neighbourhood'])
+    assert by_neighbourhood['neighbourhood'].value_counts().to_dict() == {'A': 2, 'B': 2}
+    cube.load_or_build_calendar_cube(df_listings, path=path, columns=['price'])
+    assert len(builds) == 3
+    assert cube.load_or_build_calendar_cube(df_listings, path=path, columns=['price']).columns == ['price']
+    assert len(builds) == 3
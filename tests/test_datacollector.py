@@ -0,0 +1,142 @@
+"""
+Created on 18 october 2026
+
+Tests of the resumable download of data files, against a local HTTP server whose file changes between two partial
+downloads, and of the projection of raw data files on a schema
+
+@author: nidragedd
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+import pytest
+import requests
+
+from src.utils import constants as cst
+from src.utils import datacollector
+
+
+class _VersionedFileHandler(BaseHTTPRequestHandler):
+    """
+    Serves a single file with an ETag and Range/If-Range support. The connection can be cut after some bytes to
+    simulate an interrupted download
+    """
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, content_length, content_range=None):
+        self.send_response(status)
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(content_length))
+        if content_range is not None:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(200, len(self.server.content))
+
+    def do_GET(self):
+        content = self.server.content
+        start = 0
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header is not None and (if_range is None or if_range == self.server.etag):
+            start = int(range_header.split('=')[1].rstrip('-'))
+            self._send_headers(206, len(content) - start,
+                               'bytes {}-{}/{}'.format(start, len(content) - 1, len(content)))
+        else:
+            self._send_headers(200, len(content))
+        body = content[start:]
+        if self.server.cut_after is not None:
+            body = body[:self.server.cut_after]
+            self.server.cut_after = None
+        self.wfile.write(body)
+        self.wfile.flush()
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(('127.0.0.1', 0), _VersionedFileHandler)
+    httpd.content, httpd.etag, httpd.cut_after = b'', '"v0"', None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _set_version(server, content, etag):
+    server.content, server.etag = content, etag
+
+
+def _interrupted_download(server, url, data_dir, cut_after):
+    server.cut_after = cut_after
+    with pytest.raises(requests.RequestException):
+        datacollector._download_file_from_url(url, 'file.bin', data_dir)
+    part_file = os.path.join(data_dir, 'file.bin' + cst.DOWNLOAD_PART_EXTENSION)
+    assert 0 < os.path.getsize(part_file) < len(server.content)
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Written to disk by small blocks so that an interrupted download leaves a partial file
+    monkeypatch.setattr(cst, 'DOWNLOAD_BLOCK_SIZE', 64)
+
+
+def test_resume_same_version(server, tmp_path, small_blocks):
+    url = 'http://127.0.0.1:{}/file.bin'.format(server.server_port)
+    content = bytes(range(256)) * 40
+    _set_version(server, content, '"v1"')
+    _interrupted_download(server, url, str(tmp_path), 4000)
+
+    entry = datacollector._download_file_from_url(url, 'file.bin', str(tmp_path))
+    assert (tmp_path / 'file.bin').read_bytes() == content
+    assert entry['etag'] == '"v1"'
+    assert sorted(os.listdir(str(tmp_path))) == ['file.bin']
+
+
+def test_resume_after_remote_change_same_size(server, tmp_path, small_blocks):
+    url = 'http://127.0.0.1:{}/file.bin'.format(server.server_port)
+    old_content = b'a' * 10000
+    _set_version(server, old_content, '"v1"')
+    _interrupted_download(server, url, str(tmp_path), 4000)
+
+    # Same size: old offset + remaining bytes of the new version would pass the size check
+    new_content = b'b' * 10000
+    _set_version(server, new_content, '"v2"')
+    entry = datacollector._download_file_from_url(url, 'file.bin', str(tmp_path))
+    assert (tmp_path / 'file.bin').read_bytes() == new_content
+    assert entry['etag'] == '"v2"'
+
+
+def test_partial_file_without_version_is_discarded(server, tmp_path):
+    url = 'http://127.0.0.1:{}/file.bin'.format(server.server_port)
+    content = b'c' * 1000
+    _set_version(server, content, '"v1"')
+    (tmp_path / ('file.bin' + cst.DOWNLOAD_PART_EXTENSION)).write_bytes(b'x' * 300)
+
+    datacollector._download_file_from_url(url, 'file.bin', str(tmp_path))
+    assert (tmp_path / 'file.bin').read_bytes() == content
+
+
+def test_unchanged_file_is_skipped(server, tmp_path):
+    url = 'http://127.0.0.1:{}/file.bin'.format(server.server_port)
+    _set_version(server, b'd' * 1000, '"v1"')
+    manifest = datacollector.collect_data([(url, 'file.bin')], str(tmp_path))
+    assert datacollector._download_file_from_url(url, 'file.bin', str(tmp_path), manifest) is None
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_schema_projection_keeps_file_order(tmp_path, use_cache):
+    data_dir, cache_dir = str(tmp_path / 'data'), str(tmp_path / 'cache')
+    os.makedirs(data_dir)
+    pd.DataFrame({'z': [1, 2], 'a': ['x', 'y'], 'm': [1.5, 2.5]}).to_csv(os.path.join(data_dir, 'f.csv'), index=False)
+    schema = {'m': 'float32', 'z': 'int32'}
+    # With the cache, first call builds it and second call reads it
+    for _ in range(2 if use_cache else 1):
+        df = datacollector.load_data_file('f.csv', use_cache=use_cache, schema=schema, data_dir=data_dir,
+                                          cache_dir=cache_dir)
+        assert df.columns.tolist() == ['z', 'm']
+        assert df.dtypes.astype(str).tolist() == ['int32', 'float32']
@@ -0,0 +1,91 @@
+"""
+Created on 18 october 2026
+
+Tests of the on-disk result cache: fingerprints, least recently used eviction and entries removed by another process
+
+@author: nidragedd
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils import diskcache
+from src.utils.diskcache import ResultCache
+
+
+def _set_used(cache, key, timestamp):
+    os.utime(cache._path(key), (timestamp, timestamp))
+
+
+def test_fingerprint_is_stable_and_sensitive():
+    df = pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, np.nan, 1.5]})
+    params = {'max_depth': 5, 'eta': 0.1}
+    key = diskcache.fingerprint(df, params)
+    assert key == diskcache.fingerprint(df.copy(), {'eta': 0.1, 'max_depth': 5})
+    assert key != diskcache.fingerprint(df, dict(params, eta=0.2))
+    assert key != diskcache.fingerprint(df.assign(b=[0.5, 1.0, 1.5]), params)
+    assert key != diskcache.fingerprint(df.rename(columns={'b': 'c'}), params)
+    array = np.arange(6, dtype=np.int64)
+    assert diskcache.fingerprint(array) != diskcache.fingerprint(array.reshape(2, 3))
+    assert diskcache.fingerprint(array) != diskcache.fingerprint(array.astype(np.int32))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    now = time.time()
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.set(key, np.zeros(1000))
+        _set_used(cache, key, now - 100 + i)
+    entry_size = os.path.getsize(cache._path('a'))
+    # 'a' is the oldest entry but it is read again: 'b' becomes the least recently used one
+    assert cache.get('a') is not None
+
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(str(tmp_path))) == ['a.pkl', 'c.pkl']
+    assert cache.get('b', 'missing') == 'missing'
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_set_evicts_down_to_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    cache.set('probe', np.zeros(1000))
+    entry_size = os.path.getsize(cache._path('probe'))
+    os.remove(cache._path('probe'))
+
+    cache.max_bytes = 3 * entry_size
+    now = time.time()
+    for i in range(5):
+        cache.set(str(i), np.full(1000, i, dtype=np.float64))
+        _set_used(cache, str(i), now - 100 + i)
+    assert sum(os.path.getsize(os.path.join(str(tmp_path), f)) for f in os.listdir(str(tmp_path))) <= cache.max_bytes
+    assert sorted(os.listdir(str(tmp_path))) == ['2.pkl', '3.pkl', '4.pkl']
+    assert cache.get('4')[0] == 4
+
+
+def test_entry_removed_by_another_process(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    cache.set('key', {'rmse': 1.5})
+    os.remove(cache._path('key'))
+    assert cache.get('key') is None
+    assert cache.get('key', default={}) == {}
+
+    # Entry evicted by another process between its reading and its marking as recently used: result is still valid
+    cache.set('key', {'rmse': 1.5})
+
+    def _removed(path, times):
+        os.remove(path)
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(diskcache.os, 'utime', _removed)
+    assert cache.get('key') == {'rmse': 1.5}
+    assert cache.get('key', 'missing') == 'missing'
+
+    # Partial entries (process killed while writing) are ignored
+    with open(cache._path('broken'), 'wb') as f:
+        f.write(b'\x80\x04')
+    assert cache.get('broken', 'missing') == 'missing'
@@ -0,0 +1,108 @@
+"""
+Created on 18 october 2026
+
+Tests of the feature store: hash table lookup of listing ids, columns registry across snapshots and replacement of a
+snapshot while it is being read
+
+@author: nidragedd
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import constants as cst
+from src.utils import featurestore
+from src.utils.featurestore import FeatureStore, build_hash_table, lookup_hash_table
+
+
+def _clean_frame(ids, seed=0, columns=('a', 'b')):
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame(rng.rand(len(ids), len(columns)), columns=list(columns), index=pd.Index(ids, name='id'))
+    df[cst.FEATURE_STORE_TARGET] = rng.rand(len(ids)) * 100
+    return df
+
+
+def test_hash_table_lookup_matches_dict():
+    rng = np.random.RandomState(1)
+    ids = np.unique(rng.randint(1, 10 ** 9, 6000).astype(np.int64))[:5000]
+    keys, positions = build_hash_table(ids)
+    queries = np.concatenate([ids, rng.randint(1, 10 ** 9, 1000).astype(np.int64), np.array([-1, 0], dtype=np.int64)])
+    expected = {listing_id: i for i, listing_id in enumerate(ids)}
+    assert lookup_hash_table(keys, positions, queries).tolist() == [expected.get(q, -1) for q in queries]
+
+
+def test_get_rows_and_frame(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    df = _clean_frame([10, 20, 30, 40])
+    store.write_snapshot('2019-07-09', df)
+    features = store.open()
+    assert len(features) == 4
+    assert features.lookup([30, 99]).tolist() == [2, -1]
+    rows = features.get_rows([40, 99, 10], ['b', 'unknown', 'a'])
+    np.testing.assert_allclose(rows[0], [df.loc[40, 'b'], np.nan, df.loc[40, 'a']], rtol=1e-6)
+    assert np.isnan(rows[1]).all()
+    frame = features.get_frame()
+    np.testing.assert_allclose(frame.to_numpy(), df.to_numpy(), rtol=1e-6)
+    assert frame.index.tolist() == [10, 20, 30, 40]
+
+
+def test_columns_keep_their_position_across_snapshots(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.write_snapshot('2019-07-09', _clean_frame([1, 2], columns=('a', 'b')))
+    store.write_snapshot('2019-08-09', _clean_frame([1, 2], columns=('c', 'a')))
+    assert store.get_columns() == ['a', 'b', 'c']
+    assert store.open('2019-07-09').columns == ['a', 'b']
+    assert np.isnan(store.open('2019-08-09').get_frame()['b']).all()
+    assert store.list_snapshots() == ['2019-07-09', '2019-08-09']
+
+
+def test_replaced_snapshot_is_readable_at_any_time(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    old = _clean_frame([1, 2, 3], seed=1)
+    store.write_snapshot('2019-07-09', old)
+    reader = store.open('2019-07-09')
+
+    new = _clean_frame([1, 2, 3, 4], seed=2)
+    store.write_snapshot('2019-07-09', new)
+    # Arrays opened before the replacement are not mixed with the new ones
+    np.testing.assert_allclose(reader.get_frame().to_numpy(), old.to_numpy(), rtol=1e-6)
+    np.testing.assert_allclose(store.open('2019-07-09').get_frame().to_numpy(), new.to_numpy(), rtol=1e-6)
+
+    # Only the current and the previous data directories are kept
+    store.write_snapshot('2019-07-09', old)
+    data_dirs = [d for d in os.listdir(str(tmp_path / '2019-07-09'))
+                 if d.startswith(cst.FEATURE_STORE_DATA_DIR_PREFIX)]
+    assert len(data_dirs) == 2
+
+
+def test_concurrent_writers_do_not_lose_columns(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    errors = []
+
+    def write(i):
+        try:
+            df = _clean_frame([1, 2], columns=('a', 'col_{}'.format(i)))
+            store.write_snapshot('2019-07-{:02d}'.format(i + 1), df)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(store.get_columns()) == sorted(['a'] + ['col_{}'.format(i) for i in range(8)])
+    for i, scrape_date in enumerate(store.list_snapshots()):
+        features = store.open(scrape_date)
+        assert not np.isnan(features.get_frame(columns=['a', 'col_{}'.format(i)]).to_numpy()).any()
+    assert not os.path.exists(str(tmp_path / cst.FEATURE_STORE_LOCK_FILE))
+
+
+def test_lock_timeout(tmp_path):
+    (tmp_path / cst.FEATURE_STORE_LOCK_FILE).write_text('')
+    with pytest.raises(IOError):
+        with featurestore._lock_dir(str(tmp_path), timeout=0.1):
+            pass
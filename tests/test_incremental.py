@@ -0,0 +1,67 @@
+"""
+Created on 18 october 2026
+
+Tests of the incremental price model: validation and holdout sets chosen from listing ids and warm start keeping the
+trees up to the best validation round only
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from src.utils import constants as cst
+from src.modeling import incremental
+
+PARAMS = {'max_depth': 8, 'learning_rate': 0.5, 'n_estimators': 3, 'objective': 'reg:squarederror'}
+
+
+@pytest.fixture
+def listings(monkeypatch, tmp_path):
+    monkeypatch.setattr(cst, 'MODELS_DIR_PATH', str(tmp_path))
+    rng = np.random.RandomState(0)
+    columns = cst.IMPUTATION_MODE_FEATURES + cst.IMPUTATION_MEAN_FEATURES + ['a', 'b']
+    df = pd.DataFrame({col: rng.rand(3000) for col in columns}, index=np.arange(1, 3001))
+    df['price'] = 100 * df['a'] + 20 * df['b'] + rng.randn(3000)
+    df.loc[[5, 15], 'price'] = np.nan
+    return df
+
+
+def test_split_by_id_is_disjoint_and_stable(listings):
+    train_mask, val_mask, holdout_mask = incremental.split_by_id(listings)
+    assert not (train_mask & val_mask).any() and not (train_mask & holdout_mask).any()
+    assert not (val_mask & holdout_mask).any()
+    assert (listings.index[val_mask] % cst.VALIDATION_ID_MODULO == 0).all()
+    assert (listings.index[holdout_mask] % cst.VALIDATION_ID_MODULO == 1).all()
+    # Listings without price are in none of the sets
+    assert (train_mask | val_mask | holdout_mask).sum() == listings['price'].notnull().sum()
+    # Same ids give the same sets whatever the other listings are
+    _, val_subset, holdout_subset = incremental.split_by_id(listings.iloc[::2])
+    assert set(listings.index[::2][val_subset]) == set(listings.index[val_mask]) & set(listings.index[::2])
+    assert set(listings.index[::2][holdout_subset]) == set(listings.index[holdout_mask]) & set(listings.index[::2])
+
+
+def test_warm_start_keeps_trees_up_to_best_round(listings):
+    train_mask, val_mask, holdout_mask = incremental.split_by_id(listings)
+    X, y = listings.drop(columns=['price']), listings['price']
+    state = incremental.full_train(X[train_mask], y[train_mask], X[holdout_mask], y[holdout_mask], params=PARAMS)
+    base_booster = state['booster']
+    X_new, y_new = X[train_mask].iloc[:300], y[train_mask].iloc[:300]
+    state = incremental.update_model(X_new, y_new, X[val_mask], y[val_mask], X[holdout_mask], y[holdout_mask],
+                                     X_full=X[train_mask], y_full=y[train_mask], nb_rounds=300)
+    added = state['history'][-1]['rounds']
+    assert state['history'][-1]['mode'] == 'warm start'
+    assert 0 < added < 300
+    assert incremental._nb_trees(state['booster']) == incremental._nb_trees(base_booster) + added
+
+    # Same rounds without early stopping: the kept trees are the ones up to the best validation RMSE
+    imputer = state['imputer']
+    dnew = xgb.DMatrix(imputer.transform(X_new[state['columns']]), label=y_new.to_numpy())
+    dval = xgb.DMatrix(imputer.transform(X[val_mask][state['columns']]), label=y[val_mask].to_numpy())
+    train_params, _ = incremental._to_train_params(PARAMS)
+    evals_result = {}
+    xgb.train(train_params, dnew, num_boost_round=added + cst.WARM_START_EARLY_STOPPING_ROUNDS, xgb_model=base_booster,
+              evals=[(dval, 'validation')], evals_result=evals_result, verbose_eval=False)
+    assert int(np.argmin(evals_result['validation']['rmse'])) + 1 == added
+    assert np.isclose(incremental._rmse(state['booster'], dval), min(evals_result['validation']['rmse']), rtol=1e-4)
@@ -0,0 +1,76 @@
+"""
+Created on 18 october 2026
+
+Tests of the listing name index against a full scan of the names: matches, ranking, first match and saved indexes
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualization import query
+from src.visualization.query import ListingNameIndex
+
+
+@pytest.fixture
+def listings():
+    rng = np.random.RandomState(0)
+    words = ['Studio', 'Paris', 'cosy', 'Cosy', 'loft', 'Marais', 'appart', 'vue', 'Tour', 'Eiffel', 'é', '']
+    names = [' '.join(rng.choice(words, rng.randint(1, 5))) for _ in range(2000)]
+    names[:3] = ['cosy', 'cosy', 'Cosy loft']
+    df = pd.DataFrame({'id': rng.permutation(10 ** 6)[:2000], 'name': names})
+    df.loc[[10, 20], 'name'] = np.nan
+    return df
+
+
+def _scan(df, text, case_sensitive=True):
+    """
+    Position of the text in each name, names and text being normalized as the index does
+    """
+    names = df['name'].fillna('').astype(str)
+    if not case_sensitive:
+        names, text = names.str.lower(), text.lower()
+    return names, text, names.str.find(text).to_numpy()
+
+
+def _scan_ranking(df, text, case_sensitive=True):
+    """
+    Reference ranking: exact name first, then by position of the query in the name, by name length and dataset order
+    """
+    names, text, found = _scan(df, text, case_sensitive)
+    matches = [(found[i] != 0 or len(name) != len(text), found[i], len(name), i)
+               for i, name in enumerate(names) if found[i] > -1]
+    return [df['id'].iloc[match[-1]] for match in sorted(matches)]
+
+
+QUERIES = ['cosy', 'Cosy', 'cosy loft', 'o', 'Pa', 'ris Co', 'Eiffel Tour', 'é', 'absent', 'Marais vue cosy', '']
+
+
+@pytest.mark.parametrize('case_sensitive', [True, False])
+def test_search_matches_full_scan(listings, case_sensitive):
+    index = ListingNameIndex(listings, case_sensitive)
+    for text in QUERIES:
+        expected = _scan_ranking(listings, text, case_sensitive)
+        assert index.search(text) == expected
+        assert index.search(text, top_k=5) == expected[:5]
+        first = np.flatnonzero(_scan(listings, text, case_sensitive)[2] > -1)
+        assert index.find_first(text) == (listings['id'].iloc[first[0]] if len(first) > 0 else None)
+
+
+def test_get_positions(listings):
+    index = ListingNameIndex(listings)
+    ids = listings['id'].tolist()
+    assert index.get_positions([ids[5], ids[0], -1]).tolist() == [5, 0, -1]
+
+
+def test_saved_index_is_rebuilt_when_names_change(listings, tmp_path):
+    path = str(tmp_path / 'cache' / 'name_index.pkl')
+    index = query.load_or_build_name_index(listings, path)
+    assert query.load_or_build_name_index(listings, path).fingerprint == index.fingerprint
+
+    renamed = listings.copy()
+    renamed.loc[0, 'name'] = 'Péniche sur la Seine'
+    assert query.load_or_build_name_index(renamed, path).search('Péniche') == [renamed['id'].iloc[0]]
+    assert query.load_or_build_name_index(renamed, path, case_sensitive=False).search('péniche') == \
+        [renamed['id'].iloc[0]]
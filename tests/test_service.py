@@ -0,0 +1,121 @@
+"""
+Created on 18 october 2026
+
+Tests of the error paths of the prediction service: malformed HTTP requests, failing listings in a micro-batch and
+unexpected errors of the predictor
+
+@author: nidragedd
+"""
+import json
+import asyncio
+
+import numpy as np
+
+from src.serving import service
+
+
+class _FakePredictor(object):
+    """
+    Predicts the 'x' feature of each listing, fails on listings flagged as 'bad' (ValueError) or 'boom' (AssertionError)
+    """
+    def predict(self, listings):
+        if any(listing.get('bad') for listing in listings):
+            raise ValueError('bad listing')
+        if any(listing.get('boom') for listing in listings):
+            raise AssertionError('coherence check failed')
+        return np.array([float(listing['x']) for listing in listings])
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _with_service(client):
+    server, batch_task = await service.start_service(_FakePredictor(), port=0, max_wait_ms=20)
+    try:
+        return await client(server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        batch_task.cancel()
+
+
+async def _send_raw(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return head.split(b'\r\n')[0].decode(), json.loads(body.decode())
+
+
+def _post(payload):
+    body = json.dumps(payload).encode()
+    return b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body
+
+
+def test_predict_and_health():
+    async def client(port):
+        return await asyncio.gather(_send_raw(port, _post({'listings': [{'x': 1}, {'x': 2}]})),
+                                    _send_raw(port, b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n'),
+                                    _send_raw(port, b'GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n'))
+    predicted, health, unknown = _run(_with_service(client))
+    assert predicted == ('HTTP/1.1 200 OK', {'prices': [1.0, 2.0]})
+    assert health[0] == 'HTTP/1.1 200 OK'
+    assert unknown[0] == 'HTTP/1.1 404 Not Found'
+
+
+def test_malformed_requests_get_bad_request():
+    raws = [b'GARBAGE\r\n\r\n',
+            b'POST /predict HTTP/1.1\r\nno colon in this header\r\n\r\n',
+            b'POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+            b'POST /predict HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+            _post({'listings': 'not a list of listings'})[:-2] + b'{]']
+
+    async def client(port):
+        return await asyncio.gather(*[_send_raw(port, raw) for raw in raws])
+    for status, payload in _run(_with_service(client)):
+        assert status == 'HTTP/1.1 400 Bad Request'
+        assert 'error' in payload
+
+
+def test_unexpected_error_gets_internal_server_error():
+    async def client(port):
+        return await _send_raw(port, _post({'boom': True}))
+    status, payload = _run(_with_service(client))
+    assert status == 'HTTP/1.1 500 Internal Server Error'
+    assert payload['error'].startswith('AssertionError')
+
+
+def test_failing_request_does_not_fail_its_batch():
+    async def scenario():
+        batcher = service.MicroBatcher(_FakePredictor(), max_wait_ms=50)
+        batch_task = asyncio.ensure_future(batcher.run())
+        try:
+            return await asyncio.gather(batcher.predict([{'x': 1}]), batcher.predict([{'bad': True}]),
+                                        batcher.predict([{'x': 2}, {'x': 3}]), return_exceptions=True)
+        finally:
+            batch_task.cancel()
+    first, failed, last = _run(scenario())
+    assert first == [1.0]
+    assert isinstance(failed, ValueError)
+    assert last == [2.0, 3.0]
+
+
+def test_cancelled_request_does_not_stop_the_batcher():
+    async def scenario():
+        batcher = service.MicroBatcher(_FakePredictor(), max_wait_ms=20)
+        batch_task = asyncio.ensure_future(batcher.run())
+        try:
+            cancelled = asyncio.ensure_future(batcher.predict([{'x': 9}]))
+            await asyncio.sleep(0.001)
+            cancelled.cancel()
+            prices = await batcher.predict([{'x': 4}])
+            return prices, batch_task.done()
+        finally:
+            batch_task.cancel()
+    assert _run(scenario()) == ([4.0], False)
@@ -0,0 +1,72 @@
+"""
+Created on 18 october 2026
+
+Tests of the incremental ingestion of snapshots: row hashes, delta between 2 snapshots and cleaning of the delta only
+
+@author: nidragedd
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import constants as cst
+from src.utils import snapshots
+from src.utils import synthetic
+from src.utils.featurestore import FeatureStore
+
+
+@pytest.fixture
+def listings():
+    return synthetic.generate_listings(300, seed=3)
+
+
+def test_hashes_do_not_depend_on_inferred_dtypes(listings):
+    df_int = listings.copy()
+    df_int['minimum_nights'] = df_int['minimum_nights'].fillna(1).astype('int64')
+    df_float = df_int.copy()
+    df_float['minimum_nights'] = df_float['minimum_nights'].astype('float64')
+    pd.testing.assert_series_equal(snapshots.compute_row_hashes(df_int), snapshots.compute_row_hashes(df_float))
+
+
+def test_hashes_ignore_columns_not_used_by_cleaning(listings):
+    df_other = listings.copy()
+    df_other['host_location'] = 'Somewhere'
+    df_other['last_scraped'] = '2019-08-01'
+    pd.testing.assert_series_equal(snapshots.compute_row_hashes(listings), snapshots.compute_row_hashes(df_other))
+
+
+def test_compute_delta(listings):
+    previous = listings.iloc[:250]
+    new = listings.iloc[10:].copy()
+    new.loc[new.index[:5], 'price'] = '$1,234.00'
+    delta = snapshots.compute_delta(snapshots.compute_row_hashes(previous), snapshots.compute_row_hashes(new))
+    assert set(delta['removed']) == set(listings['id'].iloc[:10])
+    assert set(delta['added']) == set(listings['id'].iloc[250:])
+    assert set(delta['changed']) == set(new['id'].iloc[:5])
+
+
+def _write_snapshot(df, scrape_date):
+    snapshot_dir = snapshots.get_snapshot_dir(scrape_date)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    df.to_csv(os.path.join(snapshot_dir, cst.LISTING_FULL_FILE), index=False, compression='gzip')
+
+
+def test_incremental_ingestion_matches_full_cleaning(listings, tmp_path, monkeypatch):
+    monkeypatch.setattr(cst, 'SNAPSHOTS_DIR_PATH', str(tmp_path / 'snapshots'))
+    _write_snapshot(listings.iloc[:250], '2019-07-09')
+    new = listings.iloc[10:].copy()
+    new.loc[new.index[:5], 'accommodates'] = 12
+    _write_snapshot(new, '2019-08-09')
+
+    feature_store = FeatureStore(str(tmp_path / 'features'))
+    snapshots.ingest_snapshot('2019-07-09', feature_store=feature_store)
+    df_incremental = snapshots.ingest_snapshot('2019-08-09', feature_store=feature_store)
+
+    _, _, encoders = snapshots.load_snapshot_outputs('2019-07-09')
+    df_full = snapshots._clean(snapshots.load_snapshot_listings('2019-08-09'), encoders)
+    assert df_incremental.index.tolist() == new['id'].tolist()
+    pd.testing.assert_frame_equal(df_incremental, df_full[df_incremental.columns], check_dtype=False,
+                                  check_names=False)
+    assert np.all(df_incremental.loc[new['id'].iloc[:5], 'accommodates'] == 12)
@@ -0,0 +1,59 @@
+"""
+Created on 18 october 2026
+
+Tests of the export of the price model to NumPy arrays: TreeModel predictions should match the ones of the fitted
+imputation + XGBoost model, missing values included
+
+@author: nidragedd
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.pipeline import Pipeline
+
+from src.modeling import modeling
+from src.modeling.treeexport import export_tree_model
+from src.serving.treemodel import TreeModel
+from src.utils import constants as cst
+
+
+@pytest.fixture
+def listings():
+    rng = np.random.RandomState(0)
+    columns = cst.IMPUTATION_MEAN_FEATURES + cst.IMPUTATION_MODE_FEATURES + ['latitude', 'longitude']
+    X = pd.DataFrame(rng.rand(2000, len(columns)), columns=columns)
+    y = 100 * X['latitude'] + 50 * X[cst.IMPUTATION_MEAN_FEATURES[0]] + 10 * rng.randn(2000)
+    # Missing values in imputed features and in a passthrough feature (missing branch of the trees)
+    for col in [cst.IMPUTATION_MEAN_FEATURES[0], cst.IMPUTATION_MODE_FEATURES[0], 'longitude']:
+        X.loc[rng.rand(2000) < 0.1, col] = np.nan
+    # Mode imputation needs repeated values
+    X[cst.IMPUTATION_MODE_FEATURES] = X[cst.IMPUTATION_MODE_FEATURES].round(1)
+    return X, y
+
+
+def test_pipeline_export_matches_xgboost(listings, tmp_path):
+    X, y = listings
+    pipeline = Pipeline(steps=[('imputation', modeling.get_column_transformer()),
+                               ('model', xgb.XGBRegressor(n_estimators=50, max_depth=5, learning_rate=0.1,
+                                                          objective='reg:squarederror'))])
+    pipeline.fit(X, y)
+    export_tree_model(pipeline, X.columns, model_dir=str(tmp_path))
+
+    tree_model = TreeModel(str(tmp_path))
+    expected = pipeline.predict(X)
+    np.testing.assert_allclose(tree_model.predict(X), expected, rtol=5e-4, atol=5e-4 * np.abs(expected).mean())
+    # Arrays in the order of the columns and small batches give the same predictions
+    np.testing.assert_allclose(tree_model.predict(X.to_numpy(), batch_size=7), tree_model.predict(X), rtol=1e-6)
+
+
+def test_booster_export_with_separate_imputer(listings, tmp_path):
+    X, y = listings
+    imputer = modeling.get_column_transformer().fit(X)
+    dtrain = xgb.DMatrix(imputer.transform(X), label=y.to_numpy())
+    booster = xgb.train({'max_depth': 4, 'eta': 0.3, 'objective': 'reg:squarederror'}, dtrain, num_boost_round=30)
+    export_tree_model(booster, X.columns, imputer=imputer, model_dir=str(tmp_path))
+
+    expected = booster.predict(xgb.DMatrix(imputer.transform(X)))
+    predicted = TreeModel(str(tmp_path), mmap=False).predict(X)
+    np.testing.assert_allclose(predicted, expected, rtol=5e-4, atol=5e-4 * np.abs(expected).mean())